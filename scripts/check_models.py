@@ -4,7 +4,12 @@ from src.config import GEMINI_API_KEY
 
 try:
     client = genai.Client(api_key=GEMINI_API_KEY)
-    for m in client.models.list():
-        print(m.name)
+    # Large pages keep the catalog to a couple of round trips
+    names = {
+        m.name
+        for m in client.models.list(config={"page_size": 200})
+        if not m.supported_actions or "generateContent" in m.supported_actions
+    }
+    print("\n".join(sorted(names)))
 except Exception as e:
     print(f"Error listing models: {e}")
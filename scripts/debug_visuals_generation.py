@@ -12,9 +12,9 @@ from src.visuals import generate_images
 
 async def test_generation():
     output_dir = "debug_output_images"
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
-    os.makedirs(output_dir)
+    # Filesystem work goes to a thread so it doesn't stall the event loop
+    await asyncio.to_thread(shutil.rmtree, output_dir, ignore_errors=True)
+    await asyncio.to_thread(os.makedirs, output_dir, exist_ok=True)
 
     # Mock semantic map with 4 scenes and 3 entities
     semantic_map = {
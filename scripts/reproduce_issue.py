@@ -5,9 +5,9 @@ from src.visuals import generate_images
 
 async def main():
     output_dir = "test_output_hybrid"
-    if os.path.exists(output_dir):
-        shutil.rmtree(output_dir)
-    os.makedirs(output_dir)
+    # Filesystem work goes to a thread so it doesn't stall the event loop
+    await asyncio.to_thread(shutil.rmtree, output_dir, ignore_errors=True)
+    await asyncio.to_thread(os.makedirs, output_dir, exist_ok=True)
 
     semantic_map = {
         "scenes": [
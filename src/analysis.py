@@ -1,23 +1,58 @@
 
 from collections import Counter
-import json
-import os
+from heapq import nlargest
+from operator import itemgetter
 import re
 import asyncio
 from google import genai
+try:
+    import orjson as _json  # Faster C parser for the large analysis payloads
+except ImportError:
+    import json as _json
+from src import cache
 from src.config import GEMINI_API_KEY
 from src.gemini_utils import get_gemini_model
 
 # Compile regex pattern once for performance
-CAPITALIZED_PATTERN = re.compile(r'\b[A-Z][a-z]+\b')
+# Capitalized words of 3+ letters; the length filter runs inside the regex engine
+CAPITALIZED_PATTERN = re.compile(r'\b[A-Z][a-z]{2,}\b')
+
+# Capitalized words that are never character names (regex fallback filter)
+_COMMON_STOPS = frozenset({
+    "The", "A", "An", "It", "He", "She", "They", "But", "And", "When", "Then", "Suddenly",
+    "Meanwhile", "However", "Although", "Okay", "So", "If", "This", "That", "There", "Here",
+    "What", "Why", "How", "Who", "Where", "Beneath", "Above", "Behind", "Inside", "Outside",
+    "Near", "Far", "Just", "Only", "Very", "Really", "Now", "Later", "Soon", "Yesterday",
+    "Today", "Tomorrow", "Yes", "No", "Please", "Thank", "Thanks", "Hello", "Hi", "Goodbye",
+    "Mr", "Mrs", "Ms", "Dr", "Prof", "Captain", "Sergeant", "General", "King", "Queen",
+    "Prince", "Princess", "Lord", "Lady", "Sir", "Madam", "One", "Two", "Three", "First",
+    "Second", "Third", "Next", "Last", "Finally", "Also", "Besides", "Moreover", "Furthermore",
+    "In", "On", "At", "To", "For", "With", "By", "From", "Of", "About", "As", "Like"
+})
+
+# Descriptive words that hint a passage is worth illustrating
+VISUAL_KEYWORDS = ("see", "look", "diagram", "figure", "image", "picture", "scene")
+VISUAL_KEYWORD_PATTERN = re.compile(r'\b(?:' + '|'.join(VISUAL_KEYWORDS) + r')\b', re.IGNORECASE)
+
+def count_name_candidates(text):
+    """
+    Counts capitalized words that could be character names.
+    Matching and counting both run in C (regex engine + Counter's
+    element counter); stop words are removed afterwards from the much
+    smaller table of unique words rather than checked per occurrence.
+    """
+    counts = Counter(CAPITALIZED_PATTERN.findall(text))
+    for stop_word in _COMMON_STOPS.intersection(counts):
+        del counts[stop_word]
+    return counts
 
 async def semantic_analysis(text):
     """
     Performs semantic analysis to extract entities and key concepts (Async).
     Priority: Gemini -> Basic Regex
     """
-    # 1. Try Gemini
-    api_key = os.getenv("GEMINI_API_KEY")
+    # 1. Try Gemini (key is read once at import time by src.config)
+    api_key = GEMINI_API_KEY
     print(f"=== SEMANTIC ANALYSIS DEBUG ===")
     print(f"API Key present: {bool(api_key)}")
     if api_key:
@@ -36,32 +71,13 @@ async def semantic_analysis(text):
     # 3. Basic Regex Fallback
     print("Falling back to Basic Regex Analysis...")
     
-    # Limit scan to first 10K characters for performance
-    scan_text = text[:10000]
-    words = CAPITALIZED_PATTERN.findall(scan_text)
-    
-    common_stops = {
-        "The", "A", "An", "It", "He", "She", "They", "But", "And", "When", "Then", "Suddenly",
-        "Meanwhile", "However", "Although", "Okay", "So", "If", "This", "That", "There", "Here",
-        "What", "Why", "How", "Who", "Where", "Beneath", "Above", "Behind", "Inside", "Outside",
-        "Near", "Far", "Just", "Only", "Very", "Really", "Now", "Later", "Soon", "Yesterday",
-        "Today", "Tomorrow", "Yes", "No", "Please", "Thank", "Thanks", "Hello", "Hi", "Goodbye",
-        "Mr", "Mrs", "Ms", "Dr", "Prof", "Captain", "Sergeant", "General", "King", "Queen",
-        "Prince", "Princess", "Lord", "Lady", "Sir", "Madam", "One", "Two", "Three", "First",
-        "Second", "Third", "Next", "Last", "Finally", "Also", "Besides", "Moreover", "Furthermore",
-        "In", "On", "At", "To", "For", "With", "By", "From", "Of", "About", "As", "Like"
-    }
-    
-    candidates = [w for w in words if w not in common_stops and len(w) > 2]
-    
-    # Count frequency
-    counts = Counter(candidates)
+    counts = count_name_candidates(text)
     
     # Entity format: [name, role, visual_description]
     # Empty description for fallback since regex can't infer appearance
     top_entities = [
         [name, "Character", ""]  # description blank - not available from regex
-        for name, count in counts.most_common(5)
+        for name, count in nlargest(5, counts.items(), key=itemgetter(1))  # bounded top-k
     ]
     
     return {
@@ -105,13 +121,23 @@ async def semantic_analysis(text):
 
 from src.prompts import SEMANTIC_ANALYSIS_PROMPT
 
+# Prompt pre-split around its single {text} slot so each call is a plain concatenation
+_ANALYSIS_PROMPT_PREFIX, _ANALYSIS_PROMPT_SUFFIX = SEMANTIC_ANALYSIS_PROMPT.format(text="\0").split("\0")
+
 async def semantic_analysis_with_llm(text, api_key):
     print("Using Gemini for Semantic Analysis...")
     
+    book_text = text[:100000]
+    key = cache.cache_key("semantic_analysis", book_text)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached:
+        print("♻️ Reusing cached semantic analysis")
+        return _json.loads(cached)
+    
     try:
         client, model_name = get_gemini_model(capability="text", api_key=api_key)
         
-        prompt = SEMANTIC_ANALYSIS_PROMPT.format(text=text[:100000])
+        prompt = _ANALYSIS_PROMPT_PREFIX + book_text + _ANALYSIS_PROMPT_SUFFIX
         
         # Run blocking generation in thread
         response = await asyncio.to_thread(
@@ -122,12 +148,16 @@ async def semantic_analysis_with_llm(text, api_key):
         response_text = response.text.strip()
         print(f"Gemini Analysis Response: {response_text[:200]}...")  # Log first 200 chars
         
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
+        # Strip optional markdown fences in a single pass
+        response_text = response_text.removeprefix("```json").removeprefix("```").removesuffix("```")
             
-        return json.loads(response_text)
+        result = _json.loads(response_text)
+        if isinstance(result, dict) and result.get("entities"):
+            try:
+                await asyncio.to_thread(cache.put, key, response_text.encode("utf-8"))
+            except OSError as e:
+                print(f"⚠️ Could not cache semantic analysis: {e}")
+        return result
         
     except Exception as e:
         import traceback
@@ -136,36 +166,62 @@ async def semantic_analysis_with_llm(text, api_key):
         return {"entities": [], "keywords": []}
 
 
+def _iter_lines(text):
+    """Yields the lines of text one at a time (same pieces as text.split('\\n'))."""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def iter_chapters(text):
+    """
+    Lazily segments text into chapters based on headings.
+    Simple heuristic: Look for "Chapter" or all-caps lines.
+    Yields {"title", "content"} dicts one chapter at a time.
+    """
+    current_title = "Introduction"
+    current_lines = []
+
+    for line in _iter_lines(text):
+        stripped = line.strip()
+        # Cheapest checks first: most lines are blank or start with a non-"C" character,
+        # so the lowercase slice and the isupper() scan are rarely reached
+        is_heading = bool(stripped) and (
+            (stripped[0] in "Cc" and stripped[:7].lower() == "chapter")
+            or (len(stripped) < 50 and stripped.isupper())
+        )
+        if is_heading:
+            # Join once per chapter instead of concatenating per line (avoids O(n^2) copying)
+            content = "\n".join(current_lines) + "\n" if current_lines else ""
+            if content.strip():
+                yield {"title": current_title, "content": content}
+            current_title = stripped
+            current_lines = []
+        else:
+            current_lines.append(line)
+
+    content = "\n".join(current_lines) + "\n" if current_lines else ""
+    if content.strip():
+        yield {"title": current_title, "content": content}
+
 def chapter_segmentation(text):
     """
     Segments text into chapters based on headings.
     Simple heuristic: Look for "Chapter" or all-caps lines.
     """
-    chapters = []
-    lines = text.split('\n')
-    current_chapter = {"title": "Introduction", "content": ""}
-    
-    for line in lines:
-        if line.strip().lower().startswith("chapter") or (line.isupper() and len(line.strip()) < 50):
-            if current_chapter["content"].strip():
-                chapters.append(current_chapter)
-            current_chapter = {"title": line.strip(), "content": ""}
-        else:
-            current_chapter["content"] += line + "\n"
-            
-    if current_chapter["content"].strip():
-        chapters.append(current_chapter)
-        
-    return chapters
+    return list(iter_chapters(text))
 
 def identify_visual_content(text):
     """
     Identifies segments that are good for visualization.
+    Returns (offset, keyword) pairs for every visual keyword in the text.
     """
-    # Placeholder: look for descriptive words
-    visual_keywords = ["see", "look", "diagram", "figure", "image", "picture", "scene"]
-    # This is a very basic heuristic
-    return []
+    # Single linear scan for all keywords at once
+    return [(m.start(), m.group().lower()) for m in VISUAL_KEYWORD_PATTERN.finditer(text)]
 
 def ensure_minimum_scenes(analysis_result, min_scenes=4):
     """
@@ -1,10 +1,112 @@
 import asyncio
-import requests
+import base64
+import contextlib
+import logging
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import aiohttp
+import aiofiles
 
-from google import genai
 from src.config import ELEVENLABS_API_KEY, GEMINI_API_KEY, DEEPGRAM_API_KEY, POLLINATIONS_API_KEY
+from src import cache
+from src.gemini_utils import get_gemini_client, generate_with_retry
+from src.http_session import get_session
 from src.prompts import SSML_PROMPT
 
+logger = logging.getLogger(__name__)
+
+# Size of the blocks used when streaming TTS responses to disk
+AUDIO_STREAM_CHUNK_SIZE = 64 * 1024
+
+# Model used to rewrite narration text into SSML
+SSML_MODEL = 'gemini-2.0-flash'
+
+# SSML prompt pre-split around its single {text} slot so each call is a plain concatenation
+_SSML_PROMPT_PREFIX, _SSML_PROMPT_SUFFIX = SSML_PROMPT.format(text="\0").split("\0")
+
+# Markdown code fence (optionally tagged xml) wrapped around LLM output
+_CODE_FENCE_PATTERN = re.compile(r"```(?:xml)?\s*(.*?)\s*```", re.DOTALL)
+
+async def _copy_response_body(response, f):
+    """Writes an aiohttp response body into an open aiofiles handle block by block as it arrives."""
+    async for data in response.content.iter_chunked(AUDIO_STREAM_CHUNK_SIZE):
+        await f.write(data)
+
+async def _stream_response_to_file(response, output_path):
+    """Streams an aiohttp response body to output_path, removing the partial file on failure."""
+    try:
+        async with aiofiles.open(output_path, "wb") as f:
+            await _copy_response_body(response, f)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(output_path)
+        raise
+
+# Texts at least this long are formatted for Deepgram in a worker process; the regex passes
+# over a whole chapter would otherwise stall every other request on the event loop
+DEEPGRAM_FORMAT_PROCESS_MIN_CHARS = 20000
+
+_cpu_pool = None
+
+def _get_cpu_pool():
+    """Returns the shared process pool for CPU-bound text preparation (created on first use)."""
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+    return _cpu_pool
+
+def shutdown_cpu_pool():
+    """Stops the worker processes, if any were started."""
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=False, cancel_futures=True)
+        _cpu_pool = None
+
+# Cheap endpoints per TTS host, used only to open pooled connections early
+TTS_WARMUP_URLS = {
+    "elevenlabs": "https://api.elevenlabs.io/v1/voices",
+    "deepgram": "https://api.deepgram.com/v1/projects",
+    "pollinations": "https://gen.pollinations.ai/"
+}
+
+async def warm_up_tts_providers():
+    """
+    Opens keep-alive connections to the configured TTS providers ahead of first use,
+    so their DNS + TCP + TLS handshakes overlap other work (best effort).
+    """
+    configured = {
+        "elevenlabs": ELEVENLABS_API_KEY,
+        "deepgram": DEEPGRAM_API_KEY,
+        "pollinations": POLLINATIONS_API_KEY
+    }
+    session = await get_session()
+
+    async def touch(url):
+        # Status doesn't matter; releasing the response returns the connection to the pool
+        async with session.head(url, timeout=aiohttp.ClientTimeout(total=5)):
+            pass
+
+    await asyncio.gather(
+        *(touch(url) for name, url in TTS_WARMUP_URLS.items() if configured[name]),
+        return_exceptions=True
+    )
+
+async def _restore_cached_audio(key, output_path):
+    """Copies a previously generated clip for key to output_path. Returns True on a hit."""
+    if await asyncio.to_thread(cache.get_file, key, output_path):
+        logger.debug("Reusing cached audio for %s", output_path)
+        return True
+    return False
+
+async def _store_cached_audio(key, output_path):
+    """Saves a freshly generated clip in the on-disk cache (best effort)."""
+    try:
+        await asyncio.to_thread(cache.put_file, key, output_path)
+    except OSError as e:
+        print(f"⚠️ Could not cache audio {output_path}: {e}")
+
 # Configure Gemini
 # genai.configure(api_key=GEMINI_API_KEY) # Not needed with new SDK client
 
@@ -12,17 +114,26 @@ async def generate_ssml(text):
     """
     Rewrites text into SSML using Gemini for natural narration.
     """
-    print("Generating SSML with Gemini...")
+    key = cache.cache_key("ssml", SSML_MODEL, text)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        logger.debug("Reusing cached SSML")
+        return cached.decode("utf-8")
+
+    logger.debug("Generating SSML with Gemini...")
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        response = client.models.generate_content(model='gemini-2.0-flash', contents=SSML_PROMPT.format(text=text))
+        client = get_gemini_client(GEMINI_API_KEY)
+        response = await generate_with_retry(client, SSML_MODEL, _SSML_PROMPT_PREFIX + text + _SSML_PROMPT_SUFFIX)
         ssml_text = response.text
         
         # Basic cleanup to ensure it's just the SSML if the model adds markdown
-        if "```xml" in ssml_text:
-            ssml_text = ssml_text.split("```xml")[1].split("```")[0].strip()
-        elif "```" in ssml_text:
-            ssml_text = ssml_text.split("```")[1].split("```")[0].strip()
+        match = _CODE_FENCE_PATTERN.search(ssml_text)
+        ssml_text = match.group(1) if match else ssml_text.strip()
+        
+        try:
+            await asyncio.to_thread(cache.put, key, ssml_text.encode("utf-8"))
+        except OSError as e:
+            print(f"⚠️ Could not cache SSML: {e}")
             
         return ssml_text
     except Exception as e:
@@ -34,8 +145,6 @@ def format_text_for_deepgram(text: str) -> str:
     Format text according to Deepgram best practices for natural speech.
     Based on: https://developers.deepgram.com/docs/improving-aura-2-formatting
     """
-    import re
-    
     # Preserve emotional markers like [laughs], [gasps], [sighs]
     # We'll temporarily replace them to avoid punctuation changes
     markers = re.findall(r'\[\w+\]', text)
@@ -64,6 +173,37 @@ def format_text_for_deepgram(text: str) -> str:
     
     return text.strip()
 
+# Voice ID -> Deepgram Aura-2 voice
+DEFAULT_DEEPGRAM_VOICE = "aura-2-cordelia-en"
+DEEPGRAM_VOICES = {
+    # Default audiobook voice - Cordelia is specifically designed for storytelling
+    "default": "aura-2-cordelia-en",
+    
+    # Map ElevenLabs IDs to expressive Deepgram voices
+    "pNInz6obpgDQGcFmaJgB": "aura-2-draco-en",      # Adam -> Draco (British, Warm, Trustworthy narrator)
+    "21m00Tcm4TlvDq8ikWAM": "aura-2-cordelia-en",   # Rachel -> Cordelia (Warm, Storytelling focus)
+    
+    # Additional voice options for variety
+    "warm_female": "aura-2-cordelia-en",    # Approachable, Warm, Storytelling
+    "warm_male": "aura-2-draco-en",         # British, Warm, Approachable
+    "energetic_female": "aura-2-aries-en",  # Warm, Energetic, Caring
+    "friendly_female": "aura-2-helena-en",  # Caring, Natural, Positive
+    "expressive_female": "aura-2-aurora-en", # Cheerful, Expressive, Energetic
+}
+
+# Voice ID -> Edge TTS voice (Adam/Jax -> Guy, Rachel/Emma -> Aria)
+DEFAULT_EDGE_VOICE = "en-US-ChristopherNeural"
+EDGE_VOICES = {
+    "pNInz6obpgDQGcFmaJgB": "en-US-GuyNeural",   # Adam
+    "21m00Tcm4TlvDq8ikWAM": "en-US-AriaNeural",  # Rachel
+}
+
+# Voice ID -> Pollinations voice
+POLLINATIONS_VOICES = {
+    "pNInz6obpgDQGcFmaJgB": "onyx",  # Adam
+    "21m00Tcm4TlvDq8ikWAM": "nova",  # Rachel
+}
+
 def get_deepgram_voice(voice_id: str) -> str:
     """
     Map ElevenLabs/generic voice IDs to Deepgram Aura-2 voices.
@@ -75,22 +215,49 @@ def get_deepgram_voice(voice_id: str) -> str:
     - Helena: Caring, Natural, Positive, Friendly - audiobook friendly
     - Draco: British, Warm, Approachable, Trustworthy - professional narrator
     """
-    voice_map = {
-        # Default audiobook voice - Cordelia is specifically designed for storytelling
-        "default": "aura-2-cordelia-en",
-        
-        # Map ElevenLabs IDs to expressive Deepgram voices
-        "pNInz6obpgDQGcFmaJgB": "aura-2-draco-en",      # Adam -> Draco (British, Warm, Trustworthy narrator)
-        "21m00Tcm4TlvDq8ikWAM": "aura-2-cordelia-en",   # Rachel -> Cordelia (Warm, Storytelling focus)
-        
-        # Additional voice options for variety
-        "warm_female": "aura-2-cordelia-en",    # Approachable, Warm, Storytelling
-        "warm_male": "aura-2-draco-en",         # British, Warm, Approachable
-        "energetic_female": "aura-2-aries-en",  # Warm, Energetic, Caring
-        "friendly_female": "aura-2-helena-en",  # Caring, Natural, Positive
-        "expressive_female": "aura-2-aurora-en", # Cheerful, Expressive, Energetic
-    }
-    return voice_map.get(voice_id, "aura-2-cordelia-en")
+    return DEEPGRAM_VOICES.get(voice_id, DEFAULT_DEEPGRAM_VOICE)
+
+def _format_text_for_deepgram_request(text, title=None, author=None):
+    # Module-level so worker processes can pickle it
+    if len(text) < 500:
+        # Short text - skip professional narration (no intro/outro)
+        return format_text_for_deepgram(text)
+    # Long text - apply full professional narration
+    # Only pass title/author if provided (implies audiobook mode)
+    professional_text = format_for_professional_narration(text, book_title=title, author=author)
+    return format_text_for_deepgram(professional_text)
+
+async def _prepare_deepgram_text(text, title=None, author=None):
+    # === SMART FORMATTING BASED ON TEXT LENGTH ===
+    # Short texts (like podcast segments) - just use basic formatting
+    # Long texts (audiobooks) - use professional narration with intro/outro
+    if len(text) < DEEPGRAM_FORMAT_PROCESS_MIN_CHARS:
+        formatted_text = _format_text_for_deepgram_request(text, title, author)
+    else:
+        loop = asyncio.get_running_loop()
+        formatted_text = await loop.run_in_executor(
+            _get_cpu_pool(), _format_text_for_deepgram_request, text, title, author
+        )
+    
+    logger.debug("Text formatted for natural TTS (%d -> %d chars)", len(text), len(formatted_text))
+    return formatted_text
+
+def _chunk_text_for_deepgram(text, max_length=1900):
+    # Deepgram has a 2000 character limit per request. We must chunk.
+    # Rough split by common sentence enders
+    sentences = text.replace('. ', '.|').replace('! ', '!|').replace('? ', '?|').split('|')
+    chunks = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) < max_length:
+            current_chunk += sentence + " "
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = sentence + " "
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    return chunks
 
 async def generate_audio_deepgram(text, output_path, voice_id="pNInz6obpgDQGcFmaJgB", title=None, author=None):
     """
@@ -104,7 +271,7 @@ async def generate_audio_deepgram(text, output_path, voice_id="pNInz6obpgDQGcFma
     
     # Get the appropriate Deepgram voice
     deepgram_voice = get_deepgram_voice(voice_id)
-    print(f"🎧 Generating audio using Deepgram Aura-2 ({deepgram_voice})...")
+    logger.debug("Generating audio using Deepgram Aura-2 (%s)...", deepgram_voice)
     
     url = f"https://api.deepgram.com/v1/speak?model={deepgram_voice}"
     
@@ -113,73 +280,50 @@ async def generate_audio_deepgram(text, output_path, voice_id="pNInz6obpgDQGcFma
         "Content-Type": "application/json"
     }
     
-    # === SMART FORMATTING BASED ON TEXT LENGTH ===
-    # Short texts (like podcast segments) - just use basic formatting
-    # Long texts (audiobooks) - use professional narration with intro/outro
-    if len(text) < 500:
-        # Short text - skip professional narration (no intro/outro)
-        formatted_text = format_text_for_deepgram(text)
-    else:
-        # Long text - apply full professional narration
-        # Only pass title/author if provided (implies audiobook mode)
-        professional_text = format_for_professional_narration(text, book_title=title, author=author)
-        formatted_text = format_text_for_deepgram(professional_text)
-    
-    print(f"📝 Text formatted for natural TTS ({len(text)} -> {len(formatted_text)} chars)")
+    formatted_text = await _prepare_deepgram_text(text, title, author)
     
-    # Deepgram has a 2000 character limit per request. We must chunk.
-    def chunk_text_by_sentence(text, max_length=1900):
-        # Rough split by common sentence enders
-        sentences = text.replace('. ', '.|').replace('! ', '!|').replace('? ', '?|').split('|')
-        chunks = []
-        current_chunk = ""
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) < max_length:
-                current_chunk += sentence + " "
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        return chunks
+    cache_key = cache.cache_key("deepgram", deepgram_voice, formatted_text)
+    if await _restore_cached_audio(cache_key, output_path):
+        return output_path
 
     try:
-        def process_chunks():
-            chunks = chunk_text_by_sentence(formatted_text)
-            if len(chunks) > 1:
-                print(f"🔪 Text too long for single request. Split into {len(chunks)} chunks.")
-            
-            all_audio = b""
+        chunks = _chunk_text_for_deepgram(formatted_text)
+        if len(chunks) > 1:
+            logger.debug("Text too long for single request. Split into %d chunks.", len(chunks))
+        
+        # Stream each chunk's MP3 bytes straight into the output file
+        session = await get_session()
+        async with aiofiles.open(output_path, "wb") as f:
             for i, chunk in enumerate(chunks):
                 if not chunk.strip(): continue
                 payload = {"text": chunk}
-                print(f"  -> Sending chunk {i+1}/{len(chunks)} ({len(chunk)} chars)...")
-                response = requests.post(url, headers=headers, json=payload)
-                if response.status_code == 200:
-                    all_audio += response.content
-                else:
-                    error_msg = f"Deepgram API Error on chunk {i+1}: {response.status_code} - {response.text}"
-                    print(error_msg)
-                    raise Exception(error_msg)
-            
-            with open(output_path, "wb") as f:
-                f.write(all_audio)
-            return output_path
-            
-        result = await asyncio.to_thread(process_chunks)
-        print(f"✅ Deepgram audio saved: {result}")
-        return result
+                logger.debug("  -> Sending chunk %d/%d (%d chars)...", i + 1, len(chunks), len(chunk))
+                async with session.post(url, headers=headers, json=payload) as response:
+                    if response.status == 200:
+                        await _copy_response_body(response, f)
+                    else:
+                        error_msg = f"Deepgram API Error on chunk {i+1}: {response.status} - {await response.text()}"
+                        print(error_msg)
+                        raise Exception(error_msg)
+        
+        await _store_cached_audio(cache_key, output_path)
+        logger.debug("Deepgram audio saved: %s", output_path)
+        return output_path
     except Exception as e:
         print(f"❌ Deepgram failed: {e}")
         raise e
 
-async def generate_audio(text, output_path="audiobook.mp3", voice_id="pNInz6obpgDQGcFmaJgB", stability=0.5, similarity_boost=0.75, style=0.0, use_speaker_boost=True, provider="elevenlabs", speaking_rate=1.0, title=None, author=None):
+async def generate_audio(text, output_path="audiobook.mp3", voice_id="pNInz6obpgDQGcFmaJgB", stability=0.5, similarity_boost=0.75, style=0.0, use_speaker_boost=True, provider="elevenlabs", speaking_rate=1.0, title=None, author=None, use_ssml=False):
     """
     Generates audio using the specified provider with automatic fallback.
     Priority: Deepgram -> Edge TTS (inbuilt)
+    
+    Voice character comes from stability/similarity_boost/style. use_ssml adds an extra LLM
+    pass (generate_ssml) before ElevenLabs synthesis; other providers ignore SSML, so it's skipped for them.
     """
-    print(f"🎵 Generating audio with provider: {provider} (Rate: {speaking_rate})")
+    logger.debug("Generating audio with provider: %s (Rate: %s)", provider, speaking_rate)
+    if use_ssml and provider == "elevenlabs":
+        text = await generate_ssml(text)
     
     # Deepgram with automatic fallback to edge-tts
     if provider == "deepgram":
@@ -199,11 +343,11 @@ async def generate_audio(text, output_path="audiobook.mp3", voice_id="pNInz6obpg
         
     # Voice Clone (Colab XTTS v2)
     elif provider == "voice_clone":
-        from src.state import state
-        if not state.voice_sample_path or not state.colab_url:
+        from src.state import voice_clone_settings
+        if not voice_clone_settings.voice_sample_path or not voice_clone_settings.colab_url:
             print("⚠️ Voice sample or Colab URL missing. Falling back to Inbuilt (Edge TTS).")
             return await generate_audio_edge(text, output_path, voice_id, rate=speaking_rate)
-        return await generate_audio_voice_clone(text, output_path, state.voice_sample_path, state.colab_url)
+        return await generate_audio_voice_clone(text, output_path, voice_clone_settings.voice_sample_path, voice_clone_settings.colab_url)
     
     
     # Pollinations
@@ -225,16 +369,176 @@ async def generate_audio(text, output_path="audiobook.mp3", voice_id="pNInz6obpg
         print(f"⚠️  Unknown provider '{provider}'. Using Edge TTS.")
         return await generate_audio_edge(text, output_path, voice_id, rate=speaking_rate)
 
+async def _iter_file(path):
+    async with aiofiles.open(path, "rb") as f:
+        while data := await f.read(AUDIO_STREAM_CHUNK_SIZE):
+            yield data
+
+async def _streaming_tts_requests(text, voice_id, stability, similarity_boost, style, use_speaker_boost, provider, title, author):
+    """
+    (cache key, [(url, headers, payload), ...]) for providers with a streaming TTS endpoint, else None.
+    Keys match generate_audio_elevenlabs/generate_audio_deepgram, so streamed and file clips share the cache.
+    """
+    if provider == "elevenlabs" and ELEVENLABS_API_KEY:
+        url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}/stream"
+        headers = {"xi-api-key": ELEVENLABS_API_KEY, "Content-Type": "application/json"}
+        chunks = chunk_text_for_tts(text, max_chunk_size=ELEVENLABS_MAX_CHUNK_CHARS)
+        requests = [
+            (url, headers, _elevenlabs_payload(
+                chunk, stability, similarity_boost, style, use_speaker_boost,
+                previous_text=chunks[i - 1] if i > 0 else None,
+                next_text=chunks[i + 1] if i + 1 < len(chunks) else None
+            ))
+            for i, chunk in enumerate(chunks)
+        ]
+        key = cache.cache_key("elevenlabs", voice_id, stability, similarity_boost, style, use_speaker_boost, text)
+        return key, requests
+    
+    if provider == "deepgram" and DEEPGRAM_API_KEY:
+        deepgram_voice = get_deepgram_voice(voice_id)
+        url = f"https://api.deepgram.com/v1/speak?model={deepgram_voice}"
+        headers = {"Authorization": f"Token {DEEPGRAM_API_KEY}", "Content-Type": "application/json"}
+        formatted_text = await _prepare_deepgram_text(text, title, author)
+        requests = [(url, headers, {"text": chunk}) for chunk in _chunk_text_for_deepgram(formatted_text) if chunk.strip()]
+        return cache.cache_key("deepgram", deepgram_voice, formatted_text), requests
+    
+    return None
+
+async def stream_audio(text, output_path, voice_id="pNInz6obpgDQGcFmaJgB", stability=0.5, similarity_boost=0.75, style=0.0, use_speaker_boost=True, provider="elevenlabs", title=None, author=None):
+    """
+    Yields MP3 bytes as the provider produces them (ElevenLabs / Deepgram streaming TTS), so playback
+    can start after the first chunk. The bytes are also written to output_path for later download.
+    Other providers, and failures before the first byte, go through generate_audio and stream the finished file.
+    """
+    streaming = await _streaming_tts_requests(
+        text, voice_id, stability, similarity_boost, style, use_speaker_boost, provider, title, author
+    )
+    if streaming is not None:
+        key, requests = streaming
+        if await _restore_cached_audio(key, output_path):
+            async for data in _iter_file(output_path):
+                yield data
+            return
+        
+        session = await get_session()
+        sent = False
+        completed = False
+        try:
+            async with aiofiles.open(output_path, "wb") as f:
+                for url, headers, payload in requests:
+                    async with session.post(url, headers=headers, json=payload) as response:
+                        if response.status != 200:
+                            raise Exception(f"{provider} streaming error: {response.status} - {await response.text()}")
+                        # Forward whatever has arrived instead of waiting for full blocks
+                        async for data in response.content.iter_any():
+                            await f.write(data)
+                            sent = True
+                            yield data
+            completed = True
+        except Exception as e:
+            if sent:
+                raise  # Headers and audio are already out; the client sees a truncated stream
+            print(f"⚠️  {provider} streaming failed: {e}. Generating the full file instead.")
+        finally:
+            if not completed:
+                with contextlib.suppress(OSError):
+                    os.remove(output_path)
+        
+        if completed:
+            await _store_cached_audio(key, output_path)
+            return
+    
+    audio_file = await generate_audio(
+        text, output_path, voice_id=voice_id, stability=stability, similarity_boost=similarity_boost,
+        style=style, use_speaker_boost=use_speaker_boost, provider=provider, title=title, author=author
+    )
+    if not audio_file:
+        raise Exception("Audio generation failed")
+    async for data in _iter_file(audio_file):
+        yield data
+
+async def generate_audio_many(items, provider="elevenlabs", max_concurrency=8, **kwargs):
+    """
+    Generates several audio files concurrently.
+    
+    Args:
+        items: Iterable of (text, output_path) pairs
+        provider: TTS provider passed through to generate_audio
+        max_concurrency: Maximum number of in-flight provider requests
+        **kwargs: Extra generate_audio options (voice_id, stability, ...)
+    
+    Returns:
+        List of output paths in input order, None for items that failed.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def generate_one(text, output_path):
+        async with semaphore:
+            try:
+                return await generate_audio(text, output_path, provider=provider, **kwargs)
+            except Exception as e:
+                print(f"❌ Audio generation failed for {output_path}: {e}")
+                return None
+    
+    return await asyncio.gather(*(generate_one(text, path) for text, path in items))
+
+# Long texts are split into chunks of at most this many characters and synthesized concurrently
+ELEVENLABS_MAX_CHUNK_CHARS = 2500
+ELEVENLABS_MAX_CONCURRENCY = 4
+
+def _concatenate_files(part_paths, output_path):
+    """Joins MP3 segments in order (MPEG frames can simply be appended)."""
+    with open(output_path, "wb") as out:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                shutil.copyfileobj(part, out, AUDIO_STREAM_CHUNK_SIZE)
+
+def _elevenlabs_payload(chunk, stability, similarity_boost, style, use_speaker_boost, previous_text=None, next_text=None):
+    payload = {
+        "text": chunk,
+        "model_id": "eleven_multilingual_v2",
+        "voice_settings": {
+            "stability": stability,
+            "similarity_boost": similarity_boost,
+            "style": style,
+            "use_speaker_boost": use_speaker_boost
+        }
+    }
+    # Neighbouring text keeps prosody continuous across separately generated chunks
+    if previous_text:
+        payload["previous_text"] = previous_text
+    if next_text:
+        payload["next_text"] = next_text
+    return payload
+
+async def _post_elevenlabs(session, url, headers, payload, output_path):
+    async with session.post(url, headers=headers, json=payload) as response:
+        if response.status == 200:
+            # Stream the body to disk as it arrives instead of buffering it all
+            await _stream_response_to_file(response, output_path)
+            return
+        
+        error_text = await response.text()
+    
+    error_msg = f"ElevenLabs Error: {response.status} - {error_text}"
+    print(error_msg)
+    if response.status == 401:
+        if "missing_permissions" in error_text:
+            print("WARNING: ElevenLabs Key lacks 'text_to_speech' permission. Falling back to Edge TTS.")
+            raise Exception("ElevenLabs Key lacks 'text_to_speech' permission.")
+        else:
+            raise Exception("Invalid ElevenLabs API Key.")
+    raise Exception(error_msg)
+
 async def generate_audio_elevenlabs(text, output_path, voice_id, stability, similarity_boost, style, use_speaker_boost):
     """
     Generates audio using ElevenLabs API.
+    Long texts are chunked on paragraph/sentence boundaries and the chunks synthesized concurrently.
     """
-    print(f"Generating audio for {len(text)} characters using ElevenLabs ({voice_id})...")
+    logger.debug("Generating audio for %d characters using ElevenLabs (%s)...", len(text), voice_id)
     if not ELEVENLABS_API_KEY:
         print("ERROR: ELEVENLABS_API_KEY is missing!")
         raise Exception("ELEVENLABS_API_KEY is missing!")
-    else:
-        print(f"API Key present: {bool(ELEVENLABS_API_KEY)}")
     
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
     
@@ -243,55 +547,143 @@ async def generate_audio_elevenlabs(text, output_path, voice_id, stability, simi
         "Content-Type": "application/json"
     }
     
-    payload = {
-        "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": {
-            "stability": stability,
-            "similarity_boost": similarity_boost,
-            "style": style,
-            "use_speaker_boost": use_speaker_boost
-        }
-    }
+    def make_payload(chunk, previous_text=None, next_text=None):
+        return _elevenlabs_payload(
+            chunk, stability, similarity_boost, style, use_speaker_boost,
+            previous_text=previous_text, next_text=next_text
+        )
+    
+    cache_key = cache.cache_key("elevenlabs", voice_id, stability, similarity_boost, style, use_speaker_boost, text)
+    if await _restore_cached_audio(cache_key, output_path):
+        return output_path
     
     try:
-        # Run the blocking requests call in a thread pool to avoid blocking the event loop
-        def make_request():
-            return requests.post(url, headers=headers, json=payload)
+        session = await get_session()
+        chunks = chunk_text_for_tts(text, max_chunk_size=ELEVENLABS_MAX_CHUNK_CHARS)
         
-        response = await asyncio.to_thread(make_request)
-        
-        if response.status_code == 200:
-            # Write file in thread pool as well
-            def write_file():
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
-                return output_path
-            
-            result = await asyncio.to_thread(write_file)
-            print(f"Audio saved to {result}")
-            return result
+        if len(chunks) <= 1:
+            await _post_elevenlabs(session, url, headers, make_payload(text), output_path)
         else:
-            error_msg = f"ElevenLabs Error: {response.status_code} - {response.text}"
-            print(error_msg)
-            if response.status_code == 401:
-                if "missing_permissions" in response.text:
-                    print("WARNING: ElevenLabs Key lacks 'text_to_speech' permission. Falling back to Edge TTS.")
-                    raise Exception("ElevenLabs Key lacks 'text_to_speech' permission.")
-                else:
-                    raise Exception("Invalid ElevenLabs API Key.")
-            raise Exception(error_msg)
+            logger.debug("Split into %d chunks for concurrent synthesis.", len(chunks))
+            part_paths = [f"{output_path}.part{i}" for i in range(len(chunks))]
+            semaphore = asyncio.Semaphore(ELEVENLABS_MAX_CONCURRENCY)
+            
+            async def generate_part(i):
+                payload = make_payload(
+                    chunks[i],
+                    previous_text=chunks[i - 1] if i > 0 else None,
+                    next_text=chunks[i + 1] if i + 1 < len(chunks) else None
+                )
+                async with semaphore:
+                    await _post_elevenlabs(session, url, headers, payload, part_paths[i])
+            
+            try:
+                # TaskGroup cancels the remaining chunks as soon as one fails
+                async with asyncio.TaskGroup() as group:
+                    for i in range(len(chunks)):
+                        group.create_task(generate_part(i))
+                await asyncio.to_thread(_concatenate_files, part_paths, output_path)
+            finally:
+                for part_path in part_paths:
+                    with contextlib.suppress(OSError):
+                        os.remove(part_path)
+        
+        await _store_cached_audio(cache_key, output_path)
+        logger.debug("Audio saved to %s", output_path)
+        return output_path
             
     except Exception as e:
         print(f"Exception in ElevenLabs TTS: {e}")
         print("Falling back to Edge TTS...")
         return await generate_audio_edge(text, output_path, voice_id)
 
+# One multi-context WebSocket per voice: each text is its own context, all sharing one handshake
+ELEVENLABS_WS_URL = "wss://api.elevenlabs.io/v1/text-to-speech/{voice_id}/multi-stream-input"
+ELEVENLABS_WS_RECEIVE_TIMEOUT = 30
+
+async def generate_audio_elevenlabs_stream(items, voice_id, stability, similarity_boost, style, use_speaker_boost):
+    """
+    Synthesizes several texts for one voice over a single ElevenLabs WebSocket connection.
+    
+    Args:
+        items: List of (text, output_path) pairs
+    
+    Returns:
+        List of output paths in input order, None for items that did not complete
+        (callers fall back to generate_audio for those).
+    """
+    if not ELEVENLABS_API_KEY:
+        raise Exception("ELEVENLABS_API_KEY is missing!")
+    
+    voice_settings = {
+        "stability": stability,
+        "similarity_boost": similarity_boost,
+        "style": style,
+        "use_speaker_boost": use_speaker_boost
+    }
+    results = [None] * len(items)
+    pending = {}
+    for i, (text, output_path) in enumerate(items):
+        key = cache.cache_key("elevenlabs", voice_id, stability, similarity_boost, style, use_speaker_boost, text)
+        if await _restore_cached_audio(key, output_path):
+            results[i] = output_path
+        else:
+            pending[f"seg_{i}"] = (i, key)
+    if not pending:
+        return results
+    
+    audio = {context_id: bytearray() for context_id in pending}
+    finished = set()
+    session = await get_session()
+    url = ELEVENLABS_WS_URL.format(voice_id=voice_id)
+    params = {"model_id": "eleven_multilingual_v2", "output_format": "mp3_44100_128"}
+    
+    try:
+        async with session.ws_connect(url, params=params, headers={"xi-api-key": ELEVENLABS_API_KEY}) as ws:
+            for context_id, (i, _) in pending.items():
+                await ws.send_json({
+                    "text": items[i][0] + " ",
+                    "context_id": context_id,
+                    "voice_settings": voice_settings,
+                    "flush": True
+                })
+            # The server finishes every open context before closing the socket
+            await ws.send_json({"close_socket": True})
+            
+            while True:
+                msg = await ws.receive(timeout=ELEVENLABS_WS_RECEIVE_TIMEOUT)
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    break
+                data = msg.json()
+                context_id = data.get("contextId") or data.get("context_id")
+                if context_id not in audio:
+                    continue
+                if data.get("audio"):
+                    audio[context_id] += base64.b64decode(data["audio"])
+                # Only isFinal marks a context complete; one cut off by a close
+                # (even a normal one) goes back to generate_audio instead
+                if data.get("isFinal"):
+                    finished.add(context_id)
+                    if len(finished) == len(audio):
+                        break
+    except Exception as e:
+        print(f"⚠️  ElevenLabs stream failed: {e}")
+    
+    for context_id, (i, key) in pending.items():
+        if context_id not in finished or not audio[context_id]:
+            continue
+        output_path = items[i][1]
+        async with aiofiles.open(output_path, "wb") as f:
+            await f.write(audio[context_id])
+        await _store_cached_audio(key, output_path)
+        results[i] = output_path
+    return results
+
 async def generate_audio_pollinations(text, output_path, voice_id="nova", model="elevenlabs"):
     """
     Generates audio using Pollinations AI TTS API.
     """
-    print(f"Generating audio for {len(text)} characters using Pollinations AI ({voice_id})...")
+    logger.debug("Generating audio for %d characters using Pollinations AI (%s)...", len(text), voice_id)
     if not POLLINATIONS_API_KEY:
         raise Exception("POLLINATIONS_API_KEY is missing!")
     
@@ -303,11 +695,7 @@ async def generate_audio_pollinations(text, output_path, voice_id="nova", model=
     }
     
     # Use ElevenLabs mapped voice if requested
-    mapped_voice = voice_id
-    if voice_id == "pNInz6obpgDQGcFmaJgB":
-        mapped_voice = "onyx"
-    elif voice_id == "21m00Tcm4TlvDq8ikWAM":
-        mapped_voice = "nova"
+    mapped_voice = POLLINATIONS_VOICES.get(voice_id, voice_id)
     
     payload = {
         "model": model,
@@ -315,23 +703,20 @@ async def generate_audio_pollinations(text, output_path, voice_id="nova", model=
         "voice": mapped_voice
     }
     
+    cache_key = cache.cache_key("pollinations", model, mapped_voice, text)
+    if await _restore_cached_audio(cache_key, output_path):
+        return output_path
+    
     try:
-        def make_request():
-            return requests.post(url, headers=headers, json=payload, timeout=60)
-            
-        response = await asyncio.to_thread(make_request)
-        
-        if response.status_code == 200:
-            def write_file():
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
+        session = await get_session()
+        async with session.post(url, headers=headers, json=payload, timeout=aiohttp.ClientTimeout(total=60)) as response:
+            if response.status == 200:
+                await _stream_response_to_file(response, output_path)
+                await _store_cached_audio(cache_key, output_path)
+                logger.debug("Pollinations audio saved to %s", output_path)
                 return output_path
-                
-            result = await asyncio.to_thread(write_file)
-            print(f"✅ Pollinations audio saved to {result}")
-            return result
-        else:
-            error_msg = f"Pollinations API Error: {response.status_code} - {response.text}"
+            
+            error_msg = f"Pollinations API Error: {response.status} - {await response.text()}"
             print(error_msg)
             raise Exception(error_msg)
             
@@ -344,10 +729,7 @@ async def generate_audio_voice_clone(text, output_path, voice_sample_path, colab
     """
     Generates audio using a custom XTTS v2 model hosted on Google Colab via ngrok.
     """
-    import base64
-    import json
-    
-    print(f"Generating cloned audio for {len(text)} characters using Colab API...")
+    logger.debug("Generating cloned audio for %d characters using Colab API...", len(text))
     
     # Read the voice sample as base64
     try:
@@ -366,22 +748,15 @@ async def generate_audio_voice_clone(text, output_path, voice_sample_path, colab
     }
     
     try:
-        def make_request():
-            return requests.post(url, json=payload, timeout=120)  # 2 minute timeout since generation is slow
-            
-        response = await asyncio.to_thread(make_request)
-        
-        if response.status_code == 200:
-            def write_file():
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
+        session = await get_session()
+        # 2 minute timeout since generation is slow
+        async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=120)) as response:
+            if response.status == 200:
+                await _stream_response_to_file(response, output_path)
+                logger.debug("Cloned audio saved to %s", output_path)
                 return output_path
-                
-            result = await asyncio.to_thread(write_file)
-            print(f"✅ Cloned audio saved to {result}")
-            return result
-        else:
-            error_msg = f"Colab Voice Clone Error: {response.status_code} - {response.text}"
+            
+            error_msg = f"Colab Voice Clone Error: {response.status} - {await response.text()}"
             print(error_msg)
             raise Exception(error_msg)
             
@@ -404,22 +779,18 @@ async def generate_audio_edge(text, output_path, voice_id=None, rate=1.0):
             sign = "+" if percent >= 0 else ""
             rate_str = f"{sign}{percent}%"
             
-        print(f"Generating audio using Edge TTS (Rate: {rate_str})...")
-        
-        # Map ElevenLabs IDs to Edge Voices if possible, or use a default mapping
-        edge_voice = "en-US-ChristopherNeural" # Default
+        logger.debug("Generating audio using Edge TTS (Rate: %s)...", rate_str)
         
-        # Simple mapping for Podcast fallback
-        # Adam (Jax) -> Guy
-        # Rachel (Emma) -> Aria
-        if "pNInz6obpgDQGcFmaJgB" in str(voice_id): # Adam ID
-             edge_voice = "en-US-GuyNeural"
-        elif "21m00Tcm4TlvDq8ikWAM" in str(voice_id): # Rachel ID
-             edge_voice = "en-US-AriaNeural"
+        # Map ElevenLabs IDs to Edge Voices if possible, or use the default voice
+        edge_voice = EDGE_VOICES.get(voice_id, DEFAULT_EDGE_VOICE)
              
         communicate = edge_tts.Communicate(text, edge_voice, rate=rate_str)
-        await communicate.save(output_path)
-        print(f"Audio saved to {output_path}")
+        # Write audio chunks as they arrive instead of buffering the whole clip
+        async with aiofiles.open(output_path, "wb") as f:
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    await f.write(chunk["data"])
+        logger.debug("Audio saved to %s", output_path)
         return output_path
     except Exception as e:
         print(f"Edge TTS failed: {e}")
@@ -440,8 +811,6 @@ def enhance_text_for_natural_tts(text: str) -> str:
     Comprehensive text enhancement for natural Deepgram Aura-2 speech.
     Applies punctuation-based prosody control since Aura-2 doesn't support SSML.
     """
-    import re
-    
     # Skip if text is too short
     if len(text) < 50:
         return text
@@ -582,10 +951,9 @@ async def prepare_text_for_tts_with_llm(text: str, max_chars: int = 8000) -> str
         text = text[:max_chars]
     
     try:
-        from google import genai
         from src.prompts import TTS_PREPROCESSING_PROMPT
         
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = get_gemini_client(GEMINI_API_KEY)
         response = client.models.generate_content(
             model='gemini-2.0-flash',
             contents=TTS_PREPROCESSING_PROMPT.format(text=text)
@@ -611,8 +979,6 @@ def chunk_text_for_tts(text: str, max_chunk_size: int = 3000) -> list:
     Split text into natural chunks for TTS processing.
     Breaks at paragraph, sentence, or phrase boundaries.
     """
-    import re
-    
     if len(text) <= max_chunk_size:
         return [text]
     
@@ -661,8 +1027,6 @@ def slow_down_for_audiobook(text: str) -> str:
     Add extra pauses to slow down Deepgram Aura-2 speech for audiobook narration.
     Since Aura-2 doesn't have a speed parameter, we use punctuation to control pace.
     """
-    import re
-    
     result = text
     
     # === ADD PAUSES BETWEEN SENTENCES ===
@@ -763,10 +1127,9 @@ async def _process_audiobook_chunk(text: str, book_title: str, author: str,
                                    is_intro: bool = False, is_outro: bool = False) -> str:
     """Process a chunk of text through LLM for audiobook formatting."""
     from src.config import GEMINI_API_KEY
-    from google import genai
     from src.prompts import AUDIOBOOK_NARRATOR_PROMPT
     
-    client = genai.Client(api_key=GEMINI_API_KEY)
+    client = get_gemini_client(GEMINI_API_KEY)
     
     prompt = AUDIOBOOK_NARRATOR_PROMPT.format(
         text=text,
@@ -805,8 +1168,6 @@ def format_for_professional_narration(text: str, book_title: str = "", author: s
     Rule-based professional narration formatting (sync version).
     Adds proper pauses and formatting for audiobook quality.
     """
-    import re
-    
     result = text
     
     # === ADD INTRO ===
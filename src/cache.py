@@ -0,0 +1,113 @@
+"""On-disk content-addressed cache for expensive provider outputs (TTS audio, LLM JSON)."""
+
+import hashlib
+import mmap
+import os
+import shutil
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Kept outside temp_upload/, which is served publicly under /api/assets
+CACHE_DIR = os.path.join(BASE_DIR, ".cache")
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "2048"))  # Least recently used entries go first
+
+
+def cache_key(*parts) -> str:
+    """Build a short, stable hex key from the given parts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x1f")  # Separator so ("ab", "c") != ("a", "bc")
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Hash a file's contents, so identical uploads map to the same key."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        try:
+            # Hash straight from the page cache; no copy of the file in process memory
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest.update(mm)
+        except ValueError:
+            pass  # Empty files can't be mapped (and hash as empty input)
+    return digest.hexdigest()
+
+
+def _path_for(key: str) -> str:
+    return os.path.join(CACHE_DIR, key)
+
+
+def _touch(path: str) -> None:
+    """Mark an entry as recently used, so eviction keeps it."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict(max_bytes: Optional[int] = None) -> None:
+    """Delete the least recently used entries until the cache fits in max_bytes."""
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_MB * 1024 * 1024
+    files = []
+    try:
+        for entry in os.scandir(CACHE_DIR):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def get(key: str) -> Optional[bytes]:
+    """Return the cached bytes for key, or None on a miss."""
+    path = _path_for(key)
+    try:
+        with open(path, "rb") as f:
+            value = f.read()
+    except OSError:
+        return None
+    _touch(path)
+    return value
+
+
+def put(key: str, value: bytes) -> None:
+    """Store bytes under key (atomic replace, so readers never see partial data)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path_for(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(value)
+    os.replace(tmp_path, path)
+    evict()
+
+
+def get_file(key: str, dest_path: str) -> bool:
+    """Copy the cached entry for key to dest_path. Returns False on a miss."""
+    path = _path_for(key)
+    try:
+        shutil.copyfile(path, dest_path)
+    except OSError:
+        return False
+    _touch(path)
+    return True
+
+
+def put_file(key: str, src_path: str) -> None:
+    """Store a copy of src_path under key."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path_for(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, path)
+    evict()
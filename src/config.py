@@ -1,45 +1,58 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Optional
+from dotenv import dotenv_values
 
 # Force load from absolute path to ensure we find the .env file
 env_path = Path(__file__).parent.parent / '.env'
-print(f"Loading .env from: {env_path}")
-print(f"File exists: {env_path.exists()}")
-
-load_dotenv(dotenv_path=env_path, override=True)
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
-ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-BYTEZ_API_KEY = os.getenv("BYTEZ_API_KEY")
-DEAPI_API_KEY = os.getenv("DEAPI_API_KEY")
-POLLINATIONS_API_KEY = os.getenv("POLLINATIONS_API_KEY")
-
-# Debug print (masked)
-if OPENROUTER_API_KEY:
-    print(f" OPENROUTER_API_KEY loaded: {OPENROUTER_API_KEY[:5]}...{OPENROUTER_API_KEY[-4:]}")
-else:
-    print(" OPENROUTER_API_KEY NOT FOUND in environment")
-    # Try manual read as fallback
-    try:
-        if env_path.exists():
-            print("Attempting manual read of .env...")
-            with open(env_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip().startswith('OPENROUTER_API_KEY='):
-                        key = line.strip().split('=', 1)[1].strip()
-                        # Remove quotes if present
-                        if (key.startswith('"') and key.endswith('"')) or (key.startswith("'") and key.endswith("'")):
-                            key = key[1:-1]
-                        OPENROUTER_API_KEY = key
-                        print(f" Manually extracted OPENROUTER_API_KEY: {OPENROUTER_API_KEY[:5]}...")
-                        break
-    except Exception as e:
-        print(f"Manual read failed: {e}")
+
+# Set BOOK2VISION_DEBUG_CONFIG=1 to print where settings are loaded from
+DEBUG_CONFIG = os.getenv("BOOK2VISION_DEBUG_CONFIG", "").lower() in ("1", "true", "yes")
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    OPENAI_API_KEY: Optional[str]
+    GEMINI_API_KEY: Optional[str]
+    DEEPGRAM_API_KEY: Optional[str]
+    ELEVENLABS_API_KEY: Optional[str]
+    OPENROUTER_API_KEY: Optional[str]
+    DEEPSEEK_API_KEY: Optional[str]
+    BYTEZ_API_KEY: Optional[str]
+    DEAPI_API_KEY: Optional[str]
+    POLLINATIONS_API_KEY: Optional[str]
+
+@lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Parses .env once (its values override the process environment) and returns the settings."""
+    if DEBUG_CONFIG:
+        print(f"Loading .env from: {env_path}")
+        print(f"File exists: {env_path.exists()}")
+
+    env_values = dotenv_values(dotenv_path=env_path)
+    os.environ.update({k: v for k, v in env_values.items() if v is not None})
+
+    config = Config(**{name: os.getenv(name) for name in Config.__dataclass_fields__})
+
+    # Debug print (masked)
+    if DEBUG_CONFIG:
+        if config.OPENROUTER_API_KEY:
+            print(f" OPENROUTER_API_KEY loaded: {config.OPENROUTER_API_KEY[:5]}...{config.OPENROUTER_API_KEY[-4:]}")
+        else:
+            print(" OPENROUTER_API_KEY NOT FOUND in environment")
+    return config
+
+_config = get_config()
+OPENAI_API_KEY = _config.OPENAI_API_KEY
+GEMINI_API_KEY = _config.GEMINI_API_KEY
+DEEPGRAM_API_KEY = _config.DEEPGRAM_API_KEY
+ELEVENLABS_API_KEY = _config.ELEVENLABS_API_KEY
+OPENROUTER_API_KEY = _config.OPENROUTER_API_KEY
+DEEPSEEK_API_KEY = _config.DEEPSEEK_API_KEY
+BYTEZ_API_KEY = _config.BYTEZ_API_KEY
+DEAPI_API_KEY = _config.DEAPI_API_KEY
+POLLINATIONS_API_KEY = _config.POLLINATIONS_API_KEY
 
 # Audio Settings
 TTS_VOICE = "en-US-ChristopherNeural" # High quality male voice
@@ -1,5 +1,6 @@
 from typing import Optional, List
 from sqlmodel import Field, SQLModel, create_engine, Session, Relationship
+from sqlalchemy import event
 from datetime import datetime
 import os
 
@@ -9,11 +10,20 @@ DATABASE_URL = "sqlite:///./library.db"
 # Engine
 engine = create_engine(DATABASE_URL, echo=False)
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL appends commits to a log instead of rewriting pages in place, and
+    # synchronous=NORMAL fsyncs at checkpoints rather than on every commit.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
 class Book(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     author: str
-    filename: str
+    filename: str = Field(index=True)
     upload_date: datetime = Field(default_factory=datetime.utcnow)
     full_text: str = Field() # Defer loading large text
     
@@ -23,7 +33,7 @@ class Book(SQLModel, table=True):
 
 class Analysis(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    book_id: int = Field(foreign_key="book.id")
+    book_id: int = Field(foreign_key="book.id", index=True)
     summary: str
     entities_json: str # JSON string
     scenes_json: str # JSON string
@@ -34,7 +44,7 @@ class Analysis(SQLModel, table=True):
 
 class Image(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    book_id: int = Field(foreign_key="book.id")
+    book_id: int = Field(foreign_key="book.id", index=True)
     type: str # "cover", "scene", "entity"
     path: str
     prompt: Optional[str] = None
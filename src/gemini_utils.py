@@ -1,7 +1,13 @@
 from google import genai
+from google.genai import errors
+import asyncio
+import json
 import os
 import logging
+import threading
 import time
+from functools import lru_cache
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -10,6 +16,51 @@ logger = logging.getLogger(__name__)
 # Model cache to avoid repeated API calls
 _model_cache = {"models": None, "timestamp": 0}
 CACHE_TTL = 3600  # Cache for 1 hour
+# Persisted copy so fresh processes skip the listing round-trip while it is still fresh
+MODEL_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "book2vision", "gemini_models.json")
+# get_gemini_model is called from several worker threads
+_model_cache_lock = threading.Lock()
+# (capability, api_key) -> (model list timestamp, selected model name)
+_model_selections = {}
+
+def _load_model_cache():
+    try:
+        with open(MODEL_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data.get("models"), list):
+            _model_cache["models"] = data["models"]
+            _model_cache["timestamp"] = float(data.get("timestamp", 0))
+    except (OSError, ValueError, AttributeError):
+        pass
+
+def _save_model_cache():
+    try:
+        os.makedirs(os.path.dirname(MODEL_CACHE_PATH), exist_ok=True)
+        tmp_path = f"{MODEL_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_model_cache, f)
+        os.replace(tmp_path, MODEL_CACHE_PATH)
+    except OSError as e:
+        logger.warning(f"Could not persist model list: {e}")
+
+_load_model_cache()
+
+# Shared cap on in-flight Gemini generate calls, to stay under RPM limits
+GEMINI_MAX_CONCURRENCY = 4
+GEMINI_SEM = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Rate limits and transient server errors are worth retrying; anything else is not
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+@lru_cache(maxsize=8)
+def get_gemini_client(api_key=None):
+    """
+    Returns a genai.Client for the given API key, shared across calls.
+    
+    Clients are memoized per key so repeated requests reuse the same
+    underlying HTTP connection pool instead of rebuilding it every time.
+    """
+    return genai.Client(api_key=api_key)
 
 def get_gemini_model(capability="text", api_key=None):
     """
@@ -29,7 +80,17 @@ def get_gemini_model(capability="text", api_key=None):
         logger.error("GEMINI_API_KEY not found.")
         raise ValueError("GEMINI_API_KEY not found.")
 
-    client = genai.Client(api_key=api_key)
+    client = get_gemini_client(api_key)
+    
+    # Fast path: same capability already resolved against the current (fresh) model list
+    selection_key = (capability, api_key)
+    cached_selection = _model_selections.get(selection_key)
+    if (
+        cached_selection is not None
+        and cached_selection[0] == _model_cache["timestamp"]
+        and time.time() - _model_cache["timestamp"] <= CACHE_TTL
+    ):
+        return client, cached_selection[1]
     
     # Preferred models by capability (Updated with older models for fallback)
     preferences = {
@@ -40,38 +101,39 @@ def get_gemini_model(capability="text", api_key=None):
     
     preferred_list = preferences.get(capability, preferences["text"])
     
-    # Check cache first
-    current_time = time.time()
-    if _model_cache["models"] is None or (current_time - _model_cache["timestamp"]) > CACHE_TTL:
-        # Cache miss or expired - refresh
-        available_models = []
-        try:
-            print("--- Checking Available Gemini Models (caching) ---")
-            # New SDK model listing
-            for m in client.models.list():
-                # The new SDK returns model objects with .name like "models/gemini-1.5-flash"
-                # We want to check if it supports generateContent, but the new SDK object might differ.
-                # Assuming all listed models are usable or we filter by name.
-                # The new SDK model object has 'supported_generation_methods' usually.
-                # Let's just grab the name and strip "models/"
-                clean_name = m.name.replace("models/", "")
-                available_models.append(clean_name)
-                print(f"Found model: {clean_name}")
-            print("----------------------------------------")
-            _model_cache["models"] = available_models
-            _model_cache["timestamp"] = current_time
-        except Exception as e:
-            logger.warning(f"Could not list models (API key: {api_key[:10] if api_key else 'None'}...): {e}. Using defaults.")
-            print(f"Error listing models: {e}")
-            # If cache exists, use stale data
-            if _model_cache["models"] is not None:
-                available_models = _model_cache["models"]
-            else:
-                available_models = []
-    else:
-        # Cache hit
-        available_models = _model_cache["models"]
-        print(f"Using cached model list ({len(available_models)} models)")
+    with _model_cache_lock:
+        # Check cache first
+        current_time = time.time()
+        if _model_cache["models"] is None or (current_time - _model_cache["timestamp"]) > CACHE_TTL:
+            # Cache miss or expired - refresh
+            available_models = []
+            try:
+                logger.debug("Listing available Gemini models (caching)")
+                # New SDK model listing
+                for m in client.models.list():
+                    # The new SDK returns model objects with .name like "models/gemini-1.5-flash"
+                    # We want to check if it supports generateContent, but the new SDK object might differ.
+                    # Assuming all listed models are usable or we filter by name.
+                    # The new SDK model object has 'supported_generation_methods' usually.
+                    # Let's just grab the name and strip "models/"
+                    clean_name = m.name.replace("models/", "")
+                    available_models.append(clean_name)
+                    logger.debug("Found model: %s", clean_name)
+                _model_cache["models"] = available_models
+                _model_cache["timestamp"] = current_time
+                _save_model_cache()
+            except Exception as e:
+                logger.warning(f"Could not list models (API key: {api_key[:10] if api_key else 'None'}...): {e}. Using defaults.")
+                print(f"Error listing models: {e}")
+                # If cache exists, use stale data
+                if _model_cache["models"] is not None:
+                    available_models = _model_cache["models"]
+                else:
+                    available_models = []
+        else:
+            # Cache hit
+            available_models = _model_cache["models"]
+            logger.debug("Using cached model list (%d models)", len(available_models))
 
     # Find first match
     selected_model_name = None
@@ -95,5 +157,39 @@ def get_gemini_model(capability="text", api_key=None):
             logger.warning(f"Model listing failed. Defaulting to: {selected_model_name}")
     else:
         logger.info(f"Selected Gemini model: {selected_model_name}")
+        
+    # Only remember selections made against a real listing (it rotates with the timestamp)
+    if available_models and _model_cache["models"] is available_models:
+        _model_selections[selection_key] = (_model_cache["timestamp"], selected_model_name)
 
     return client, selected_model_name
+
+def _is_retryable(exc):
+    if isinstance(exc, errors.APIError):
+        return exc.code in RETRYABLE_STATUS_CODES
+    return "429" in str(exc)  # Fallback if the error type isn't an APIError
+
+def _log_retry(retry_state):
+    wait = retry_state.next_action.sleep if retry_state.next_action else 0
+    print(f"⚠️ Gemini call failed ({retry_state.outcome.exception()}). Retrying in {wait:.1f}s...")
+
+async def generate_with_retry(client, model_name, contents, config=None):
+    """
+    Runs client.models.generate_content off the event loop, with exponential
+    backoff on rate-limit/transient errors and at most GEMINI_MAX_CONCURRENCY calls in flight.
+    """
+    async with GEMINI_SEM:
+        async for attempt in AsyncRetrying(
+            wait=wait_exponential_jitter(initial=2, max=30),
+            stop=stop_after_attempt(5),
+            retry=retry_if_exception(_is_retryable),
+            before_sleep=_log_retry,
+            reraise=True
+        ):
+            with attempt:
+                return await asyncio.to_thread(
+                    client.models.generate_content,
+                    model=model_name,
+                    contents=contents,
+                    config=config
+                )
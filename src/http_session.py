@@ -0,0 +1,44 @@
+"""Process-wide aiohttp session shared by outbound provider calls.
+
+Reusing one session keeps a warm keep-alive connection pool, so repeated
+calls to the same provider skip the TCP + TLS handshake.
+"""
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+MAX_CONNECTIONS = 32
+KEEPALIVE_TIMEOUT_SECONDS = 75
+DNS_CACHE_TTL_SECONDS = 300
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=120)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """Return the shared session, creating it lazily on the running event loop."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                keepalive_timeout=KEEPALIVE_TIMEOUT_SECONDS,
+                ttl_dns_cache=DNS_CACHE_TTL_SECONDS
+            ),
+            timeout=DEFAULT_TIMEOUT
+        )
+        _session_loop = loop
+    return _session
+
+
+async def close_session():
+    """Close the shared session (called on application shutdown)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
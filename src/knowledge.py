@@ -1,12 +1,25 @@
+import asyncio
+import aiohttp
 import json
 import os
 import random
-# spaCy imported lazily in load_spacy() to avoid startup overhead if not needed
+import re
+import threading
+from collections import OrderedDict
+# spaCy and the Gemini SDK (via src.gemini_utils) are imported lazily where used,
+# so importing this module doesn't pull in either stack
 from src.config import GEMINI_API_KEY
-from google import genai
-from src.gemini_utils import get_gemini_model
+from src.http_session import get_session
+from src.rate_limit import openrouter_limiter
+from src.tokens import truncate_tokens
+from src.semantic_cache import LLMSemanticCache
+try:
+    from orjson import loads as _json_loads  # C parser for LLM/cached JSON payloads
+except ImportError:
+    from json import loads as _json_loads
 
 nlp = None
+_nlp_lock = threading.Lock()
 
 def get_referer():
     """Get HTTP referer URL with correct port from environment."""
@@ -21,149 +34,252 @@ def load_spacy():
         Loaded spaCy model or None if loading fails.
     """
     global nlp
-    if nlp is None:
-        try:
-            import spacy
-            nlp = spacy.load("en_core_web_sm")
-        except Exception as e:
-            print(f"Warning: Spacy load failed: {e}")
-            print("Install with: python -m spacy download en_core_web_sm")
-            nlp = None
+    with _nlp_lock:
+        if nlp is None:
+            try:
+                import spacy
+                # The quiz only needs sentences and POS tags: skip parser/NER/lemmatizer
+                # and use the much lighter statistical sentence segmenter instead
+                nlp = spacy.load("en_core_web_sm", exclude=["parser", "ner", "lemmatizer"])
+                if "senter" in nlp.pipe_names or "senter" in nlp.disabled:
+                    nlp.enable_pipe("senter")
+                else:
+                    nlp.add_pipe("sentencizer")
+            except Exception as e:
+                print(f"Warning: Spacy load failed: {e}")
+                print("Install with: python -m spacy download en_core_web_sm")
+                nlp = None
     return nlp
 
-def generate_flashcards(text, output_path="flashcards.json"):
+def preload_spacy():
+    """Loads the spaCy pipeline in a background thread so the first quiz doesn't pay for it."""
+    threading.Thread(target=load_spacy, name="spacy-preload", daemon=True).start()
+
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_TIMEOUT = aiohttp.ClientTimeout(total=30)
+OPENROUTER_MAX_RETRIES = 3
+# Transient statuses worth retrying (429 honours Retry-After, the rest back off exponentially)
+OPENROUTER_RETRY_STATUSES = {429, 502, 503, 504}
+
+_JSON_DECODER = json.JSONDecoder()
+
+DEFAULT_SUGGESTED_QUESTIONS = ["What is the plot?", "Who are the characters?"]
+
+def _decode_json_block(content, openers="[{"):
+    """
+    Decodes the first JSON value starting at one of `openers`, ignoring any code fence
+    or prose around it (raw_decode stops at the end of the value). Raises ValueError if none.
+    """
+    starts = [i for i in (content.find(c) for c in openers) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON value in response")
+    value, _ = _JSON_DECODER.raw_decode(content, min(starts))
+    return value
+
+def _openrouter_headers(api_key):
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": get_referer(),
+        "X-Title": "Book2Vision"
+    }
+
+async def _deepseek_chat(prompt, api_key):
+    """Sends a single-message chat to DeepSeek via OpenRouter. Returns the reply text or None."""
+    headers = _openrouter_headers(api_key)
+    data = {
+        "model": "deepseek/deepseek-chat",
+        "messages": [
+            {"role": "user", "content": prompt}
+        ]
+    }
+    session = await get_session()
+    for attempt in range(OPENROUTER_MAX_RETRIES + 1):
+        async with openrouter_limiter.acquire():
+            async with session.post(OPENROUTER_CHAT_URL, headers=headers, json=data, timeout=OPENROUTER_TIMEOUT) as response:
+                if response.status == 200:
+                    result = await response.json(content_type=None)
+                    return result['choices'][0]['message']['content']
+                retry_after = response.headers.get("Retry-After")
+        
+        print(f"OpenRouter Error: {response.status}")
+        if response.status not in OPENROUTER_RETRY_STATUSES or attempt == OPENROUTER_MAX_RETRIES:
+            return None
+        # Back off outside the limiter so other callers keep their slots
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+        print(f"⚠️ OpenRouter returned {response.status}. Retrying in {delay}s...")
+        await asyncio.sleep(delay)
+    return None
+
+async def _deepseek_chat_stream(prompt, api_key):
+    """Streams a DeepSeek reply via OpenRouter (SSE), yielding text deltas. Yields nothing on failure."""
+    data = {
+        "model": "deepseek/deepseek-chat",
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "stream": True
+    }
+    session = await get_session()
+    async with openrouter_limiter.acquire():
+        async with session.post(OPENROUTER_CHAT_URL, headers=_openrouter_headers(api_key), json=data, timeout=OPENROUTER_TIMEOUT) as response:
+            if response.status != 200:
+                print(f"OpenRouter Error: {response.status}")
+                return
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                # Skip blank separators and SSE comments (": OPENROUTER PROCESSING")
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    delta = _json_loads(payload)["choices"][0]["delta"].get("content")
+                except (ValueError, KeyError, IndexError):
+                    continue
+                if delta:
+                    yield delta
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+# Runs of text between periods (same pieces as text.split('.'), yielded lazily)
+_SENTENCE_RE = re.compile(r'[^.]+')
+
+async def generate_flashcards(text, output_path="flashcards.json"):
     """
-    Generates flashcards from text.
+    Generates flashcards from text with a simple "X is a Y" heuristic.
     """
     print("Generating flashcards...")
     flashcards = []
-    sentences = text.split('.')
-    for sentence in sentences:
-        if "is a" in sentence and len(sentence) < 100:
+    for match in _SENTENCE_RE.finditer(text):
+        # Check the span length before slicing so long sentences are never copied out
+        if match.end() - match.start() >= 100:
+            continue
+        sentence = match.group()
+        if "is a" in sentence:
             parts = sentence.split("is a")
             flashcards.append({
                 "front": parts[0].strip(),
                 "back": parts[1].strip()
             })
     
-    with open(output_path, 'w') as f:
-        json.dump(flashcards, f, indent=4)
-    
+    await asyncio.to_thread(_write_json, output_path, flashcards)
     return output_path
 
-def generate_quizzes(text, output_path="quiz.json"):
+async def generate_quizzes(text, output_path="quiz.json"):
     """
     Generates quizzes. Uses DeepSeek if available, then Gemini, else Spacy fallback.
     """
     print("Generating quiz...")
     
     if os.getenv("DEEPSEEK_API_KEY"):
-        return generate_quiz_with_deepseek(text, output_path)
+        return await generate_quiz_with_deepseek(text, output_path)
     elif os.getenv("GEMINI_API_KEY"):
-        return generate_quiz_with_llm(text, output_path)
+        return await generate_quiz_with_llm(text, output_path)
     else:
-        return generate_quiz_with_spacy(text, output_path)
+        return await asyncio.to_thread(generate_quiz_with_spacy, text, output_path)
 
-def generate_quiz_with_deepseek(text, output_path):
+async def generate_quiz_with_deepseek(text, output_path):
     print("Using DeepSeek (via OpenRouter) for Quiz Generation...")
     api_key = os.getenv("DEEPSEEK_API_KEY")
     if not api_key:
-        return generate_quiz_with_llm(text, output_path)
+        return await generate_quiz_with_llm(text, output_path)
 
     try:
-        import requests
-        
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": get_referer(),
-            "X-Title": "Book2Vision"
-        }
-        
         prompt = f"""
         Generate 5 multiple choice questions based on the following text.
         Return the result as a JSON array of objects with keys: question, options (list of 4 strings), answer (string).
         Ensure the JSON is valid and strictly follows the format.
         
-        Text: {text[:3000]}
+        Text: {truncate_tokens(text, QUIZ_CONTEXT_TOKENS)}
         """
         
-        data = {
-            "model": "deepseek/deepseek-chat", # Or specific deepseek model supported by OpenRouter
-            "messages": [
-                {"role": "user", "content": prompt}
-            ]
-        }
-        
-        response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=30)
-        
-        print(f"OpenRouter Suggestion Status: {response.status_code}")
-        print(f"OpenRouter Suggestion Response: {response.text}")
-        
-        if response.status_code == 200:
-            result = response.json()
-            content = result['choices'][0]['message']['content']
+        content = await _deepseek_chat(prompt, api_key)
+        if content is None:
+            return await generate_quiz_with_llm(text, output_path)
             
-            # Clean up response text
-            content = content.strip()
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-                
-            quiz_data = json.loads(content)
+        quiz_data = _decode_json_block(content)
+        
+        # Handle if it returns a dict with a key like "questions"
+        if isinstance(quiz_data, dict) and "questions" in quiz_data:
+            quiz_data = quiz_data["questions"]
             
-            # Handle if it returns a dict with a key like "questions"
-            if isinstance(quiz_data, dict) and "questions" in quiz_data:
-                quiz_data = quiz_data["questions"]
-                
-            with open(output_path, 'w') as f:
-                json.dump(quiz_data, f, indent=4)
-            return output_path
-        else:
-            print(f"DeepSeek API Error: {response.status_code} - {response.text}")
-            return generate_quiz_with_llm(text, output_path)
+        await asyncio.to_thread(_write_json, output_path, quiz_data)
+        return output_path
             
     except Exception as e:
         print(f"Error generating quiz with DeepSeek: {e}. Falling back to Gemini.")
-        return generate_quiz_with_llm(text, output_path)
+        return await generate_quiz_with_llm(text, output_path)
 
-def generate_quiz_with_llm(text, output_path):
+async def generate_quiz_with_llm(text, output_path):
     print("Using Gemini for Quiz Generation...")
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
-        return generate_quiz_with_spacy(text, output_path)
+        return await asyncio.to_thread(generate_quiz_with_spacy, text, output_path)
         
     try:
+        from src.gemini_utils import get_gemini_model, generate_with_retry
         client, model_name = get_gemini_model(capability="text", api_key=api_key)
         
         prompt = f"""
         Generate 5 multiple choice questions based on the following text.
         Return the result as a JSON array of objects with keys: question, options (list of 4 strings), answer (string).
         
-        Text: {text[:3000]}
+        Text: {truncate_tokens(text, QUIZ_CONTEXT_TOKENS)}
         """
         
-        response = client.models.generate_content(model=model_name, contents=prompt)
-        # Clean up response text
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-            
-        quiz_data = json.loads(response_text)
+        response = await generate_with_retry(client, model_name, prompt)
+        quiz_data = _decode_json_block(response.text)
         
         # Handle if it returns a dict with a key like "questions"
         if isinstance(quiz_data, dict) and "questions" in quiz_data:
             quiz_data = quiz_data["questions"]
             
-        with open(output_path, 'w') as f:
-            json.dump(quiz_data, f, indent=4)
+        await asyncio.to_thread(_write_json, output_path, quiz_data)
         return output_path
     except Exception as e:
         print(f"Error generating quiz with Gemini: {e}. Falling back to Spacy.")
-        return generate_quiz_with_spacy(text, output_path)
+        return await asyncio.to_thread(generate_quiz_with_spacy, text, output_path)
+
+def _quiz_from_doc(doc):
+    """Builds up to 5 fill-in-the-blank questions from a tagged spaCy Doc."""
+    import numpy as np
+    from spacy.attrs import POS, IS_STOP
+    from spacy.symbols import NOUN, PROPN
+    
+    quiz = []
+    
+    # Token attributes as one (n_tokens, 2) array, masked in bulk instead of
+    # reading token.pos_ / token.is_stop per token
+    attrs = doc.to_array([POS, IS_STOP])
+    is_candidate = np.isin(attrs[:, 0], (NOUN, PROPN)) & (attrs[:, 1] == 0)
+    
+    # One pass over the parsed Doc: keep sentence spans that have a noun or entity to mask
+    # (their tokens are already tagged, so nothing is re-parsed per sentence)
+    eligible = []
+    for sent in doc.sents:
+        if not 20 < sent.end_char - sent.start_char < 150:
+            continue
+        candidates = np.flatnonzero(is_candidate[sent.start:sent.end])
+        if candidates.size:
+            eligible.append((sent.text.strip(), candidates + sent.start))
+    
+    for sent_text, candidates in random.sample(eligible, min(5, len(eligible))):
+        # Only the chosen token is materialized as a Token object
+        target = doc[int(random.choice(candidates))]
+        question = sent_text.replace(target.text, "______")
+        quiz.append({
+            "question": f"Fill in the blank: {question}",
+            "options": ["(Write the answer)"],
+            "answer": target.text
+        })
+    return quiz
 
 def generate_quiz_with_spacy(text, output_path):
     print("Using Spacy for Fill-in-the-blank Quiz...")
@@ -172,103 +288,188 @@ def generate_quiz_with_spacy(text, output_path):
         print("Spacy not loaded. Cannot generate quiz.")
         return None
         
-    doc = nlp_model(text)
-    quiz = []
-    
-    # Find sentences with entities or nouns
-    sentences = [sent.text.strip() for sent in doc.sents if len(sent.text) > 20 and len(sent.text) < 150]
-    selected_sentences = random.sample(sentences, min(5, len(sentences)))
-    
-    for sent in selected_sentences:
-        sent_doc = nlp_model(sent)
-        # Pick a noun or entity to mask
-        candidates = [token for token in sent_doc if token.pos_ in ["NOUN", "PROPN"] and not token.is_stop]
-        if candidates:
-            target = random.choice(candidates)
-            question = sent.replace(target.text, "______")
-            quiz.append({
-                "question": f"Fill in the blank: {question}",
-                "options": ["(Write the answer)"],
-                "answer": target.text
-            })
+    quiz = _quiz_from_doc(nlp_model(text))
             
     with open(output_path, 'w') as f:
         json.dump(quiz, f, indent=4)
     return output_path
 
-def ask_question(context, question):
+def generate_quizzes_bulk(texts, output_paths, n_process=2, batch_size=16):
+    """
+    Generates spaCy fill-in-the-blank quizzes for many books at once.
+    Texts are streamed through nlp.pipe so tokenizer/tagger work is batched,
+    and spread over n_process worker processes (forked; Linux default).
+    
+    Returns:
+        list of written output paths (empty if spaCy isn't available).
+    """
+    nlp_model = load_spacy()
+    if not nlp_model:
+        print("Spacy not loaded. Cannot generate quizzes.")
+        return []
+    
+    n_process = max(1, min(n_process, len(texts)))
+    docs = nlp_model.pipe(texts, batch_size=batch_size, n_process=n_process)
+    for doc, output_path in zip(docs, output_paths):
+        with open(output_path, 'w') as f:
+            json.dump(_quiz_from_doc(doc), f, indent=4)
+    return list(output_paths)
+
+# Fixed-size context budgets (in tokens): every prompt about the same book shares an
+# identical prefix (instructions + context), which providers with prompt caching prefill once
+QA_CONTEXT_TOKENS = 3000
+SUGGEST_CONTEXT_TOKENS = 1500
+QUIZ_CONTEXT_TOKENS = 800
+
+QA_PROMPT_PREFIX = """
+You are an AI assistant helping a user understand a book.
+Answer the question based ONLY on the provided context.
+Keep the answer concise (max 3 sentences).
+
+Context: {context}...
+
+"""
+
+SUGGEST_PROMPT = """
+Generate 2 interesting questions a reader might ask about this book.
+Return ONLY a JSON array of strings. Example: ["Question 1?", "Question 2?"]
+
+Context: {context}...
+"""
+
+# Recent answers, so repeated UI questions skip the LLM round trip
+QA_ANSWER_CACHE_SIZE = 64
+_qa_answers = OrderedDict()
+# Paraphrases of earlier questions about the same book (checked after the exact-match cache)
+qa_semantic_cache = LLMSemanticCache()
+
+def _qa_prompt(context, question):
+    # The variable part (the question) goes last, after the stable prefix
+    return QA_PROMPT_PREFIX.format(context=truncate_tokens(context, QA_CONTEXT_TOKENS)) + f"Question: {question}\n"
+
+def _suggest_prompt(context):
+    return SUGGEST_PROMPT.format(context=truncate_tokens(context, SUGGEST_CONTEXT_TOKENS))
+
+def _qa_answer_key(context, question):
+    return (hash(truncate_tokens(context, QA_CONTEXT_TOKENS)), question.strip())
+
+def _remember_answer(key, answer, embedding=None):
+    _qa_answers[key] = answer
+    _qa_answers.move_to_end(key)
+    while len(_qa_answers) > QA_ANSWER_CACHE_SIZE:
+        _qa_answers.popitem(last=False)
+    # key[0] identifies the book context, so similar questions only match within one book
+    qa_semantic_cache.insert(key[0], embedding, answer)
+
+async def _cached_answer(key, question):
+    """
+    Returns (answer or None, question embedding). Exact repeats are answered from the LRU;
+    otherwise the semantic cache is checked for a near-duplicate question.
+    """
+    if key in _qa_answers:
+        _qa_answers.move_to_end(key)
+        return _qa_answers[key], None
+    embedding = await qa_semantic_cache.embed(question)
+    answer = qa_semantic_cache.lookup(key[0], embedding)
+    if answer is not None:
+        print(f"Reusing answer to a similar question: {question}")
+        _remember_answer(key, answer)
+    return answer, embedding
+
+async def ask_question(context, question):
     """
     Answers a question based on the book context. Tries DeepSeek first, then Gemini.
     """
+    key = _qa_answer_key(context, question)
+    answer, embedding = await _cached_answer(key, question)
+    if answer is not None:
+        return answer
+    
     # Try DeepSeek/OpenRouter first
     api_key = os.getenv("DEEPSEEK_API_KEY")
     if api_key:
         print(f"Asking DeepSeek: {question}")
         try:
-            import requests
-            
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": get_referer(),
-                "X-Title": "Book2Vision"
-            }
-            
-            prompt = f"""
-            You are an AI assistant helping a user understand a book.
-            Answer the question based ONLY on the provided context.
-            Keep the answer concise (max 3 sentences).
-            
-            Context: {context[:10000]}...
-            
-            Question: {question}
-            """
-            
-            data = {
-                "model": "deepseek/deepseek-chat",
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            }
-            
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content'].strip()
-            else:
-                print(f"OpenRouter Error: {response.status_code}. Falling back to Gemini.")
+            prompt = _qa_prompt(context, question)
+            content = await _deepseek_chat(prompt, api_key)
+            if content is not None:
+                answer = content.strip()
+                _remember_answer(key, answer, embedding)
+                return answer
+            print("OpenRouter failed. Falling back to Gemini.")
         except Exception as e:
             print(f"DeepSeek Error: {e}. Falling back to Gemini.")
 
     # Fallback to Gemini
-    return ask_question_with_gemini(context, question)
+    return await ask_question_with_gemini(context, question, embedding)
 
-def ask_question_with_gemini(context, question):
+async def ask_question_with_gemini(context, question, embedding=None):
     print(f"Asking Gemini: {question}")
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         return "No API keys available for Q&A."
         
     try:
+        from src.gemini_utils import get_gemini_model, generate_with_retry
         client, model_name = get_gemini_model(capability="text", api_key=api_key)
         
-        prompt = f"""
-        You are an AI assistant helping a user understand a book.
-        Answer the question based ONLY on the provided context.
-        Keep the answer concise (max 3 sentences).
-        
-        Context: {context[:10000]}...
-        
-        Question: {question}
-        """
-        
-        response = client.models.generate_content(model=model_name, contents=prompt)
-        return response.text.strip()
+        prompt = _qa_prompt(context, question)
+        response = await generate_with_retry(client, model_name, prompt)
+        answer = response.text.strip()
+        _remember_answer(_qa_answer_key(context, question), answer, embedding)
+        return answer
     except Exception as e:
         return f"Error with Gemini: {str(e)}"
 
-def suggest_questions(context):
+async def ask_question_stream(context, question):
+    """
+    Streams an answer as text chunks so the UI can show the first tokens right away.
+    Tries DeepSeek first, then Gemini.
+    """
+    key = _qa_answer_key(context, question)
+    answer, embedding = await _cached_answer(key, question)
+    if answer is not None:
+        yield answer
+        return
+    
+    prompt = _qa_prompt(context, question)
+    parts = []
+    
+    api_key = os.getenv("DEEPSEEK_API_KEY")
+    if api_key:
+        print(f"Streaming answer from DeepSeek: {question}")
+        try:
+            async for delta in _deepseek_chat_stream(prompt, api_key):
+                parts.append(delta)
+                yield delta
+            if parts:
+                _remember_answer(key, "".join(parts).strip(), embedding)
+        except Exception as e:
+            print(f"DeepSeek stream error: {e}")
+        if parts:
+            return
+        print("OpenRouter stream failed. Falling back to Gemini.")
+    
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        yield "No API keys available for Q&A."
+        return
+    
+    print(f"Streaming answer from Gemini: {question}")
+    try:
+        from src.gemini_utils import get_gemini_model, GEMINI_SEM
+        client, model_name = get_gemini_model(capability="text", api_key=api_key)
+        async with GEMINI_SEM:
+            stream = await client.aio.models.generate_content_stream(model=model_name, contents=prompt)
+            async for chunk in stream:
+                if chunk.text:
+                    parts.append(chunk.text)
+                    yield chunk.text
+        _remember_answer(key, "".join(parts).strip(), embedding)
+    except Exception as e:
+        yield f"Error with Gemini: {str(e)}"
+
+async def suggest_questions(context):
     """
     Suggests 2 interesting questions. Tries DeepSeek first, then Gemini.
     """
@@ -278,74 +479,40 @@ def suggest_questions(context):
     api_key = os.getenv("DEEPSEEK_API_KEY")
     if api_key:
         try:
-            import requests
-            
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": get_referer(),
-                "X-Title": "Book2Vision"
-            }
-            
-            prompt = f"""
-            Generate 2 interesting questions a reader might ask about this book.
-            Return ONLY a JSON array of strings. Example: ["Question 1?", "Question 2?"]
-            
-            Context: {context[:5000]}...
-            """
-            
-            data = {
-                "model": "deepseek/deepseek-chat",
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            }
-            
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions", headers=headers, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
-                return parse_json_list(content)
-            else:
-                print(f"OpenRouter Suggestion Error: {response.status_code}. Falling back to Gemini.")
+            prompt = _suggest_prompt(context)
+            content = await _deepseek_chat(prompt, api_key)
+            if content is not None:
+                return parse_json_list(content.strip())
+            print("OpenRouter suggestion failed. Falling back to Gemini.")
         except Exception as e:
             print(f"DeepSeek Suggestion Error: {e}. Falling back to Gemini.")
 
     # Fallback to Gemini
-    return suggest_questions_with_gemini(context)
+    return await suggest_questions_with_gemini(context)
 
-def suggest_questions_with_gemini(context):
+async def suggest_questions_with_gemini(context):
     print("Using Gemini for Suggested Questions...")
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
-        return ["What is the plot?", "Who are the characters?"]
+        return list(DEFAULT_SUGGESTED_QUESTIONS)
         
     try:
+        from src.gemini_utils import get_gemini_model, generate_with_retry
         client, model_name = get_gemini_model(capability="text", api_key=api_key)
         
-        prompt = f"""
-        Generate 2 interesting questions a reader might ask about this book.
-        Return ONLY a JSON array of strings. Example: ["Question 1?", "Question 2?"]
-        
-        Context: {context[:5000]}...
-        """
-        
-        response = client.models.generate_content(model=model_name, contents=prompt)
+        prompt = _suggest_prompt(context)
+        response = await generate_with_retry(client, model_name, prompt)
         return parse_json_list(response.text.strip())
     except Exception as e:
         print(f"Gemini Suggestion Error: {e}")
-        return ["What is the plot?", "Who are the characters?"]
+        return list(DEFAULT_SUGGESTED_QUESTIONS)
 
 def parse_json_list(content):
     try:
-        if content.startswith("```json"):
-            content = content[7:]
-        if content.endswith("```"):
-            content = content[:-3]
-        return json.loads(content)
-    except:
-        return ["What is the plot?", "Who are the characters?"]
+        value = _decode_json_block(content, "[")
+    except ValueError:
+        return list(DEFAULT_SUGGESTED_QUESTIONS)
+    return value if isinstance(value, list) else list(DEFAULT_SUGGESTED_QUESTIONS)
 
 def generate_mindmap(text, output_path="mindmap.png"):
     """
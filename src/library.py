@@ -5,7 +5,16 @@ import uuid
 from typing import List, Dict, Optional
 from pathlib import Path
 from sqlmodel import Session, select
+from sqlalchemy.orm import defer
 from src.database import engine, Book, Analysis, Image, init_db
+try:
+    import orjson  # C encoder/decoder for the analysis JSON columns
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 class LibraryManager:
     """
@@ -15,6 +24,16 @@ class LibraryManager:
         self.upload_dir = upload_dir
         self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
+        # Snapshot of upload_dir ({filename: size}), refreshed only when the dir mtime changes
+        self._dir_snapshot: Dict[str, int] = {}
+        self._dir_mtime: Optional[float] = None
+        
+        # Memoized get_books() result; cleared on every library mutation.
+        # Each mutation also bumps the generation, so a listing that raced with a write
+        # (add_book runs in a worker thread) is never stored.
+        self._books_cache: Optional[List[Dict]] = None
+        self._books_generation = 0
+        
         # Initialize DB
         init_db()
         
@@ -38,6 +57,12 @@ class LibraryManager:
                     session.exec(text("ALTER TABLE analysis ADD COLUMN podcast_json VARCHAR"))
                     session.commit()
                     print("✅ Schema update complete.")
+                
+                # Lookup indexes (create_all only adds them to brand-new tables)
+                session.exec(text("CREATE INDEX IF NOT EXISTS ix_book_filename ON book (filename)"))
+                session.exec(text("CREATE INDEX IF NOT EXISTS ix_analysis_book_id ON analysis (book_id)"))
+                session.exec(text("CREATE INDEX IF NOT EXISTS ix_image_book_id ON image (book_id)"))
+                session.commit()
         except Exception as e:
             print(f"⚠️ Schema update check failed: {e}")
 
@@ -48,8 +73,8 @@ class LibraryManager:
             return
 
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                books = json.load(f)
+            with open(json_path, 'rb') as f:
+                books = _json_loads(f.read())
             
             with Session(engine) as session:
                 for b in books:
@@ -65,8 +90,7 @@ class LibraryManager:
                             full_text="" # Legacy books might not have text saved
                         )
                         session.add(new_book)
-                        session.commit()
-                        session.refresh(new_book)
+                        session.flush() # Assigns new_book.id; everything commits once below
                         
                         # If thumbnail exists, add as Image (cover)
                         if b.get("thumbnail"):
@@ -103,6 +127,9 @@ class LibraryManager:
                     session.add(existing)
                     session.commit()
                     session.refresh(existing)
+                    # Same filename may have been overwritten in place (dir mtime unchanged)
+                    self._dir_mtime = None
+                    self._invalidate_books_cache()
                     return self._book_to_dict(existing)
                 
                 new_book = Book(
@@ -114,6 +141,8 @@ class LibraryManager:
                 session.add(new_book)
                 session.commit()
                 session.refresh(new_book)
+                self._dir_mtime = None
+                self._invalidate_books_cache()
                 return self._book_to_dict(new_book)
         except Exception as e:
             print(f"❌ Error adding book to library: {e}")
@@ -127,10 +156,10 @@ class LibraryManager:
             existing = session.exec(statement).first()
             
             summary = analysis_data.get("summary", "")
-            entities = json.dumps(analysis_data.get("entities", []))
-            scenes = json.dumps(analysis_data.get("scenes", []))
-            keywords = json.dumps(analysis_data.get("keywords", []))
-            podcast = json.dumps(analysis_data.get("podcast", [])) if analysis_data.get("podcast") else None
+            entities = _json_dumps(analysis_data.get("entities", []))
+            scenes = _json_dumps(analysis_data.get("scenes", []))
+            keywords = _json_dumps(analysis_data.get("keywords", []))
+            podcast = _json_dumps(analysis_data.get("podcast", [])) if analysis_data.get("podcast") else None
             
             if existing:
                 existing.summary = summary
@@ -159,7 +188,7 @@ class LibraryManager:
             existing = session.exec(statement).first()
             
             if existing:
-                existing.podcast_json = json.dumps(playlist)
+                existing.podcast_json = _json_dumps(playlist)
                 session.add(existing)
                 session.commit()
             else:
@@ -174,23 +203,42 @@ class LibraryManager:
             if analysis:
                 return {
                     "summary": analysis.summary,
-                    "entities": json.loads(analysis.entities_json),
-                    "scenes": json.loads(analysis.scenes_json),
-                    "scenes": json.loads(analysis.scenes_json),
-                    "keywords": json.loads(analysis.keywords_json),
-                    "podcast": json.loads(analysis.podcast_json) if analysis.podcast_json else []
+                    "entities": _json_loads(analysis.entities_json),
+                    "scenes": _json_loads(analysis.scenes_json),
+                    "keywords": _json_loads(analysis.keywords_json),
+                    "podcast": _json_loads(analysis.podcast_json) if analysis.podcast_json else []
                 }
         return None
 
+    def _invalidate_books_cache(self):
+        self._books_generation += 1
+        self._books_cache = None
+
     def get_books(self) -> List[Dict]:
         """Get all books sorted by date (newest first)."""
         try:
-            self.scan_and_backfill() # Ensure sync
+            if self._refresh_dir_snapshot():
+                self.scan_and_backfill() # Ensure sync (only when upload_dir changed)
+                self._invalidate_books_cache() # File sizes may have changed too
+            
+            cached = self._books_cache
+            if cached is not None:
+                return list(cached)
             
+            generation = self._books_generation
             with Session(engine) as session:
-                statement = select(Book).order_by(Book.upload_date.desc())
+                # Listing never needs full_text (whole book contents), so leave it unloaded
+                statement = select(Book).options(defer(Book.full_text)).order_by(Book.upload_date.desc())
                 books = session.exec(statement).all()
-                return [self._book_to_dict(b, session) for b in books]
+                # One query for all covers, indexed by book id (instead of one query per book)
+                covers = {
+                    img.book_id: img.path
+                    for img in session.exec(select(Image).where(Image.type == "cover")).all()
+                }
+                result = [self._book_to_dict(b, thumbnail=covers.get(b.id)) for b in books]
+            if generation == self._books_generation:
+                self._books_cache = result
+            return list(result)
         except Exception as e:
             print(f"⚠️ Error fetching library: {e}")
             return []
@@ -226,12 +274,13 @@ class LibraryManager:
                 
             session.delete(book)
             session.commit()
+            self._invalidate_books_cache()
             return True
 
     def get_book(self, book_id: int) -> Optional[Dict]:
         """Get a single book by ID."""
         with Session(engine) as session:
-            book = session.get(Book, book_id)
+            book = session.get(Book, book_id, options=[defer(Book.full_text)])
             return self._book_to_dict(book, session) if book else None
 
     def get_book_full_text(self, book_id: int) -> Optional[str]:
@@ -254,13 +303,13 @@ class LibraryManager:
                 img = Image(book_id=book_id, type="cover", path=thumbnail_path)
                 session.add(img)
             session.commit()
+            self._invalidate_books_cache()
             return True
 
-    def _book_to_dict(self, book: Book, session: Session = None) -> Dict:
+    def _book_to_dict(self, book: Book, session: Session = None, thumbnail: Optional[str] = None) -> Dict:
         """Convert Book model to dictionary for API."""
-        # Get thumbnail
-        thumbnail = None
-        if session:
+        # Get thumbnail (unless the caller already looked it up)
+        if thumbnail is None and session:
             # Use relationship if loaded, or query
             # Since we didn't eager load, query is safer
             statement = select(Image).where(Image.book_id == book.id).where(Image.type == "cover")
@@ -278,41 +327,66 @@ class LibraryManager:
             "thumbnail": thumbnail
         }
 
+    def _refresh_dir_snapshot(self) -> bool:
+        """Re-list upload_dir if its mtime changed. Returns True when it was re-scanned."""
+        try:
+            mtime = os.stat(self.upload_dir).st_mtime
+        except OSError:
+            self._dir_snapshot, self._dir_mtime = {}, None
+            return False
+        if mtime == self._dir_mtime:
+            return False
+        
+        snapshot = {}
+        with os.scandir(self.upload_dir) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        snapshot[entry.name] = entry.stat().st_size
+                except OSError:
+                    continue
+        self._dir_snapshot, self._dir_mtime = snapshot, mtime
+        return True
+
     def scan_and_backfill(self):
         """
         Scan upload directory for files not in library and add them.
         """
-        if not os.path.exists(self.upload_dir):
+        # One scandir pass (DirEntry type + stat) instead of listdir + isfile per entry
+        self._refresh_dir_snapshot()
+        if not self._dir_snapshot:
             return
 
         with Session(engine) as session:
-            existing_filenames = {b.filename for b in session.exec(select(Book)).all()}
+            existing_filenames = set(session.exec(select(Book.filename)).all())
             
             ALLOWED_EXTENSIONS = {".pdf", ".epub", ".txt"}
             
-            count = 0
-            for filename in os.listdir(self.upload_dir):
-                file_path = os.path.join(self.upload_dir, filename)
-                if os.path.isfile(file_path):
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext in ALLOWED_EXTENSIONS and filename not in existing_filenames:
-                        # Found a new file!
-                        print(f"Found unlisted book: {filename}")
-                        new_book = Book(
-                            title=filename,
-                            author="Unknown",
-                            filename=filename,
-                            full_text=""
-                        )
-                        session.add(new_book)
-                        count += 1
+            new_books = []
+            for filename in self._dir_snapshot:
+                ext = os.path.splitext(filename)[1].lower()
+                if ext in ALLOWED_EXTENSIONS and filename not in existing_filenames:
+                    # Found a new file!
+                    print(f"Found unlisted book: {filename}")
+                    new_books.append(Book(
+                        title=filename,
+                        author="Unknown",
+                        filename=filename,
+                        full_text=""
+                    ))
             
-            if count > 0:
+            if new_books:
+                # Ordering is derived at read time (ORDER BY upload_date), so just append;
+                # add_all + one commit lets SQLAlchemy batch the INSERTs
+                session.add_all(new_books)
                 session.commit()
-                print(f"✅ Backfilled {count} books into library")
+                self._invalidate_books_cache()
+                print(f"✅ Backfilled {len(new_books)} books into library")
 
     def _get_file_size(self, filename: str) -> int:
         if not filename: return 0
+        if self._dir_mtime is not None:
+            return self._dir_snapshot.get(filename, 0)
         try:
             return os.path.getsize(os.path.join(self.upload_dir, filename))
         except:
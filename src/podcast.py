@@ -1,13 +1,77 @@
 import os
+import re
 import json
+import shutil
 import asyncio
+import logging
+import random
 import time
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
-from openai import AsyncOpenAI
-from src.config import OPENROUTER_API_KEY
-from src.audio import generate_audio
+from collections import OrderedDict
+import aiohttp
+try:
+    from orjson import loads as _json_loads  # C parser for LLM/cached JSON payloads
+except ImportError:
+    from json import loads as _json_loads
+from src.config import OPENROUTER_API_KEY, ELEVENLABS_API_KEY
+from src import cache
+from src.audio import generate_audio, generate_audio_elevenlabs_stream, _concatenate_files
+from src.http_session import get_session
+from src.rate_limit import openrouter_limiter
 from src.prompts import PODCAST_PROMPT
+from src.tokens import truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# Streamed replies can run longer overall; only a stalled stream counts as a timeout
+OPENROUTER_STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+RETRY_BASE_DELAY = 1.5
+
+PODCAST_SCRIPT_MODEL = "meta-llama/llama-3.3-70b-instruct:free"  # OpenRouter's main reasoning model
+MAX_SCRIPT_INPUT_TOKENS = 6000
+
+# Recent scripts in memory (backed by the on-disk cache), keyed on model + prompt + text
+SCRIPT_CACHE_SIZE = 32
+_script_memory_cache: "OrderedDict[str, List[Dict]]" = OrderedDict()
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so concurrent generations don't retry in lockstep."""
+    return RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+class OpenRouterError(RuntimeError):
+    """Non-200 reply from OpenRouter. The message starts with the status code."""
+    def __init__(self, status: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status} from OpenRouter: {detail[:200]}")
+        self.status = status
+        self.retry_after = retry_after
+
+async def _raise_for_status(response: aiohttp.ClientResponse):
+    if response.status == 200:
+        return
+    try:
+        retry_after = float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        retry_after = None
+    raise OpenRouterError(response.status, await response.text(), retry_after)
+
+# Error categories for the retry loop, checked in one pass over the message. OpenRouterError
+# messages start with the HTTP status, so for those the status code decides.
+_ERROR_CATEGORY_RE = re.compile(
+    r"(?P<auth>\b401\b|unauthorized|authentication)"
+    r"|(?P<rate_limit>\b429\b|rate[ _]?limit|quota)"
+    r"|(?P<server>\b50[0-4]\b)",
+    re.IGNORECASE
+)
+
+PODCAST_SYSTEM_PROMPT = "You are an expert podcast script writer. You create engaging, conversational scripts in valid JSON format."
+# Encoded once; spliced verbatim into every request body
+_SYSTEM_MESSAGE_JSON = json.dumps({"role": "system", "content": PODCAST_SYSTEM_PROMPT})
+
+# Max segments synthesized at once (keeps TTS providers within their rate limits)
+PODCAST_TTS_MAX_CONCURRENCY = 8
 
 @dataclass
 class VoiceConfig:
@@ -18,6 +82,7 @@ class VoiceConfig:
     similarity_boost: float = 0.75
     style: float = 0.0
     speaking_rate: float = 1.0
+    use_speaker_boost: bool = True
 
 @dataclass
 class HostProfile:
@@ -65,6 +130,13 @@ FALLBACK_SCRIPT = [
     {"speaker": "Jax", "text": "Stay booked and stay busy, fam! Catch you next time!"}
 ]
 
+# Fixed lines of the error fallback script; only the two middle segments vary
+_FALLBACK_OPENING = {"speaker": "Jax", "text": "Yo yo yo! Welcome back to Booked and Busy!"}
+_FALLBACK_CLOSING = (
+    {"speaker": "Emma", "text": "Check the server logs for more details, or verify your API configuration."},
+    {"speaker": "Jax", "text": "We'll be back soon! Stay booked and stay busy, fam!"}
+)
+
 def _create_error_fallback(error_type: str, error_detail: str) -> List[Dict]:
     """
     Create a more informative fallback script based on the error.
@@ -77,13 +149,71 @@ def _create_error_fallback(error_type: str, error_detail: str) -> List[Dict]:
         Fallback script with error information
     """
     return [
-        {"speaker": "Jax", "text": "Yo yo yo! Welcome back to Booked and Busy!"},
+        dict(_FALLBACK_OPENING),
         {"speaker": "Emma", "text": f"We're having some trouble on our end. Error: {error_type}."},
-        {"speaker": "Jax", "text": f"{error_detail}"},
-        {"speaker": "Emma", "text": "Check the server logs for more details, or verify your API configuration."},
-        {"speaker": "Jax", "text": "We'll be back soon! Stay booked and stay busy, fam!"}
+        {"speaker": "Jax", "text": error_detail},
+        *(dict(segment) for segment in _FALLBACK_CLOSING)
     ]
 
+class _ScriptSegmentScanner:
+    """
+    Pulls complete segment objects out of a streamed JSON script as soon as each one closes.
+    Tracks bracket depth and string/escape state, so braces inside text don't confuse it;
+    a segment is any {...} that sits directly inside an array.
+    """
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._start = None
+        self._start_depth = 0
+        self._opened = False
+    
+    @property
+    def complete(self) -> bool:
+        """True once the top-level JSON value has been opened and closed again."""
+        return self._opened and not self._stack and not self._in_string
+    
+    def feed(self, chunk: str) -> List[Dict]:
+        self._text += chunk
+        text = self._text
+        segments = []
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._opened = True
+                if ch == "{" and self._start is None and self._stack and self._stack[-1] == "[":
+                    self._start = i
+                    self._start_depth = len(self._stack)
+                self._stack.append(ch)
+            elif ch in "]}":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._start is not None and len(self._stack) == self._start_depth:
+                    try:
+                        segments.append(_json_loads(text[self._start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._start = None
+        
+        # Drop text that can no longer be part of a segment
+        if self._start is None:
+            self._text, self._pos = "", 0
+        else:
+            self._text, self._pos, self._start = text[self._start:], len(text) - self._start, 0
+        return segments
+
 class PodcastGenerator:
     """Handles podcast script and audio generation."""
     
@@ -96,75 +226,143 @@ class PodcastGenerator:
             hosts: Dictionary of host profiles
         """
         if not api_key:
-            print("⚠️  WARNING: OPENROUTER_API_KEY is not set")
-            print("💡 Podcast generation will use fallback scripts only")
+            logger.warning("⚠️  WARNING: OPENROUTER_API_KEY is not set")
+            logger.info("💡 Podcast generation will use fallback scripts only")
         
         self.api_key = api_key
         self.hosts = hosts
+        self._valid_speakers = frozenset(hosts)
+        self._prompt_templates: Dict[Tuple[str, str], str] = {}
+        self._encoded_prompt_templates: Dict[Tuple[str, str], str] = {}
         
-        # Configure OpenAI client for OpenRouter API only if key exists
-        if api_key:
-            self.client = AsyncOpenAI(
-                api_key=api_key,
-                base_url="https://openrouter.ai/api/v1",
-                timeout=30.0,
-                max_retries=0,  # We handle retries manually
-                default_headers={
-                    "HTTP-Referer": "https://book2vision.app",
-                    "X-Title": "Book2Vision Podcast Generator"
-                }
+        # Plain POSTs to OpenRouter's chat completions endpoint over the shared aiohttp session
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "https://book2vision.app",
+            "X-Title": "Book2Vision Podcast Generator"
+        }
+    
+    async def _chat_completion(self, body: bytes) -> Optional[str]:
+        """POST a JSON-encoded chat completion request; returns the message content. Raises on HTTP errors."""
+        session = await get_session()
+        async with openrouter_limiter.acquire():
+            async with session.post(OPENROUTER_CHAT_URL, headers=self.headers, data=body, timeout=OPENROUTER_TIMEOUT) as response:
+                await _raise_for_status(response)
+                data = await response.json(content_type=None)
+        return data["choices"][0]["message"]["content"]
+    
+    async def _stream_chat_completion(self, body: bytes):
+        """POST a streaming chat completion request; yields content deltas from the SSE stream."""
+        session = await get_session()
+        async with openrouter_limiter.acquire():
+            async with session.post(OPENROUTER_CHAT_URL, headers=self.headers, data=body, timeout=OPENROUTER_STREAM_TIMEOUT) as response:
+                await _raise_for_status(response)
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    # Skip blank separators and SSE comments (": OPENROUTER PROCESSING")
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        delta = _json_loads(payload)["choices"][0]["delta"].get("content")
+                    except (ValueError, KeyError, IndexError):
+                        continue
+                    if delta:
+                        yield delta
+    
+    def _prompt_template(self, host1: str, host2: str) -> str:
+        """Podcast prompt with host information filled in and a literal "{text}" placeholder."""
+        template = self._prompt_templates.get((host1, host2))
+        if template is None:
+            # Host fields are fixed, so the template is parsed once per host pair;
+            # "{text}" is kept as a literal placeholder and filled per call
+            h1 = self.hosts[host1]
+            h2 = self.hosts[host2]
+            template = PODCAST_PROMPT.format(
+                host1_name=h1.name,
+                host1_gender=h1.gender,
+                host1_personality=h1.personality,
+                host2_name=h2.name,
+                host2_gender=h2.gender,
+                host2_personality=h2.personality,
+                text="{text}"
             )
-        else:
-            self.client = None
+            self._prompt_templates[(host1, host2)] = template
+        return template
+    
+    def _format_prompt(self, text: str, host1: str = "Jax", host2: str = "Emma") -> str:
+        """Format the podcast prompt with host information."""
+        return self._prompt_template(host1, host2).replace("{text}", text)
     
-    def _create_error_fallback(self, error_type: str, error_detail: str) -> List[Dict]:
+    def _build_request_body(self, text: str, model: str, json_mode: bool, stream: bool = False, host1: str = "Jax", host2: str = "Emma") -> bytes:
         """
-        Create a more informative fallback script based on the error.
-        
-        Args:
-            error_type: Short error category (e.g., "API Error", "Invalid Key")
-            error_detail: More detailed explanation
-            
-        Returns:
-            Fallback script with error information
+        JSON body for the chat completion request. The system message and the prompt
+        template are encoded once; only the book text is JSON-escaped per call.
         """
-        return [
-            {"speaker": "Jax", "text": "Yo yo yo! Welcome back to Booked and Busy!"},
-            {"speaker": "Emma", "text": f"We're having some trouble on our end. Error: {error_type}."},
-            {"speaker": "Jax", "text": f"{error_detail}"},
-            {"speaker": "Emma", "text": "Check the server logs for more details, or verify your API configuration."},
-            {"speaker": "Jax", "text": "We'll be back soon! Stay booked and stay busy, fam!"}
-        ]
+        encoded_template = self._encoded_prompt_templates.get((host1, host2))
+        if encoded_template is None:
+            encoded_template = json.dumps(self._prompt_template(host1, host2))
+            self._encoded_prompt_templates[(host1, host2)] = encoded_template
         
-    def _format_prompt(self, text: str, host1: str = "Jax", host2: str = "Emma") -> str:
-        """Format the podcast prompt with host information."""
-        h1 = self.hosts[host1]
-        h2 = self.hosts[host2]
-        
-        return PODCAST_PROMPT.format(
-            host1_name=h1.name,
-            host1_gender=h1.gender,
-            host1_personality=h1.personality,
-            host2_name=h2.name,
-            host2_gender=h2.gender,
-            host2_personality=h2.personality,
-            text=text
+        user_message = '{"role": "user", "content": ' + encoded_template.replace("{text}", json.dumps(text)[1:-1]) + '}'
+        body = (
+            '{"model": ' + json.dumps(model)
+            + ', "messages": [' + _SYSTEM_MESSAGE_JSON + ', ' + user_message + ']'
+            + ', "temperature": 0.7, "max_tokens": 2000'
         )
+        if json_mode:
+            # Structured output: the reply is a bare JSON object, no fences to strip
+            body += ', "response_format": {"type": "json_object"}'
+        if stream:
+            body += ', "stream": true'
+        return (body + '}').encode("utf-8")
     
-    def _clean_json_response(self, response_text: str) -> str:
-        """Clean up JSON response from various markdown formats."""
-        response_text = response_text.strip()
-        
-        # Remove markdown code blocks
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-            
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-            
-        return response_text.strip()
+    def _script_cache_key(self, input_text: str, model: str) -> str:
+        # The filled-in prompt template covers host profiles and prompt wording
+        return cache.cache_key("podcast_script", model, self._prompt_template("Jax", "Emma"), input_text)
+    
+    async def _get_cached_script(self, key: str) -> Optional[List[Dict]]:
+        script = _script_memory_cache.get(key)
+        if script is None:
+            data = await asyncio.to_thread(cache.get, key)
+            if data is None:
+                return None
+            try:
+                script = _json_loads(data)
+            except ValueError:
+                return None
+            _script_memory_cache[key] = script
+        _script_memory_cache.move_to_end(key)
+        # Copies, so callers can't mutate the cached segments
+        return [dict(segment) for segment in script]
+    
+    async def _cache_script(self, key: str, script: List[Dict]):
+        """Remember a validated script (never error fallbacks) in memory and on disk."""
+        _script_memory_cache[key] = [dict(segment) for segment in script]
+        _script_memory_cache.move_to_end(key)
+        while len(_script_memory_cache) > SCRIPT_CACHE_SIZE:
+            _script_memory_cache.popitem(last=False)
+        try:
+            await asyncio.to_thread(cache.put, key, json.dumps(script).encode("utf-8"))
+        except OSError as e:
+            logger.warning(f"⚠️  Could not cache podcast script: {e}")
+    
+    def _parse_script(self, response_text: str, json_mode: bool) -> List[Dict]:
+        """Parse the {"script": [...]} object the prompt asks for."""
+        if not json_mode:
+            # Without response_format the model may still wrap JSON in a markdown fence
+            response_text = response_text.strip()
+            if response_text.startswith("```"):
+                response_text = response_text.split("\n", 1)[-1]
+            if response_text.endswith("```"):
+                response_text = response_text[:-3]
+        
+        parsed = _json_loads(response_text)
+        # Older-style bare arrays are still accepted
+        return parsed.get("script") if isinstance(parsed, dict) else parsed
     
     def _validate_script(self, script: List[Dict]) -> Tuple[bool, str]:
         """
@@ -179,162 +377,369 @@ class PodcastGenerator:
         if len(script) == 0:
             return False, "Script is empty"
         
-        valid_speakers = set(self.hosts.keys())
-        
-        for i, segment in enumerate(script):
-            if not isinstance(segment, dict):
-                return False, f"Segment {i} is not a dictionary"
-            
-            if "speaker" not in segment or "text" not in segment:
-                return False, f"Segment {i} missing 'speaker' or 'text' field"
-            
-            if segment["speaker"] not in valid_speakers:
-                return False, f"Invalid speaker '{segment['speaker']}' in segment {i}"
-            
-            if not segment["text"] or not isinstance(segment["text"], str):
-                return False, f"Invalid or empty text in segment {i}"
+        valid_speakers = self._valid_speakers
+        bad = next((
+            i for i, segment in enumerate(script)
+            if not (
+                isinstance(segment, dict)
+                and segment.get("speaker") in valid_speakers
+                and isinstance(segment.get("text"), str)
+                and segment["text"]
+            )
+        ), None)
+        if bad is None:
+            return True, ""
         
-        return True, ""
+        # Only the failing segment is inspected again, to say what is wrong with it
+        segment = script[bad]
+        if not isinstance(segment, dict):
+            return False, f"Segment {bad} is not a dictionary"
+        if "speaker" not in segment or "text" not in segment:
+            return False, f"Segment {bad} missing 'speaker' or 'text' field"
+        if segment["speaker"] not in valid_speakers:
+            return False, f"Invalid speaker '{segment['speaker']}' in segment {bad}"
+        return False, f"Invalid or empty text in segment {bad}"
     
     async def generate_script(
         self, 
         text: str, 
-        max_length: int = 12000,
-        model: str = "meta-llama/llama-3.3-70b-instruct:free",  # OpenRouter's main reasoning model
-        max_retries: int = 3
+        max_input_tokens: int = MAX_SCRIPT_INPUT_TOKENS,
+        model: str = PODCAST_SCRIPT_MODEL,
+        max_retries: int = 3,
+        json_mode: bool = True
     ) -> List[Dict]:
         """
         Generate a podcast script using OpenRouter API with retry logic.
         
         Args:
             text: Book content to discuss
-            max_length: Maximum characters to send to the model
+            max_input_tokens: Maximum tokens of book text to send to the model
             model: Model ID to use
             max_retries: Maximum number of retry attempts
+            json_mode: Request response_format=json_object (disable for models without it)
             
         Returns:
             List of script segments with speaker and text
         """
-        print("🎙️  Generating podcast script with OpenRouter AI...")
+        logger.info("🎙️  Generating podcast script with OpenRouter AI...")
         
         # Check API key first
         if not self.api_key:
-            print("❌ CRITICAL: OPENROUTER_API_KEY is missing or empty")
-            print("💡 Please set OPENROUTER_API_KEY in your .env file")
-            return self._create_error_fallback("Missing API Key", "Please configure OPENROUTER_API_KEY in .env file")
+            logger.error("❌ CRITICAL: OPENROUTER_API_KEY is missing or empty")
+            logger.info("💡 Please set OPENROUTER_API_KEY in your .env file")
+            return _create_error_fallback("Missing API Key", "Please configure OPENROUTER_API_KEY in .env file")
+        
+        # Truncate text if needed
+        input_text = truncate_tokens(text, max_input_tokens)
+        if len(input_text) < len(text):
+            logger.warning(f"⚠️  Input truncated from {len(text)} to {len(input_text)} characters ({max_input_tokens} tokens)")
+        
+        key = self._script_cache_key(input_text, model)
+        cached = await self._get_cached_script(key)
+        if cached is not None:
+            logger.info(f"♻️  Using cached podcast script ({len(cached)} segments)")
+            return cached
+        
+        # Prompt and request body (OpenAI chat completion format) are identical for every attempt
+        body = self._build_request_body(input_text, model, json_mode)
         
         last_error = None
         response_text = None
+        next_delay = None  # Set by the rate-limit branch (Retry-After or a longer backoff)
         
         for attempt in range(max_retries):
             try:
                 if attempt > 0:
-                    wait_time = (2 ** attempt) + 1  # 3s, 5s, 9s
-                    print(f"🔄 Retry attempt {attempt + 1}/{max_retries} in {wait_time}s...")
+                    wait_time = next_delay if next_delay is not None else _backoff_delay(attempt)
+                    next_delay = None
+                    logger.info(f"🔄 Retry attempt {attempt + 1}/{max_retries} in {wait_time:.1f}s...")
                     await asyncio.sleep(wait_time)
                 
-                # Truncate text if needed
-                input_text = text[:max_length] if len(text) > max_length else text
-                if len(text) > max_length:
-                    print(f"⚠️  Input truncated from {len(text)} to {max_length} characters")
-                
-                # Format prompt
-                prompt = self._format_prompt(input_text)
-                
-                # Generate content using OpenAI chat completion format
-                print(f"📡 Calling OpenRouter API (attempt {attempt + 1}/{max_retries})...")
-                response = await self.client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert podcast script writer. You create engaging, conversational scripts in valid JSON format."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000,
-                    timeout=30.0  # Add timeout
-                )
-                
-                # Extract response text from OpenAI format
-                response_text = response.choices[0].message.content
+                logger.info(f"📡 Calling OpenRouter API (attempt {attempt + 1}/{max_retries})...")
+                response_text = await self._chat_completion(body)
                 
                 if response_text is None:
                     raise ValueError("API returned None response")
                 
-                print(f"✅ Received response: {len(response_text)} characters")
+                logger.info(f"✅ Received response: {len(response_text)} characters")
                 
-                # Clean and parse JSON
-                cleaned_text = self._clean_json_response(response_text)
-                script = json.loads(cleaned_text)
+                # Parse JSON
+                script = self._parse_script(response_text, json_mode)
                 
                 # Validate script
                 is_valid, error_msg = self._validate_script(script)
                 if not is_valid:
-                    print(f"⚠️  Script validation failed: {error_msg}")
+                    logger.warning(f"⚠️  Script validation failed: {error_msg}")
                     if attempt < max_retries - 1:
-                        print("🔄 Retrying with different parameters...")
+                        logger.info("🔄 Retrying with different parameters...")
                         continue
                     else:
-                        print("❌ All retries exhausted - validation failed")
-                        return self._create_error_fallback("Validation Failed", error_msg)
+                        logger.error("❌ All retries exhausted - validation failed")
+                        return _create_error_fallback("Validation Failed", error_msg)
                 
-                print(f"✅ Successfully parsed {len(script)} segments")
+                logger.info(f"✅ Successfully parsed {len(script)} segments")
+                await self._cache_script(key, script)
                 return script
                 
             except json.JSONDecodeError as e:
                 last_error = f"JSON parsing error: {str(e)}"
-                print(f"❌ {last_error}")
+                logger.error(f"❌ {last_error}")
                 if response_text:
-                    print(f"Response preview: {response_text[:300]}...")
-                    print(f"Response end: ...{response_text[-100:]}")
+                    logger.info(f"Response preview: {response_text[:300]}...")
+                    logger.info(f"Response end: ...{response_text[-100:]}")
                 if attempt >= max_retries - 1:
-                    return self._create_error_fallback("Invalid Response Format", "The AI returned malformed data")
+                    return _create_error_fallback("Invalid Response Format", "The AI returned malformed data")
                     
             except asyncio.TimeoutError:
                 last_error = "Request timeout - API took too long to respond"
-                print(f"❌ {last_error}")
+                logger.error(f"❌ {last_error}")
                 if attempt >= max_retries - 1:
-                    return self._create_error_fallback("Timeout", "API request timed out")
+                    return _create_error_fallback("Timeout", "API request timed out")
                     
             except Exception as e:
                 last_error = str(e)
-                error_lower = last_error.lower()
+                match = _ERROR_CATEGORY_RE.search(last_error)
+                category = match.lastgroup if match else None
                 
                 # Categorize errors
-                if "401" in error_lower or "unauthorized" in error_lower or "authentication" in error_lower:
-                    print(f"❌ Authentication Error: {last_error}")
-                    return self._create_error_fallback("Invalid API Key", "OpenRouter API key is invalid or expired")
+                if category == "auth":
+                    logger.error(f"❌ Authentication Error: {last_error}")
+                    return _create_error_fallback("Invalid API Key", "OpenRouter API key is invalid or expired")
                     
-                elif "429" in error_lower or "rate limit" in error_lower or "quota" in error_lower:
-                    print(f"❌ Rate Limit Error: {last_error}")
+                elif category == "rate_limit":
+                    logger.error(f"❌ Rate Limit Error: {last_error}")
                     if attempt < max_retries - 1:
-                        wait_time = (2 ** (attempt + 2))  # Longer wait for rate limits
-                        print(f"⏳ Rate limited - waiting {wait_time}s before retry...")
-                        await asyncio.sleep(wait_time)
+                        # Honour Retry-After when given, else back off longer than for other errors
+                        retry_after = getattr(e, "retry_after", None)
+                        next_delay = retry_after if retry_after is not None else _backoff_delay(attempt + 2)
+                        logger.info(f"⏳ Rate limited - waiting {next_delay:.1f}s before retry...")
                         continue
-                    return self._create_error_fallback("Rate Limited", "Too many requests - please try again later")
+                    return _create_error_fallback("Rate Limited", "Too many requests - please try again later")
                     
-                elif "500" in error_lower or "503" in error_lower or "502" in error_lower:
-                    print(f"❌ Server Error: {last_error}")
+                elif category == "server":
+                    logger.error(f"❌ Server Error: {last_error}")
                     if attempt < max_retries - 1:
                         continue
-                    return self._create_error_fallback("API Server Error", "OpenRouter service is temporarily unavailable")
+                    return _create_error_fallback("API Server Error", "OpenRouter service is temporarily unavailable")
                     
                 else:
-                    print(f"❌ Unexpected Error: {last_error}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.exception(f"❌ Unexpected Error: {last_error}")
                     if attempt >= max_retries - 1:
-                        return self._create_error_fallback("Unknown Error", f"Something went wrong: {last_error[:100]}")
+                        return _create_error_fallback("Unknown Error", f"Something went wrong: {last_error[:100]}")
         
         # If we get here, all retries failed
-        print(f"❌ All {max_retries} attempts failed. Last error: {last_error}")
-        return self._create_error_fallback("Generation Failed", "Unable to generate script after multiple attempts")
+        logger.error(f"❌ All {max_retries} attempts failed. Last error: {last_error}")
+        return _create_error_fallback("Generation Failed", "Unable to generate script after multiple attempts")
+    
+    async def generate_scripts_batch(self, texts: List[str], max_concurrency: int = 4) -> List[List[Dict]]:
+        """
+        Generate scripts for many books (offline/bulk runs).
+        
+        OpenRouter has no asynchronous Batch API, so requests run concurrently (bounded, and
+        through the shared OpenRouter limiter). Duplicate texts are generated once and cached
+        scripts are reused.
+        
+        Returns:
+            One script per input text, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def generate_one(text):
+            async with semaphore:
+                return await self.generate_script(text)
+        
+        unique_texts = list(dict.fromkeys(texts))
+        logger.info(f"📦 Generating {len(unique_texts)} podcast scripts ({len(texts)} requested)...")
+        scripts = await asyncio.gather(*(generate_one(t) for t in unique_texts))
+        by_text = dict(zip(unique_texts, scripts))
+        return [[dict(segment) for segment in by_text[t]] for t in texts]
+    
+    def _segment_target(self, index: int, segment: Dict, output_dir: str):
+        """Host and output path for one script segment."""
+        speaker = segment["speaker"]
+        
+        # Get host configuration
+        host = self.hosts.get(speaker)
+        if not host:
+            logger.warning(f"⚠️  Unknown speaker '{speaker}', using default")
+            host = self.hosts["Jax"]
+        
+        # Generate filename
+        filename = f"podcast_seg_{index:03d}_{speaker}.mp3"
+        return host, os.path.join(output_dir, filename)
+    
+    def _segment_audio(self, index: int, segment: Dict, output_dir: str, provider: str):
+        """Audio generation coroutine for one script segment."""
+        host, output_path = self._segment_target(index, segment, output_dir)
+        voice = host.voice
+        return generate_audio(
+            text=segment["text"],
+            output_path=output_path,
+            voice_id=voice.elevenlabs_id,
+            stability=voice.stability,
+            similarity_boost=voice.similarity_boost,
+            style=voice.style,
+            use_speaker_boost=voice.use_speaker_boost,
+            provider=provider,
+            speaking_rate=voice.speaking_rate
+        )
+    
+    def _link_segment_audio(self, source_path: str, index: int, segment: Dict, output_dir: str) -> str:
+        """Give a repeated segment its own file by hard-linking the first occurrence's audio."""
+        _, output_path = self._segment_target(index, segment, output_dir)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        try:
+            os.link(source_path, output_path)
+        except OSError:
+            shutil.copyfile(source_path, output_path)  # No hard links on this filesystem
+        return output_path
+    
+    async def _stream_elevenlabs_segments(self, segments: List[Tuple[int, Dict]], output_dir: str) -> Dict[int, str]:
+        """
+        Synthesize segments over one ElevenLabs WebSocket per host voice.
+        
+        Returns:
+            Mapping of segment index to output path for the segments that completed
+        """
+        by_voice = {}
+        for i, segment in segments:
+            host, output_path = self._segment_target(i, segment, output_dir)
+            voice, items = by_voice.setdefault(host.voice.elevenlabs_id, (host.voice, []))
+            items.append((i, segment["text"], output_path))
+        
+        results = await asyncio.gather(*(
+            generate_audio_elevenlabs_stream(
+                [(text, path) for _, text, path in items],
+                voice.elevenlabs_id, voice.stability, voice.similarity_boost, voice.style, voice.use_speaker_boost
+            )
+            for voice, items in by_voice.values()
+        ), return_exceptions=True)
+        
+        streamed = {}
+        for (_, items), paths in zip(by_voice.values(), results):
+            if isinstance(paths, Exception):
+                logger.warning(f"⚠️  ElevenLabs stream failed: {paths}")
+                continue
+            for (i, _, _), path in zip(items, paths):
+                if path is not None:
+                    streamed[i] = path
+        return streamed
+    
+    async def stream_script(
+        self,
+        text: str,
+        max_input_tokens: int = MAX_SCRIPT_INPUT_TOKENS,
+        model: str = PODCAST_SCRIPT_MODEL,
+        json_mode: bool = True
+    ):
+        """
+        Stream the script from OpenRouter, yielding each valid segment as soon as it is complete.
+        Raises on HTTP/network errors (no retries; see generate_script).
+        """
+        input_text = truncate_tokens(text, max_input_tokens)
+        body = self._build_request_body(input_text, model, json_mode, stream=True)
+        scanner = _ScriptSegmentScanner()
+        
+        logger.info("📡 Streaming script from OpenRouter API...")
+        async for delta in self._stream_chat_completion(body):
+            for segment in scanner.feed(delta):
+                is_valid, error_msg = self._validate_script([segment])
+                if not is_valid:
+                    logger.warning(f"⚠️  Skipping streamed segment: {error_msg}")
+                    continue
+                yield segment
+        if not scanner.complete:
+            # Output cap hit or connection cut: the segments so far are only part of the episode
+            raise ValueError("Streamed script ended before its JSON closed")
+    
+    async def generate_podcast(
+        self,
+        text: str,
+        output_dir: str,
+        provider: str = "deepgram",
+        progress_callback: Optional[callable] = None
+    ) -> Tuple[List[Dict], List[str]]:
+        """
+        Generate script and audio together: TTS for each segment starts as soon as the
+        segment arrives from the streamed LLM response, instead of after the whole script.
+        Falls back to generate_script + generate_audio if streaming produces nothing.
+        
+        Returns:
+            Tuple of (script, generated audio filenames)
+        """
+        if not self.api_key:
+            script = await self.generate_script(text)
+            return script, await self.generate_audio(script, output_dir, provider, progress_callback)
+        
+        key = self._script_cache_key(truncate_tokens(text, MAX_SCRIPT_INPUT_TOKENS), PODCAST_SCRIPT_MODEL)
+        cached = await self._get_cached_script(key)
+        if cached is not None:
+            logger.info(f"♻️  Using cached podcast script ({len(cached)} segments)")
+            return cached, await self.generate_audio(cached, output_dir, provider, progress_callback)
+        
+        os.makedirs(output_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(PODCAST_TTS_MAX_CONCURRENCY)
+        script = []
+        tasks = []
+        
+        async def run_segment(index, segment):
+            async with semaphore:
+                try:
+                    result = await self._segment_audio(index, segment, output_dir, provider)
+                except Exception as e:
+                    logger.error(f"❌ Error generating audio for segment {index + 1}: {e}")
+                    return None
+            if progress_callback:
+                progress_callback(index + 1, None, segment["speaker"])
+            else:
+                logger.info(f"✅ Generated segment {index + 1} ({segment['speaker']})")
+            return result
+        
+        async def reuse_segment(index, segment, source_task):
+            # Repeated utterance: link to the first occurrence's audio once it exists
+            source = await source_task
+            if source is None:
+                return None
+            try:
+                result = self._link_segment_audio(source, index, segment, output_dir)
+            except OSError as e:
+                logger.error(f"❌ Error reusing audio for segment {index + 1}: {e}")
+                return None
+            if progress_callback:
+                progress_callback(index + 1, None, segment["speaker"])
+            return result
+        
+        first_tasks = {}
+        complete = False
+        try:
+            async for segment in self.stream_script(text):
+                dedup_key = (segment["speaker"], segment["text"])
+                if dedup_key in first_tasks:
+                    task = asyncio.create_task(reuse_segment(len(script), segment, first_tasks[dedup_key]))
+                else:
+                    task = first_tasks[dedup_key] = asyncio.create_task(run_segment(len(script), segment))
+                tasks.append(task)
+                script.append(segment)
+            complete = bool(script)
+        except Exception as e:
+            logger.warning(f"⚠️  Script stream failed after {len(script)} segments: {e}")
+        
+        if complete:
+            await self._cache_script(key, script)
+        else:
+            # A partial script is neither returned nor cached; drop its audio and start over
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info("🔄 Falling back to non-streaming script generation...")
+            script = await self.generate_script(text)
+            return script, await self.generate_audio(script, output_dir, provider, progress_callback)
+        
+        results = await asyncio.gather(*tasks)
+        successful_files = [os.path.basename(p) for p in results if p is not None]
+        logger.info(f"✅ Generated {len(successful_files)}/{len(script)} audio segments")
+        return script, successful_files
     
     async def generate_audio(
         self, 
@@ -355,85 +760,209 @@ class PodcastGenerator:
         Returns:
             List of generated audio filenames
         """
-        print("🎵 Generating podcast audio segments...")
+        logger.info("🎵 Generating podcast audio segments...")
         
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
         
-        tasks = []
         total_segments = len(script)
         
+        # Repeated utterances ("Yeah.", "Right!") are synthesized once; later copies link to that file
+        first_index = {}
         for i, segment in enumerate(script):
-            speaker = segment["speaker"]
-            text = segment["text"]
-            
-            # Get host configuration
-            host = self.hosts.get(speaker)
-            if not host:
-                print(f"⚠️  Unknown speaker '{speaker}', using default")
-                host = self.hosts["Jax"]
-            
-            # Generate filename
-            filename = f"podcast_seg_{i:03d}_{speaker}.mp3"
-            output_path = os.path.join(output_dir, filename)
+            first_index.setdefault((segment["speaker"], segment["text"]), i)
+        unique_segments = [(i, script[i]) for i in first_index.values()]
+        
+        # ElevenLabs: one WebSocket per voice; anything it misses goes through the per-segment path
+        streamed = {}
+        if provider == "elevenlabs" and ELEVENLABS_API_KEY:
+            streamed = await self._stream_elevenlabs_segments(unique_segments, output_dir)
+            logger.info(f"📡 Streamed {len(streamed)}/{len(unique_segments)} segments over ElevenLabs WebSockets")
+        
+        for i, segment in unique_segments:
+            if i in streamed and progress_callback:
+                progress_callback(i + 1, total_segments, segment["speaker"])
+        missing = [(i, segment) for i, segment in unique_segments if i not in streamed]
+        tasks = [
+            (self._segment_audio(i, segment, output_dir, provider), i + 1, total_segments, segment["speaker"])
+            for i, segment in missing
+        ]
+        
+        # Generate all segments concurrently (bounded), reporting progress as each finishes
+        semaphore = asyncio.Semaphore(PODCAST_TTS_MAX_CONCURRENCY)
+        
+        async def run_segment(task, segment_num, total, speaker):
+            async with semaphore:
+                try:
+                    result = await task
+                except Exception as e:
+                    logger.error(f"❌ Error generating audio for segment {segment_num}: {e}")
+                    return None
             
-            # Create audio generation task
-            voice = host.voice
-            task = generate_audio(
-                text=text,
-                output_path=output_path,
-                voice_id=voice.elevenlabs_id,
-                stability=voice.stability,
-                similarity_boost=voice.similarity_boost,
-                style=voice.style,
-                provider=provider,
-                speaking_rate=voice.speaking_rate
-            )
-            tasks.append((task, i + 1, total_segments, speaker))
+            if progress_callback:
+                progress_callback(segment_num, total, speaker)
+            else:
+                logger.info(f"✅ Generated segment {segment_num}/{total} ({speaker})")
+            return result
+        
+        unique_results = await asyncio.gather(*(run_segment(*t) for t in tasks))
+        paths = dict(streamed)
+        paths.update((i, path) for (i, _), path in zip(missing, unique_results))
         
-        # Generate audio with progress tracking
+        # Results in script order, linking repeats to their first occurrence
         results = []
-        for task, segment_num, total, speaker in tasks:
+        for i, segment in enumerate(script):
+            source = paths[first_index[(segment["speaker"], segment["text"])]]
+            if i in paths or source is None:
+                results.append(paths.get(i))
+                continue
             try:
-                result = await task
-                results.append(result)
-                
-                if progress_callback:
-                    progress_callback(segment_num, total, speaker)
-                else:
-                    print(f"✅ Generated segment {segment_num}/{total} ({speaker})")
-                    
-            except Exception as e:
-                print(f"❌ Error generating audio for segment {segment_num}: {e}")
+                results.append(self._link_segment_audio(source, i, segment, output_dir))
+            except OSError as e:
+                logger.error(f"❌ Error reusing audio for segment {i + 1}: {e}")
                 results.append(None)
+                continue
+            if progress_callback:
+                progress_callback(i + 1, total_segments, segment["speaker"])
         
         # Filter out failed generations and return basenames
         successful_files = [
             os.path.basename(p) for p in results if p is not None
         ]
         
-        print(f"✅ Generated {len(successful_files)}/{total_segments} audio segments")
+        logger.info(f"✅ Generated {len(successful_files)}/{total_segments} audio segments")
         return successful_files
 
 
+# Whole episode, joined from the segment files (without re-encoding when they all match)
+PODCAST_FULL_FILENAME = "podcast_full.mp3"
+# Output settings when segments from different providers have to be re-encoded
+PODCAST_REENCODE_ARGS = ["-c:a", "libmp3lame", "-b:a", "128k", "-ar", "44100", "-ac", "1"]
+
+async def _probe_audio_format(path: str) -> Optional[Tuple[str, str, str]]:
+    """(codec, sample rate, channels) of the first audio stream, or None if ffprobe can't tell."""
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,sample_rate,channels", "-of", "csv=p=0", path,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    stdout, _ = await process.communicate()
+    fields = stdout.decode(errors="replace").strip().split(",")
+    if process.returncode != 0 or len(fields) != 3:
+        return None
+    return tuple(fields)
+
+async def _segments_share_format(paths: List[str]) -> bool:
+    """True when every segment has the same codec setup, so a stream copy won't glitch at the joins."""
+    if not shutil.which("ffprobe"):
+        return False
+    # Repeated segments are hard links to the same audio; probe each file once
+    by_inode = {}
+    try:
+        for p in paths:
+            stat = os.stat(p)
+            by_inode.setdefault((stat.st_dev, stat.st_ino), p)
+    except OSError:
+        return False
+    unique_paths = list(by_inode.values())
+    formats = await asyncio.gather(*(_probe_audio_format(p) for p in unique_paths), return_exceptions=True)
+    first = formats[0]
+    return isinstance(first, tuple) and all(f == first for f in formats)
+
+async def concatenate_podcast_audio(audio_files: List[str], output_dir: str) -> Optional[str]:
+    """
+    Join segment files (basenames in output_dir, in playback order) into one MP3.
+    Uses ffmpeg's concat demuxer when available (stream copy if every segment shares one codec setup,
+    re-encoding otherwise), else appends MPEG frames directly.
+    
+    Returns:
+        Filename of the joined episode, or None on failure
+    """
+    if not audio_files:
+        return None
+    output_path = os.path.join(output_dir, PODCAST_FULL_FILENAME)
+    
+    if shutil.which("ffmpeg"):
+        list_path = os.path.join(output_dir, "podcast_concat.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.writelines(f"file '{name}'\n" for name in audio_files)
+        try:
+            paths = [os.path.join(output_dir, name) for name in audio_files]
+            if await _segments_share_format(paths):
+                codec_args = ["-c", "copy"]
+            else:
+                logger.info("🔀 Podcast segments differ in format; re-encoding the joined episode")
+                codec_args = PODCAST_REENCODE_ARGS
+            process = await asyncio.create_subprocess_exec(
+                "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                "-i", list_path, *codec_args, output_path,
+                stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+            _, stderr = await process.communicate()
+            if process.returncode == 0:
+                return PODCAST_FULL_FILENAME
+            logger.warning(f"⚠️  ffmpeg concat failed: {stderr.decode(errors='replace')[:200]}")
+        finally:
+            os.remove(list_path)
+    
+    try:
+        paths = [os.path.join(output_dir, name) for name in audio_files]
+        await asyncio.to_thread(_concatenate_files, paths, output_path)
+        return PODCAST_FULL_FILENAME
+    except OSError as e:
+        logger.error(f"❌ Could not join podcast audio: {e}")
+        return None
+
+
+# One generator for the app: keeps its formatted/encoded prompt templates across calls
+# (connections are pooled by the shared aiohttp session, closed in the app lifespan)
+_GENERATOR: Optional[PodcastGenerator] = None
+
+def _get_generator() -> PodcastGenerator:
+    global _GENERATOR
+    if _GENERATOR is None:
+        _GENERATOR = PodcastGenerator(OPENROUTER_API_KEY)
+    return _GENERATOR
+
+def start_podcast_generator():
+    """Build the shared generator at app startup, so the first request doesn't pay for it."""
+    _get_generator()
+
+def stop_podcast_generator():
+    """Drop the shared generator (its connections belong to the shared session)."""
+    global _GENERATOR
+    _GENERATOR = None
+
+
 # Convenience functions for backward compatibility
 async def generate_podcast_script(text: str) -> List[Dict]:
     """Generate a podcast script (legacy interface)."""
     if not OPENROUTER_API_KEY:
-        print("❌ Cannot generate podcast: OPENROUTER_API_KEY not configured")
+        logger.error("❌ Cannot generate podcast: OPENROUTER_API_KEY not configured")
         return _create_error_fallback(
             "Configuration Error",
             "OpenRouter API key is not set. Please add OPENROUTER_API_KEY to your .env file."
         )
     
-    generator = PodcastGenerator(OPENROUTER_API_KEY)
-    return await generator.generate_script(text)
+    return await _get_generator().generate_script(text)
+
+
+async def generate_podcast(text: str, output_dir: str) -> Tuple[List[Dict], List[str]]:
+    """Generate script and audio with TTS overlapping the streamed script."""
+    if not OPENROUTER_API_KEY:
+        logger.error("❌ Cannot generate podcast: OPENROUTER_API_KEY not configured")
+        script = _create_error_fallback(
+            "Configuration Error",
+            "OpenRouter API key is not set. Please add OPENROUTER_API_KEY to your .env file."
+        )
+        return script, await _get_generator().generate_audio(script, output_dir)
+    
+    return await _get_generator().generate_podcast(text, output_dir)
 
 
 async def generate_podcast_audio(script: List[Dict], output_dir: str) -> List[str]:
     """Generate podcast audio (legacy interface)."""
     if not OPENROUTER_API_KEY:
-        print("⚠️  Warning: OPENROUTER_API_KEY not set, but proceeding with audio generation")
+        logger.warning("⚠️  Warning: OPENROUTER_API_KEY not set, but proceeding with audio generation")
     
-    generator = PodcastGenerator(OPENROUTER_API_KEY)
-    return await generator.generate_audio(script, output_dir)
\ No newline at end of file
+    return await _get_generator().generate_audio(script, output_dir)
\ No newline at end of file
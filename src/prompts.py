@@ -137,13 +137,13 @@ EPISODE STRUCTURE:
 BOOK CONTENT TO DISCUSS:
 {text}
 
-OUTPUT FORMAT (STRICT JSON - NO MARKDOWN):
-[
+OUTPUT FORMAT (STRICT JSON OBJECT - NO MARKDOWN):
+{{"script": [
   {{"speaker": "{host1_name}", "text": "Okay, everyone needs to stop what they're doing. This book just—"}},
   {{"speaker": "{host2_name}", "text": "The twist ! Right ? I literally gasped out loud."}},
   {{"speaker": "{host1_name}", "text": "I know ! And the way the author set it up, like, you don't even see it coming."}},
   {{"speaker": "{host2_name}", "text": "Exactly. I mean, I had to go back and reread the first chapter."}}
-]
+]}}
 """
 
 # ============================================================================
@@ -0,0 +1,64 @@
+"""Client-side rate limiting for outbound provider calls.
+
+One limiter per provider is shared by every module that calls it, so
+concurrent features (Q&A, quizzes, podcast scripts) draw from the same budget.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+# Client-side limits for OpenRouter calls (override via env)
+OPENROUTER_MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "10"))
+OPENROUTER_RPM = int(os.getenv("OPENROUTER_RPM", "500"))
+
+# deAPI image jobs (free tier allows roughly 1-10 requests per minute)
+DEAPI_MAX_CONCURRENCY = int(os.getenv("DEAPI_MAX_CONCURRENCY", "4"))
+DEAPI_RPM = int(os.getenv("DEAPI_RPM", "10"))
+
+
+class RateLimiter:
+    """
+    Caps concurrent requests and spaces them to a requests-per-minute budget (token bucket).
+    Keeps simple counters (calls, total wait) that are printed when a call had to queue.
+    """
+    def __init__(self, name, max_concurrency, rpm):
+        self.name = name
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / rpm
+        self._capacity = float(max_concurrency)  # Burst size
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.calls = 0
+        self.total_wait = 0.0
+
+    async def _take_token(self):
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) / self._interval)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            # Sleep until one token has accrued, then spend it
+            await asyncio.sleep((1 - self._tokens) * self._interval)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+    @asynccontextmanager
+    async def acquire(self):
+        start = time.monotonic()
+        async with self._semaphore:
+            await self._take_token()
+            waited = time.monotonic() - start
+            self.calls += 1
+            self.total_wait += waited
+            if waited > 0.1:
+                print(f"⏳ {self.name} limiter: waited {waited:.2f}s (calls: {self.calls}, total wait: {self.total_wait:.1f}s)")
+            yield
+
+
+openrouter_limiter = RateLimiter("OpenRouter", OPENROUTER_MAX_CONCURRENCY, OPENROUTER_RPM)
+deapi_limiter = RateLimiter("deAPI", DEAPI_MAX_CONCURRENCY, DEAPI_RPM)
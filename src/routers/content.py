@@ -4,13 +4,13 @@ import os
 import time
 import zipfile
 import traceback
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi.responses import FileResponse, StreamingResponse
 
-from src.state import state, UPLOAD_DIR, library_manager
+from src.state import AppState, get_state, book_asset_dir, asset_url, asset_path, UPLOAD_DIR, library_manager
 from src.models import QARequest, StorybookConfig
-from src.knowledge import ask_question, suggest_questions
-from src.podcast import generate_podcast_script, generate_podcast_audio
+from src.knowledge import ask_question, ask_question_stream, suggest_questions
+from src.podcast import generate_podcast, concatenate_podcast_audio, PODCAST_FULL_FILENAME
 from src.storybook import generate_full_storybook, world_bible_to_json, pages_to_json
 
 router = APIRouter(prefix="/api", tags=["content"])
@@ -21,7 +21,7 @@ router = APIRouter(prefix="/api", tags=["content"])
 # ============================================================================
 
 @router.get("/story")
-async def get_story():
+async def get_story(state: AppState = Depends(get_state)):
     if not state.ingestion_result:
         raise HTTPException(status_code=404, detail="No book uploaded")
     
@@ -38,12 +38,12 @@ async def get_story():
 # ============================================================================
 
 @router.post("/qa")
-async def qa_endpoint(req: QARequest):
+async def qa_endpoint(req: QARequest, state: AppState = Depends(get_state)):
     if not state.full_text:
         raise HTTPException(status_code=400, detail="No book uploaded")
     
     try:
-        answer = ask_question(state.full_text, req.question)
+        answer = await ask_question(state.full_text, req.question)
         return {"answer": answer}
     except Exception as e:
         print(f"QA Error: {type(e).__name__} - {e}")
@@ -51,13 +51,24 @@ async def qa_endpoint(req: QARequest):
         raise HTTPException(status_code=500, detail="Question answering failed. Please try again.")
 
 
+@router.post("/qa/stream")
+async def qa_stream_endpoint(req: QARequest, state: AppState = Depends(get_state)):
+    if not state.full_text:
+        raise HTTPException(status_code=400, detail="No book uploaded")
+    
+    return StreamingResponse(
+        ask_question_stream(state.full_text, req.question),
+        media_type="text/plain; charset=utf-8"
+    )
+
+
 @router.get("/suggested_questions")
-async def suggested_questions_endpoint():
+async def suggested_questions_endpoint(state: AppState = Depends(get_state)):
     if not state.full_text:
         return {"questions": []}
         
     try:
-        questions = suggest_questions(state.full_text)
+        questions = await suggest_questions(state.full_text)
         return {"questions": questions}
     except Exception as e:
         print(f"Suggested questions error: {e}")
@@ -69,7 +80,7 @@ async def suggested_questions_endpoint():
 # ============================================================================
 
 @router.post("/generate/podcast")
-async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
+async def generate_podcast_endpoint(background_tasks: BackgroundTasks, state: AppState = Depends(get_state)):
     if not state.full_text:
         raise HTTPException(status_code=400, detail="No book uploaded")
         
@@ -79,9 +90,10 @@ async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
         print(f"Book text length: {len(state.full_text)} characters")
         print("=" * 50)
         
-        # 1. Generate Script
-        print("📝 Step 1: Generating script...")
-        script = await generate_podcast_script(state.full_text)
+        # 1+2. Generate script and audio (TTS starts as each segment streams in)
+        print("📝 Step 1: Generating script and audio...")
+        podcast_dir = book_asset_dir("podcast", state.book_id)
+        script, audio_files = await generate_podcast(state.full_text, podcast_dir)
         
         # Check if script is error fallback
         is_error_fallback = (
@@ -101,15 +113,11 @@ async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
         
         print(f"✅ Script generated: {len(script)} segments")
         
-        # 2. Generate Audio
-        print("🎵 Step 2: Generating audio...")
-        podcast_dir = os.path.join(UPLOAD_DIR, "podcast")
-        audio_files = await generate_podcast_audio(script, podcast_dir)
-        
         if not audio_files:
             raise HTTPException(status_code=500, detail="Audio generation failed - no files created")
         
         print(f"✅ Audio generated: {len(audio_files)} files")
+        full_audio = await concatenate_podcast_audio(audio_files, podcast_dir)
         
         # 3. Return playlist
         playlist = []
@@ -119,7 +127,7 @@ async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
                 playlist.append({
                     "speaker": speaker,
                     "text": script[i]["text"],
-                    "url": f"/api/assets/podcast/{filename}"
+                    "url": asset_url(os.path.join(podcast_dir, filename))
                 })
         
         print("=" * 50)
@@ -132,7 +140,10 @@ async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
             if state.analysis_result:
                 state.analysis_result["podcast"] = playlist
             
-        return {"playlist": playlist}
+        return {
+            "playlist": playlist,
+            "full_audio": asset_url(os.path.join(podcast_dir, full_audio)) if full_audio else None
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -165,7 +176,7 @@ async def generate_podcast_endpoint(background_tasks: BackgroundTasks):
 # ============================================================================
 
 @router.post("/storybook/generate")
-async def generate_storybook_api(config: StorybookConfig = None):
+async def generate_storybook_api(config: StorybookConfig = None, state: AppState = Depends(get_state)):
     """Generate a complete 2D illustrated storybook from the loaded book."""
     try:
         if not state.ingestion_result:
@@ -219,7 +230,7 @@ async def generate_storybook_api(config: StorybookConfig = None):
 
 
 @router.get("/storybook/page/{page_num}")
-async def get_storybook_page(page_num: int):
+async def get_storybook_page(page_num: int, state: AppState = Depends(get_state)):
     """Get a specific storybook page image."""
     try:
         if not state.ingestion_result:
@@ -244,7 +255,7 @@ async def get_storybook_page(page_num: int):
 # ============================================================================
 
 @router.get("/download_all")
-async def download_all_content():
+async def download_all_content(state: AppState = Depends(get_state)):
     if not state.ingestion_result:
         raise HTTPException(status_code=400, detail="No book loaded")
         
@@ -273,10 +284,12 @@ async def download_all_content():
             for seg in podcast:
                 url = seg.get("url", "")
                 if url:
-                    filename = os.path.basename(url)
-                    path = os.path.join(UPLOAD_DIR, "podcast", filename)
+                    path = asset_path(url)
                     if os.path.exists(path):
                         files_to_zip.append(path)
+            full_path = os.path.join(book_asset_dir("podcast", state.book_id), PODCAST_FULL_FILENAME)
+            if os.path.exists(full_path):
+                files_to_zip.append(full_path)
                         
         # 5. Immersive Audio
         if state.immersive_audio_paths:
@@ -316,7 +329,7 @@ async def download_all_content():
 
 # Serve video assets from OUTPUT_DIR
 @router.get("/assets/videos/{filename}")
-async def serve_video(filename: str):
+async def serve_video(filename: str, state: AppState = Depends(get_state)):
     """Serve video files from the latest book's videos directory"""
     from src.state import OUTPUT_DIR
     try:
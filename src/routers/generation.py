@@ -1,20 +1,22 @@
 """Generation router — audio, visuals, portraits, video for Book2Vision API."""
 
+import asyncio
 import os
 import shutil
 import time
 import traceback
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form
-from fastapi.responses import FileResponse
+import uuid
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form, Depends
+from fastapi.responses import FileResponse, StreamingResponse
 
-from src.state import state, UPLOAD_DIR, OUTPUT_DIR, library_manager
+from src.state import AppState, get_state, voice_clone_settings, book_asset_dir, asset_url, UPLOAD_DIR, OUTPUT_DIR, library_manager
 from src.models import (
     AudioRequest, VisualsRequest, ImmersiveAudioRequest,
     CharacterPortraitsRequest, VideoRequest
 )
-from src.audio import generate_audio as generate_audio_service
+from src.audio import generate_audio as generate_audio_service, generate_audio_many, stream_audio as stream_audio_service
 from src.visuals import (
-    generate_images, generate_entity_image, generate_poster_with_deapi
+    generate_images, generate_entity_image, generate_poster_with_deapi, ENTITY_DEFAULT_SEED
 )
 from src.video import generate_video_with_deapi
 
@@ -26,7 +28,7 @@ router = APIRouter(prefix="/api", tags=["generation"])
 # ============================================================================
 
 @router.post("/generate/audio")
-async def generate_audio(req: AudioRequest):
+async def generate_audio(req: AudioRequest, state: AppState = Depends(get_state)):
     try:
         print(f"=== Audio Generation Request ===")
         print(f"Text length: {len(req.text)}")
@@ -97,6 +99,50 @@ async def generate_audio(req: AudioRequest):
         raise HTTPException(status_code=500, detail="Audio generation failed. Please try again or contact support.")
 
 
+@router.post("/generate/audio/stream")
+async def generate_audio_stream(req: AudioRequest, state: AppState = Depends(get_state)):
+    """Like /generate/audio, but streams the MP3 while the provider is still synthesizing it."""
+    if not req.text:
+        raise HTTPException(status_code=400, detail="No text provided for audio generation")
+    
+    preview_text = req.text[:2000]
+    filename = f"audiobook_{int(time.time())}.mp3"
+    output_path = os.path.join(UPLOAD_DIR, filename)
+    
+    title = None
+    author = None
+    if state.ingestion_result:
+        title = state.ingestion_result.get("title")
+        author = state.ingestion_result.get("author")
+    
+    chunks = stream_audio_service(
+        preview_text,
+        output_path,
+        voice_id=req.voice_id,
+        stability=req.stability,
+        similarity_boost=req.similarity_boost,
+        style=req.style,
+        use_speaker_boost=req.use_speaker_boost,
+        provider=req.provider,
+        title=title,
+        author=author
+    )
+    # Wait for the first bytes so failures still surface as a proper HTTP error
+    try:
+        first_chunk = await anext(chunks)
+    except Exception as e:
+        print(f"=== AUDIO STREAM ERROR === {e}")
+        raise HTTPException(status_code=500, detail="Audio generation failed. Please try again or contact support.")
+    
+    async def body():
+        yield first_chunk
+        async for data in chunks:
+            yield data
+        state.audiobook_path = output_path  # Track for download once complete
+    
+    return StreamingResponse(body(), media_type="audio/mpeg")
+
+
 @router.post("/upload-voice-sample")
 async def upload_voice_sample(voice_sample: UploadFile = File(...)):
     """Upload a voice sample for the Colab Voice Clone provider."""
@@ -118,7 +164,7 @@ async def upload_voice_sample(voice_sample: UploadFile = File(...)):
             shutil.copyfileobj(voice_sample.file, buffer)
             
         # Update state
-        state.voice_sample_path = filepath
+        voice_clone_settings.voice_sample_path = filepath
         
         return {"message": "Voice sample uploaded successfully", "filename": filename}
     except HTTPException:
@@ -135,7 +181,7 @@ class ColabUrlRequest(BaseModel):
 @router.post("/set-colab-url")
 async def set_colab_url(req: ColabUrlRequest):
     """Set the ngrok URL for the Colab Voice Clone provider."""
-    state.colab_url = req.url
+    voice_clone_settings.colab_url = req.url
     print(f"Colab URL set to: {req.url}")
     return {"message": "Colab URL saved successfully."}
 
@@ -143,8 +189,22 @@ async def set_colab_url(req: ColabUrlRequest):
 # VISUALS
 # ============================================================================
 
+def _swap_out_visuals_dir(visuals_dir):
+    """
+    Replaces a book's visuals directory with an empty one. The old directory is renamed
+    aside (one metadata operation) and its path returned for deletion in the background,
+    or None if there was nothing to clear.
+    """
+    if not os.path.isdir(visuals_dir) or not os.listdir(visuals_dir):
+        os.makedirs(visuals_dir, exist_ok=True)
+        return None
+    stale_dir = f"{visuals_dir}.stale.{uuid.uuid4().hex}"
+    os.rename(visuals_dir, stale_dir)
+    os.makedirs(visuals_dir, exist_ok=True)
+    return stale_dir
+
 @router.post("/generate/visuals")
-async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTasks):
+async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTasks, state: AppState = Depends(get_state)):
     if not state.analysis_result:
         raise HTTPException(status_code=400, detail="Analyze book first")
     
@@ -158,22 +218,17 @@ async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTask
 
         
     try:
-        visuals_dir = os.path.join(UPLOAD_DIR, "visuals")
-        os.makedirs(visuals_dir, exist_ok=True)
-        
-        # Clean directory but PRESERVE COVERS
-        for filename in os.listdir(visuals_dir):
-            if filename.startswith("cover_"):
-                continue  # Skip covers
-            
-            file_path = os.path.join(visuals_dir, filename)
-            try:
-                if os.path.isfile(file_path) or os.path.islink(file_path):
-                    os.unlink(file_path)
-                elif os.path.isdir(file_path):
-                    shutil.rmtree(file_path)
-            except Exception as e:
-                print(f"Failed to delete {file_path}. Reason: {e}")
+        # Scene images live per book (covers stay in visuals/ itself, shared with the library)
+        visuals_dir = book_asset_dir("visuals", state.book_id)
+        # Stop this book's previous run first, so it isn't still writing into the directory being replaced
+        previous = state.visuals_task
+        if previous is not None and not previous.done():
+            previous.cancel()
+            await asyncio.gather(previous, return_exceptions=True)
+        # Swap in an empty directory now; the old images are deleted after the response is sent
+        stale_dir = await asyncio.to_thread(_swap_out_visuals_dir, visuals_dir)
+        if stale_dir:
+            background_tasks.add_task(shutil.rmtree, stale_dir, ignore_errors=True)
         
         # Get title - prefer filename if title is generic
         title = state.ingestion_result.get("title", "Unknown") if state.ingestion_result else "Book"
@@ -214,16 +269,15 @@ async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTask
         print(f"Expected Images: {len(expected_images)}")
         print("=" * 50)
         
-        # Start background generation
-        background_tasks.add_task(
-            generate_images, 
+        # Start background generation (kept on the state so a later request can cancel it)
+        state.visuals_task = asyncio.create_task(generate_images(
             state.analysis_result, 
             visuals_dir, 
             style=req.style, 
             seed=req.seed, 
             title=title, 
             include_entities=True
-        )
+        ))
         
         # Update thumbnail in library
         if state.book_id:
@@ -239,10 +293,11 @@ async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTask
                      thumbnail_filename = expected_images[0]
                 
                 if thumbnail_filename:
-                    library_manager.update_book_thumbnail(state.book_id, f"visuals/{thumbnail_filename}")
+                    thumbnail_path = os.path.relpath(os.path.join(visuals_dir, thumbnail_filename), UPLOAD_DIR)
+                    library_manager.update_book_thumbnail(state.book_id, thumbnail_path.replace(os.sep, "/"))
 
         # Return relative paths for frontend immediately
-        image_urls = [f"/api/assets/visuals/{img}" for img in expected_images]
+        image_urls = [asset_url(path) for path in state.images_list]
         print(f"✅ Returning {len(image_urls)} expected images to frontend: {image_urls}")
         return {"images": image_urls, "status": "generating"}
     except HTTPException:
@@ -254,7 +309,7 @@ async def generate_visuals(req: VisualsRequest, background_tasks: BackgroundTask
 
 
 @router.post("/generate/poster")
-async def generate_poster(background_tasks: BackgroundTasks):
+async def generate_poster(background_tasks: BackgroundTasks, state: AppState = Depends(get_state)):
     if not state.book_id:
         raise HTTPException(status_code=400, detail="No book loaded")
     
@@ -297,47 +352,50 @@ async def generate_poster(background_tasks: BackgroundTasks):
 
 
 @router.get("/entity_image/{name}")
-async def get_entity_image(name: str, role: str = "Character", regenerate: bool = False):
-    # Check cache unless regenerating
-    if not regenerate and name in state.entity_images:
-        return {"image_url": f"/api/assets/entities/{os.path.basename(state.entity_images[name])}"}
-        
-    try:
-        img_dir = os.path.join(UPLOAD_DIR, "entities")
-        os.makedirs(img_dir, exist_ok=True)
-        
-        # If regenerating, maybe use a new seed or just re-call
-        seed = None if regenerate else 42
-        
-        # Look up full entity details from the analysis
-        description = ""
-        outfit = ""
-        signature_prop = ""
-        if state.analysis_result:
-            for ent in state.analysis_result.get("entities", []):
-                if isinstance(ent, (list, tuple)) and len(ent) >= 1 and ent[0] == name:
-                    role = ent[1] if len(ent) > 1 else role
-                    description = ent[2] if len(ent) > 2 else ""
-                    outfit = ent[3] if len(ent) > 3 else ""
-                    signature_prop = ent[4] if len(ent) > 4 else ""
-                    break
-        
-        img_path = await generate_entity_image(
-            name, role, img_dir, seed=seed,
-            description=description,
-            outfit=outfit,
-            signature_prop=signature_prop
-        )
-        
-        if img_path:
-            state.entity_images[name] = img_path
-            # Add timestamp to URL to bust browser cache
-            return {"image_url": f"/api/assets/entities/{os.path.basename(img_path)}?t={int(time.time())}"}
-        else:
+async def get_entity_image(name: str, role: str = "Character", regenerate: bool = False, state: AppState = Depends(get_state)):
+    # One generation per entity at a time: concurrent requests for the same name wait
+    # for the first and then hit the cache instead of generating it again
+    async with state.entity_locks[name]:
+        # Check cache unless regenerating
+        if not regenerate and name in state.entity_images:
+            return {"image_url": f"/api/assets/entities/{os.path.basename(state.entity_images[name])}"}
+            
+        try:
+            img_dir = os.path.join(UPLOAD_DIR, "entities")
+            os.makedirs(img_dir, exist_ok=True)
+            
+            # Regenerating draws a new seed (and so a new cache entry); otherwise the disk cache answers
+            seed = None if regenerate else ENTITY_DEFAULT_SEED
+            
+            # Look up full entity details from the analysis
+            description = ""
+            outfit = ""
+            signature_prop = ""
+            if state.analysis_result:
+                for ent in state.analysis_result.get("entities", []):
+                    if isinstance(ent, (list, tuple)) and len(ent) >= 1 and ent[0] == name:
+                        role = ent[1] if len(ent) > 1 else role
+                        description = ent[2] if len(ent) > 2 else ""
+                        outfit = ent[3] if len(ent) > 3 else ""
+                        signature_prop = ent[4] if len(ent) > 4 else ""
+                        break
+            
+            img_path = await generate_entity_image(
+                name, role, img_dir, seed=seed,
+                description=description,
+                outfit=outfit,
+                signature_prop=signature_prop
+            )
+            
+            if img_path:
+                state.entity_images[name] = img_path
+                # Add timestamp to URL to bust browser cache
+                return {"image_url": f"/api/assets/entities/{os.path.basename(img_path)}?t={int(time.time())}"}
+            else:
+                return {"image_url": None}
+        except Exception as e:
+            print(f"Entity image error: {e}")
             return {"image_url": None}
-    except Exception as e:
-        print(f"Entity image error: {e}")
-        return {"image_url": None}
 
 
 # ============================================================================
@@ -345,7 +403,7 @@ async def get_entity_image(name: str, role: str = "Character", regenerate: bool
 # ============================================================================
 
 @router.post("/generate/character-portraits")
-async def generate_character_portraits_endpoint(req: CharacterPortraitsRequest, background_tasks: BackgroundTasks):
+async def generate_character_portraits_endpoint(req: CharacterPortraitsRequest, background_tasks: BackgroundTasks, state: AppState = Depends(get_state)):
     """Generate consistent character portraits for all detected characters."""
     if not state.analysis_result:
         raise HTTPException(status_code=400, detail="Analyze book first")
@@ -395,7 +453,7 @@ async def generate_character_portraits_endpoint(req: CharacterPortraitsRequest,
 
 
 @router.get("/character/{name}/portrait")
-async def get_character_portrait(name: str, style: str = "anime", genre: str = "fantasy"):
+async def get_character_portrait(name: str, style: str = "anime", genre: str = "fantasy", state: AppState = Depends(get_state)):
     """Get or generate a single character portrait."""
     # Look for existing portrait
     portraits_dir = os.path.join(UPLOAD_DIR, "portraits")
@@ -460,7 +518,7 @@ async def get_character_portrait(name: str, style: str = "anime", genre: str = "
 
 
 @router.get("/character/{name}/sheet")
-async def get_character_sheet(name: str, style: str = "anime"):
+async def get_character_sheet(name: str, style: str = "anime", state: AppState = Depends(get_state)):
     """Get or generate a character reference sheet."""
     portraits_dir = os.path.join(UPLOAD_DIR, "portraits")
     safe_name = "".join([c if c.isalnum() else "_" for c in name])[:30]
@@ -542,46 +600,40 @@ async def serve_portrait(filename: str):
 # ============================================================================
 
 async def generate_scene_audios(scenes, output_dir, voice_id, provider):
-    """Helper to generate audio for all scenes sequentially."""
+    """Helper to generate audio for all scenes concurrently."""
+    items = []
     for i, scene in enumerate(scenes):
-        try:
-            # Handle both dict and string formats
-            if isinstance(scene, dict):
-                text = f"{scene.get('narrator_intro', '')} {scene.get('excerpt', '')}".strip()
-                if not text:
-                    text = scene.get('description', '')  # Fallback
-            else:
-                text = str(scene)
-            
-            filename = f"immersive_scene_{i+1:02d}.mp3"
-            output_path = os.path.join(output_dir, filename)
-            
-            print(f"Generating immersive audio for scene {i+1}...")
-            await generate_audio_service(
-                text, 
-                output_path, 
-                voice_id=voice_id,
-                provider=provider
-            )
-        except Exception as e:
-            print(f"Failed to generate audio for scene {i+1}: {e}")
+        # Handle both dict and string formats
+        if isinstance(scene, dict):
+            text = f"{scene.get('narrator_intro', '')} {scene.get('excerpt', '')}".strip()
+            if not text:
+                text = scene.get('description', '')  # Fallback
+        else:
+            text = str(scene)
+        
+        filename = f"immersive_scene_{i+1:02d}.mp3"
+        items.append((text, os.path.join(output_dir, filename)))
+    
+    print(f"Generating immersive audio for {len(items)} scenes...")
+    await generate_audio_many(items, provider=provider, voice_id=voice_id)
 
 
 @router.post("/generate/immersive_audio")
-async def generate_immersive_audio(req: ImmersiveAudioRequest, background_tasks: BackgroundTasks):
+async def generate_immersive_audio(req: ImmersiveAudioRequest, background_tasks: BackgroundTasks, state: AppState = Depends(get_state)):
     if not state.analysis_result or not state.analysis_result.get("scenes"):
         raise HTTPException(status_code=400, detail="No scenes available. Analyze book first.")
         
     try:
-        immersive_dir = os.path.join(UPLOAD_DIR, "immersive_audio")
-        os.makedirs(immersive_dir, exist_ok=True)
+        immersive_dir = book_asset_dir("immersive_audio", state.book_id)
+        visuals_dir = book_asset_dir("visuals", state.book_id)
         
         scenes = state.analysis_result.get("scenes", [])
         expected_audio = []
+        scene_images = []
         
         for i in range(len(scenes)):
-            filename = f"immersive_scene_{i+1:02d}.mp3"
-            expected_audio.append(f"/api/assets/immersive_audio/{filename}")
+            expected_audio.append(asset_url(os.path.join(immersive_dir, f"immersive_scene_{i+1:02d}.mp3")))
+            scene_images.append(asset_url(os.path.join(visuals_dir, f"image_01_scene_{i+1:02d}.jpg")))
             
         # Start background generation
         background_tasks.add_task(
@@ -595,7 +647,7 @@ async def generate_immersive_audio(req: ImmersiveAudioRequest, background_tasks:
         # Track expected paths for download
         state.immersive_audio_paths = [os.path.join(immersive_dir, os.path.basename(url)) for url in expected_audio]
         
-        return {"audio_urls": expected_audio, "status": "generating"}
+        return {"audio_urls": expected_audio, "image_urls": scene_images, "status": "generating"}
     except Exception as e:
         print(f"Immersive audio error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -606,7 +658,7 @@ async def generate_immersive_audio(req: ImmersiveAudioRequest, background_tasks:
 # ============================================================================
 
 @router.post("/generate/scene_video")
-async def generate_scene_video(req: VideoRequest):
+async def generate_scene_video(req: VideoRequest, state: AppState = Depends(get_state)):
     """Generate video from a scene image using DepAI"""
     try:
         # Find the image file
@@ -4,7 +4,7 @@ import os
 import traceback
 from fastapi import APIRouter, HTTPException
 
-from src.state import state, UPLOAD_DIR, library_manager
+from src.state import AppState, register_state, states, UPLOAD_DIR, library_manager
 from src.ingestion import ingest_book
 from src.analysis import semantic_analysis
 
@@ -28,13 +28,13 @@ async def delete_book(book_id: int):
     success = library_manager.delete_book(book_id)
     if not success:
         raise HTTPException(status_code=404, detail="Book not found")
+    states.pop(book_id, None)
     return {"message": "Book deleted successfully"}
 
 
 @router.post("/library/load/{book_id}")
 async def load_book(book_id: int):
-    """Load a book from the library into active state."""
-    state.book_id = book_id
+    """Load a book from the library into its own state and make it the active book."""
     book = library_manager.get_book(book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -47,6 +47,7 @@ async def load_book(book_id: int):
         library_manager.delete_book(book_id)
         raise HTTPException(status_code=404, detail="Book file not found on server")
     
+    state = AppState()
     try:
         # Try to load from DB first
         full_text = library_manager.get_book_full_text(book_id)
@@ -82,8 +83,10 @@ async def load_book(book_id: int):
             library_manager.add_book(book, full_text=state.full_text)
             library_manager.save_analysis(book_id, analysis)
         
+        register_state(book_id, state)
         return {
             "message": "Book loaded successfully",
+            "book_id": book_id,
             "filename": filename,
             "analysis": state.analysis_result,
             "title": book["title"],
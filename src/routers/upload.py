@@ -2,20 +2,48 @@
 
 import os
 import asyncio
-import aiofiles
 import mimetypes
 import time
 import traceback
+from contextlib import AsyncExitStack
 from pathlib import Path
 from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks
 
-from src.state import state, UPLOAD_DIR, MAX_FILE_SIZE_MB, ALLOWED_EXTENSIONS, ALLOWED_MIMETYPES, library_manager
+from src.state import AppState, register_state, UPLOAD_DIR, MAX_FILE_SIZE_MB, ALLOWED_EXTENSIONS, ALLOWED_MIMETYPES, library_manager
 from src.ingestion import ingest_book
+from src.audio import warm_up_tts_providers
 from src.analysis import semantic_analysis
-from src.visuals import generate_entity_image, generate_poster_with_deapi
+from src.visuals import generate_entity_images_batch, generate_poster_with_deapi
 
 router = APIRouter(prefix="/api", tags=["upload"])
 
+# Strong references to fire-and-forget tasks so they aren't garbage-collected mid-flight
+_background_tasks = set()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _save_upload(source, file_path, max_size_bytes):
+    """
+    Copies the spooled upload to file_path in one worker-thread call (instead of a thread-pool
+    round trip per read and per write), reusing a single buffer.
+    Returns the size written, or None (and removes the partial file) if it exceeds max_size_bytes.
+    """
+    total_size = 0
+    buffer = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    source.seek(0)
+    with open(file_path, "wb") as out:
+        while n := source.readinto(buffer):
+            total_size += n
+            if total_size > max_size_bytes:
+                break
+            out.write(view[:n])
+    if total_size > max_size_bytes:
+        os.remove(file_path)
+        return None
+    return total_size
+
 
 @router.post("/upload")
 async def upload_book(file: UploadFile = File(...), background_tasks: BackgroundTasks = None):
@@ -43,22 +71,12 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
         file_path = os.path.join(UPLOAD_DIR, safe_filename)
         
         # 4. Check file size during streaming (prevent DoS)
-        total_size = 0
         max_size_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
-        
-        async with aiofiles.open(file_path, "wb") as buffer:
-            while chunk := await file.read(8192):  # Read in 8KB chunks
-                total_size += len(chunk)
-                if total_size > max_size_bytes:
-                    # File too large - clean up and reject
-                    await buffer.close()
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    raise HTTPException(
-                        status_code=413,
-                        detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB"
-                    )
-                await buffer.write(chunk)
+        if await asyncio.to_thread(_save_upload, file.file, file_path, max_size_bytes) is None:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File too large. Maximum size: {MAX_FILE_SIZE_MB}MB"
+            )
         
         # 5. Verify MIME type after upload (content-based detection)
         detected_type, _ = mimetypes.guess_type(file_path)
@@ -69,6 +87,11 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
                 detail=f"File content type not allowed: {detected_type}"
             )
         
+        # Warm TTS connections in the background while the book is parsed
+        warm_up_task = asyncio.create_task(warm_up_tts_providers())
+        _background_tasks.add(warm_up_task)
+        warm_up_task.add_done_callback(_background_tasks.discard)
+        
         # Ingest
         try:
             ingestion_result = await ingest_book(file_path)
@@ -80,7 +103,8 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
                  os.remove(file_path)
              raise HTTPException(status_code=400, detail="File processing failed. Please ensure the file is a valid book format.")
         
-        # Store state
+        # Store state (a fresh one per upload; it becomes visible once the book has an id)
+        state = AppState()
         state.ingestion_result = ingestion_result
         state.full_text = ingestion_result.get("full_text", "")
         
@@ -101,16 +125,17 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
 
         
         # Add to library FIRST (so we have book_id)
-        new_book = library_manager.add_book({
+        # (SQLite writes run in a worker thread so other requests keep being served)
+        new_book = await asyncio.to_thread(library_manager.add_book, {
             "title": ingestion_result.get("title", "Unknown"),
             "author": ingestion_result.get("author", "Unknown"),
             "filename": safe_filename
         }, full_text=state.full_text)
-        state.book_id = new_book["id"]
+        register_state(new_book["id"], state)
         
         # Save analysis to DB
         if state.analysis_result:
-             library_manager.save_analysis(state.book_id, state.analysis_result)
+             await asyncio.to_thread(library_manager.save_analysis, state.book_id, state.analysis_result)
         
         # Auto-generate cover in background (after book_id is set)
         title = ingestion_result.get("title", "Unknown")
@@ -137,44 +162,47 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
                     if title == "Extracted PDF" or title == "Book":
                          gen_title = safe_filename.replace("_", " ").replace(".pdf", "").replace(".epub", "")
                     
-                    print(f"🎭 Generating top entities for: {gen_title}")
-                    # Generate top 3 entities first (Sequential: Entities -> Cover)
+                    print(f"🎭 Generating top entities and cover for: {gen_title}")
+                    # Top 3 entities and the cover run concurrently (deAPI pacing is done by its rate limiter)
                     top_entities = characters[:3] if characters else []
                     entity_dir = os.path.join(UPLOAD_DIR, "entities")
                     os.makedirs(entity_dir, exist_ok=True)
                     
+                    batch = []
                     for entity in top_entities:
+                        # Parse entity — full format is [name, role, description, outfit, signature_prop]
+                        if isinstance(entity, (list, tuple)) and len(entity) >= 2:
+                            batch.append({
+                                "name": entity[0],
+                                "role": entity[1],
+                                "description": entity[2] if len(entity) > 2 else "",
+                                "outfit": entity[3] if len(entity) > 3 else "",
+                                "signature_prop": entity[4] if len(entity) > 4 else ""
+                            })
+                        else:
+                            batch.append({"name": str(entity), "role": "Character"})
+                    
+                    async def generate_entities():
                         try:
-                            # Parse entity — full format is [name, role, description, outfit, signature_prop]
-                            if isinstance(entity, (list, tuple)) and len(entity) >= 2:
-                                name = entity[0]
-                                role = entity[1] if len(entity) > 1 else "Character"
-                                description = entity[2] if len(entity) > 2 else ""
-                                outfit = entity[3] if len(entity) > 3 else ""
-                                signature_prop = entity[4] if len(entity) > 4 else ""
-                            else:
-                                name = str(entity)
-                                role = "Character"
-                                description = ""
-                                outfit = ""
-                                signature_prop = ""
-                            
-                            print(f"   Generating entity: {name}")
-                            await generate_entity_image(
-                                name, role, entity_dir,
-                                description=description,
-                                outfit=outfit,
-                                signature_prop=signature_prop
-                            )
-                            # Longer delay between entities to respect deAPI rate limits (free tier: 1-10 RPM)
-                            await asyncio.sleep(3)
+                            async with AsyncExitStack() as stack:
+                                # Hold the entity locks so /api/entity_image waits for these
+                                # instead of generating them a second time
+                                for name in dict.fromkeys(e["name"] for e in batch):
+                                    await stack.enter_async_context(state.entity_locks[name])
+                                pending = [e for e in batch if e["name"] not in state.entity_images]
+                                paths = await generate_entity_images_batch(pending, entity_dir) if pending else []
+                                for entity, path in zip(pending, paths):
+                                    if path:
+                                        state.entity_images[entity["name"]] = path
                         except Exception as e:
-                            print(f"⚠️ Failed to auto-generate entity {name}: {e}")
+                            print(f"⚠️ Failed to auto-generate entities: {e}")
 
-                    print(f"🎨 Starting cover generation for: {gen_title}")
-                    cover_path = await generate_poster_with_deapi(
-                        gen_title, author, visuals_dir, 
-                        theme=theme, characters=characters
+                    cover_path, _ = await asyncio.gather(
+                        generate_poster_with_deapi(
+                            gen_title, author, visuals_dir, 
+                            theme=theme, characters=characters
+                        ),
+                        generate_entities()
                     )
                     
                     if cover_path and state.book_id:
@@ -190,6 +218,7 @@ async def upload_book(file: UploadFile = File(...), background_tasks: Background
         
         return {
             "message": "Upload successful",
+            "book_id": state.book_id,
             "filename": safe_filename,
             "analysis": analysis,
             "title": ingestion_result.get("title", "Unknown"),
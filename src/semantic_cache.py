@@ -0,0 +1,93 @@
+"""Embedding-similarity cache for LLM answers, so paraphrased questions reuse an earlier answer."""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Small, fast sentence encoder (384-dim); sentence-transformers is in requirements.txt, but without it the cache stays empty
+SEMANTIC_CACHE_MODEL = "all-MiniLM-L6-v2"
+# Cosine similarity above which two questions count as the same question
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_MAX_ENTRIES = 256  # Per scope (book); oldest entries are dropped first
+SEMANTIC_CACHE_MAX_SCOPES = 8
+
+
+class LLMSemanticCache:
+    """
+    Per-scope matrix of L2-normalized query embeddings with a parallel list of responses.
+    A lookup is one matrix-vector product; scopes keep answers from leaking across books.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        max_scopes: int = SEMANTIC_CACHE_MAX_SCOPES,
+        model_name: str = SEMANTIC_CACHE_MODEL
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self.model_name = model_name
+        self._model = None  # None = not loaded yet, False = unavailable
+        self._model_lock = threading.Lock()
+        self._scopes = OrderedDict()  # scope -> (embedding matrix, responses)
+
+    def _get_model(self):
+        with self._model_lock:
+            if self._model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    # Logged once: the model is never retried after this
+                    print(f"⚠️ Semantic cache disabled (needs sentence-transformers and {self.model_name}): {e}")
+                    self._model = False
+        return self._model or None
+
+    def _embed(self, text):
+        model = self._get_model()
+        if model is None:
+            return None
+        return model.encode(text.strip(), normalize_embeddings=True)
+
+    async def embed(self, text: str):
+        """Embedding for text (None when no encoder is available). Runs off the event loop."""
+        if self._model is False:
+            return None
+        return await asyncio.to_thread(self._embed, text)
+
+    def lookup(self, scope, embedding) -> Optional[str]:
+        """Response stored for the most similar earlier query in scope, if it is similar enough."""
+        entry = self._scopes.get(scope)
+        if entry is None or embedding is None:
+            return None
+        matrix, responses = entry
+        # Rows and query are unit vectors, so the dot product is the cosine similarity
+        similarities = matrix @ embedding
+        best = int(similarities.argmax())
+        if similarities[best] < self.threshold:
+            return None
+        self._scopes.move_to_end(scope)
+        return responses[best]
+
+    def insert(self, scope, embedding, response: str):
+        if embedding is None:
+            return
+        import numpy as np
+
+        row = np.asarray(embedding, dtype=np.float32).reshape(1, -1)
+        entry = self._scopes.get(scope)
+        if entry is None:
+            matrix, responses = row, [response]
+        else:
+            matrix, responses = entry
+            keep = self.max_entries - 1
+            matrix = np.vstack((matrix[-keep:], row)) if keep else row
+            responses = responses[-keep:] + [response] if keep else [response]
+
+        self._scopes[scope] = (matrix, responses)
+        self._scopes.move_to_end(scope)
+        while len(self._scopes) > self.max_scopes:
+            self._scopes.popitem(last=False)
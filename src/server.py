@@ -5,7 +5,10 @@ Endpoint logic lives in src/routers/.
 """
 
 import os
+import logging
+import queue
 import uvicorn
+from logging.handlers import QueueHandler, QueueListener
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
@@ -20,6 +23,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import src.config
 
 from src.state import BASE_DIR, UPLOAD_DIR
+from src.http_session import close_session
+from src.audio import shutdown_cpu_pool
+from src.podcast import start_podcast_generator, stop_podcast_generator
+from src.knowledge import preload_spacy
 from src.routers import upload_router, generation_router, content_router, library_router
 
 
@@ -27,8 +34,26 @@ from src.routers import upload_router, generation_router, content_router, librar
 # APP LIFESPAN
 # ============================================================================
 
+def _start_log_queue() -> QueueListener:
+    """
+    Route root logging through a queue: tasks only enqueue records, and a listener thread
+    does the (locking) writes to the real handlers.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:] or [logging.StreamHandler()]
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+def _stop_log_queue(listener: QueueListener):
+    listener.stop()
+    logging.getLogger().handlers = list(listener.handlers)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    log_listener = _start_log_queue()
     print("Starting up Book2Vision...")
     print("Access the application at: http://localhost:8000")
     # Validate critical env vars
@@ -46,7 +71,17 @@ async def lifespan(app: FastAPI):
         print("  WARNING: DEAPI_API_KEY is not set. High-quality image generation will fail.")
     else:
         print(" DEAPI_API_KEY found.")
+    
+    # Without an LLM key, quizzes fall back to spaCy; warm it up off the request path
+    if not os.getenv("DEEPSEEK_API_KEY") and not os.getenv("GEMINI_API_KEY"):
+        preload_spacy()
+    start_podcast_generator()
     yield
+    # Release pooled provider connections
+    stop_podcast_generator()
+    await close_session()
+    shutdown_cpu_pool()
+    _stop_log_queue(log_listener)
 
 
 app = FastAPI(title="Book2Vision API", lifespan=lifespan)
@@ -134,4 +169,5 @@ app.mount("/", StaticFiles(directory=WEB_DIR, html=True), name="static")
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     print(f"Server starting... Open your browser at http://localhost:{port}")
-    uvicorn.run("src.server:app", host="0.0.0.0", port=port, reload=False)
+    # "auto" runs on uvloop when installed (POSIX only; Windows stays on the asyncio loop)
+    uvicorn.run("src.server:app", host="0.0.0.0", port=port, reload=False, loop="auto")
@@ -1,6 +1,12 @@
 """Shared application state and configuration for Book2Vision."""
 
+import asyncio
 import os
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from fastapi import HTTPException
+
 from src.library import LibraryManager
 
 
@@ -20,11 +26,38 @@ ALLOWED_EXTENSIONS = {".pdf", ".epub", ".txt"}
 ALLOWED_MIMETYPES = {"application/pdf", "application/epub+zip", "text/plain"}
 
 
+ASSETS_URL_PREFIX = "/api/assets"  # UPLOAD_DIR is served here (see server.py)
+
+
+def book_asset_dir(kind: str, book_id) -> str:
+    """
+    Per-book directory for generated assets, e.g. UPLOAD_DIR/visuals/<book_id>,
+    so regenerating one book's scenes, podcast or audio never touches another book's files.
+    """
+    path = os.path.join(UPLOAD_DIR, kind, str(book_id) if book_id is not None else "latest")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def asset_url(path: str) -> str:
+    """Public URL of a file under UPLOAD_DIR."""
+    return f"{ASSETS_URL_PREFIX}/" + os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/")
+
+
+def asset_path(url: str) -> str:
+    """Inverse of asset_url (query strings are ignored)."""
+    relative = url.split("?", 1)[0][len(ASSETS_URL_PREFIX) + 1:]
+    return os.path.join(UPLOAD_DIR, *relative.split("/"))
+
+
+# Loaded books kept in memory; the least recently used one is dropped beyond this
+MAX_LOADED_BOOKS = 8
+
+
 class AppState:
     """
-    WARNING: This is a global singleton shared across all users.
-    Concurrent users will overwrite each other's data.
-    For production, implement per-session state or database persistence.
+    Working state for one book (text, analysis, generated assets).
+    One instance per library book_id, so concurrent users don't overwrite each other.
     """
     def __init__(self):
         self.ingestion_result = None
@@ -32,11 +65,50 @@ class AppState:
         self.full_text = ""
         self.images_list = []
         self.entity_images = {}
+        # Per-entity locks: on-demand and upload-time generation of one entity never race
+        self.entity_locks = defaultdict(asyncio.Lock)
         self.book_id = None
         self.audiobook_path = None
         self.immersive_audio_paths = []
+        self.visuals_task = None  # Running generate_images for this book, if any
+
+
+class VoiceCloneSettings:
+    """Process-wide voice clone configuration (not tied to a book)."""
+    def __init__(self):
         self.voice_sample_path = None
         self.colab_url = None
 
 
-state = AppState()
+voice_clone_settings = VoiceCloneSettings()
+
+states = OrderedDict()  # book_id -> AppState, least recently used first
+_active_book_id = None  # Most recently uploaded/loaded book, for clients that don't send book_id
+
+
+def register_state(book_id: int, book_state: AppState) -> AppState:
+    """Store book_state under book_id and make it the active book."""
+    global _active_book_id
+    book_state.book_id = book_id
+    states[book_id] = book_state
+    states.move_to_end(book_id)
+    _active_book_id = book_id
+    while len(states) > MAX_LOADED_BOOKS:
+        states.popitem(last=False)
+    return book_state
+
+
+def get_state(book_id: Optional[int] = None) -> AppState:
+    """
+    FastAPI dependency resolving the `book_id` query parameter to that book's state.
+    Without book_id the most recently uploaded/loaded book is used.
+    """
+    if book_id is None:
+        book_id = _active_book_id
+        if book_id not in states:
+            return AppState()  # Nothing loaded yet; endpoints report "no book loaded"
+    book_state = states.get(book_id)
+    if book_state is None:
+        raise HTTPException(status_code=404, detail="Book not loaded. Load it via /api/library/load/{book_id} first.")
+    states.move_to_end(book_id)
+    return book_state
@@ -11,12 +11,13 @@ Features:
 
 import asyncio
 import json
+import os
 import re
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, field, asdict
 
-from google import genai
 from src.config import GEMINI_API_KEY
+from src.gemini_utils import get_gemini_client
 from src.visuals import generate_images, _generate_image_with_deapi, _download_image_async
 
 
@@ -150,7 +151,7 @@ Return ONLY valid JSON array, no other text.
 """
 
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = get_gemini_client(GEMINI_API_KEY)
         response = client.models.generate_content(model='gemini-2.0-flash', contents=prompt)
         
         # Parse JSON response
@@ -230,7 +231,7 @@ Return ONLY valid JSON, no other text.
 """
 
     try:
-        client = genai.Client(api_key=GEMINI_API_KEY)
+        client = get_gemini_client(GEMINI_API_KEY)
         response = client.models.generate_content(model='gemini-2.0-flash', contents=prompt)
         
         json_text = response.text.strip()
@@ -357,7 +358,6 @@ async def generate_storybook_page(
     """
     import urllib.parse
     import aiohttp
-    import os
     
     print(f" Generating illustration for page {page.page_number}...")
     
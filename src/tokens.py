@@ -0,0 +1,34 @@
+"""Token-budget helpers for LLM prompts (tiktoken when installed, a character estimate otherwise)."""
+
+from functools import lru_cache
+
+# Used when tiktoken isn't installed
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+_token_encoder = None
+
+def _get_token_encoder():
+    """Lazily loads the cl100k_base tokenizer (None if tiktoken isn't available)."""
+    global _token_encoder
+    if _token_encoder is None:
+        try:
+            import tiktoken
+            _token_encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"tiktoken unavailable ({e}); truncating context by characters")
+            _token_encoder = False
+    return _token_encoder or None
+
+@lru_cache(maxsize=8)
+def truncate_tokens(text, max_tokens):
+    """
+    Returns the prefix of text that fits in max_tokens.
+    Cached, since the same book text is truncated again for every request about it.
+    """
+    encoder = _get_token_encoder()
+    if encoder is None:
+        return text[:max_tokens * CHARS_PER_TOKEN_ESTIMATE]
+    # Only the head can survive truncation, so don't tokenize the whole book
+    head = text[:max_tokens * 10]
+    ids = encoder.encode(head, disallowed_special=())
+    return encoder.decode(ids[:max_tokens]) if len(ids) > max_tokens else head
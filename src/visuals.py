@@ -1,12 +1,14 @@
 import aiohttp
 import asyncio
+import hashlib
 import os
 import urllib.parse
-import re
 import random
 import logging
 import time
 
+from src.rate_limit import deapi_limiter
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +19,12 @@ MAX_RETRY_ATTEMPTS = 3  # Reduced retries to fail faster
 BASE_RETRY_DELAY_SECONDS = 2
 INTER_REQUEST_DELAY_SECONDS = 1
 
+# Entity avatars are cached on disk under a hash of everything that shapes the image,
+# so a restart or a second request for the same character never regenerates it
+ENTITY_IMAGE_STYLE = "cinematic digital art"
+ENTITY_DEFAULT_SEED = 42
+ENTITY_CACHE_MAX_MB = int(os.getenv("ENTITY_CACHE_MAX_MB", "500"))  # Least recently used avatars go first
+
 # Common headers to avoid being blocked
 DEFAULT_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
@@ -50,53 +58,166 @@ class RateLimitController:
 # Initialize global controller
 rate_limiter = RateLimitController(max_concurrent=MAX_CONCURRENT_REQUESTS)
 
-async def generate_entity_image(entity_name, entity_role, output_dir, seed=None, description="", outfit="", signature_prop=""):
-    """
-    Generates a circular-ready avatar image for an entity (Async).
-    Uses DeAPI (Flux1schnell) for best quality, falls back to Pollinations.
-    Now accepts full character details from semantic analysis for richer prompts.
-    """
-    if seed is None:
-        seed = random.randint(0, 10000)
-        
+def _entity_prompt(entity_name, entity_role, description="", outfit="", signature_prop=""):
+    """Rich deAPI prompt built from the character details of the semantic analysis."""
     from src.prompts import ENTITY_PROMPT_TEMPLATE
     
     # Build the signature line only if it's meaningful
     sig_line = f"Carrying/Holding: {signature_prop}" if signature_prop and signature_prop.lower() not in ["none", "n/a", ""] else ""
     
-    # Use the rich prompt with all available character details
-    prompt = ENTITY_PROMPT_TEMPLATE.format(
+    return ENTITY_PROMPT_TEMPLATE.format(
         name=entity_name,
         role=entity_role,
         description=description or "detailed character",
         outfit=outfit or "appropriate attire",
         signature_line=sig_line,
-        style="cinematic digital art"
+        style=ENTITY_IMAGE_STYLE
     )
+
+def _entity_image_path(output_dir, entity_name, entity_role, seed, description="", outfit="", signature_prop=""):
+    """Deterministic cache path: the same character details and seed always map to the same file."""
+    key_source = "|".join(str(part) for part in (
+        entity_name, entity_role, description, outfit, signature_prop, ENTITY_IMAGE_STYLE, seed
+    ))
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(output_dir, f"entity_{key}.jpg")
+
+def _cached_entity_image(img_path):
+    """Returns img_path if it is already on disk (and marks it recently used), else None."""
+    try:
+        os.utime(img_path)
+        return img_path
+    except OSError:
+        return None
+
+def _evict_entity_cache(output_dir, max_bytes=None):
+    """Deletes the least recently used avatars until the directory fits in max_bytes."""
+    if max_bytes is None:
+        max_bytes = ENTITY_CACHE_MAX_MB * 1024 * 1024
+    files = []
+    try:
+        for entry in os.scandir(output_dir):
+            if entry.is_file() and entry.name.startswith("entity_"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    except OSError:
+        return
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def _entity_pollinations_url(entity_name, entity_role, seed, description="", outfit=""):
+    # Include key visual details but keep it short enough for URL
+    desc_short = (description or "detailed character")[:80]
+    outfit_short = (outfit or "")[:50]
+    short_prompt = f"cinematic portrait of {entity_name}, {entity_role}, {desc_short}, wearing {outfit_short}, digital art, studio lighting, bokeh background"
+    encoded_prompt = urllib.parse.quote(short_prompt[:500])  # Cap total length
+    return f"https://image.pollinations.ai/prompt/{encoded_prompt}?seed={seed}&width=1024&height=1024&model=flux&nologo=true"
+
+async def generate_entity_image(entity_name, entity_role, output_dir, seed=None, description="", outfit="", signature_prop=""):
+    """
+    Generates a circular-ready avatar image for an entity (Async).
+    Uses DeAPI (Flux1schnell) for best quality, falls back to Pollinations.
+    Now accepts full character details from semantic analysis for richer prompts.
+    """
+    if seed is None:
+        seed = random.randint(0, 10000)
     
-    safe_name = re.sub(r'[\\/*?:"<>|\n\r]', "_", entity_name)
-    filename = f"entity_{safe_name}.jpg"
-    img_path = os.path.join(output_dir, filename)
+    img_path = _entity_image_path(output_dir, entity_name, entity_role, seed, description, outfit, signature_prop)
+    if _cached_entity_image(img_path):
+        return img_path
+        
+    # Use the rich prompt with all available character details
+    prompt = _entity_prompt(entity_name, entity_role, description, outfit, signature_prop)
     
+    result = None
     # Try DeAPI first
     api_key = os.getenv("DEAPI_API_KEY")
     if api_key:
         async with aiohttp.ClientSession(headers=DEFAULT_HEADERS) as session:
-            result = await _generate_image_with_deapi(session, prompt, img_path, f"Entity: {entity_name}", width=1024, height=1024)
-            if result:
-                return result
+            result = await _generate_image_with_deapi(session, prompt, img_path, f"Entity: {entity_name}", width=1024, height=1024, seed=seed)
     
-    # Fallback to Pollinations with a concise but descriptive prompt
-    print(f" Falling back to Pollinations for {entity_name}...")
-    # Include key visual details but keep it short enough for URL
-    desc_short = (description or "detailed character")[:80]
-    outfit_short = (outfit or "")[:50]
-    short_prompt = f"cinematic portrait of {entity_name}, {entity_role}, {desc_short}, wearing {outfit_short}, digital art, studio lighting, bokeh background"
-    encoded_prompt = urllib.parse.quote(short_prompt[:500])  # Cap total length
-    image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?seed={seed}&width=1024&height=1024&model=flux&nologo=true"
+    if not result:
+        # Fallback to Pollinations with a concise but descriptive prompt
+        print(f" Falling back to Pollinations for {entity_name}...")
+        image_url = _entity_pollinations_url(entity_name, entity_role, seed, description, outfit)
+        
+        async with aiohttp.ClientSession() as session:
+            result = await _download_image_async(session, image_url, img_path, f"Entity: {entity_name}")
+    
+    if result:
+        await asyncio.to_thread(_evict_entity_cache, output_dir)
+    return result
+
+async def generate_entity_images_batch(entities, output_dir):
+    """
+    Generates avatars for several entities in one go.
+    deAPI jobs are submitted as fast as deapi_limiter allows and polled together, so the batch
+    takes about as long as a single job instead of one job after another; failures fall back to Pollinations.
+    
+    Args:
+        entities: List of dicts with "name", "role" and optional "description", "outfit", "signature_prop"
+        output_dir: Directory for the images
+    
+    Returns:
+        List of image paths in input order (None where generation failed)
+    """
+    if not entities:
+        return []
+    
+    # Same seed as on-demand generation, so both share the disk cache
+    paths = [
+        _entity_image_path(
+            output_dir, e["name"], e["role"], ENTITY_DEFAULT_SEED,
+            e.get("description", ""), e.get("outfit", ""), e.get("signature_prop", "")
+        )
+        for e in entities
+    ]
+    descriptions = [f"Entity: {e['name']}" for e in entities]
+    results = [_cached_entity_image(path) for path in paths]
+    
+    async with aiohttp.ClientSession(headers=DEFAULT_HEADERS) as session:
+        if os.getenv("DEAPI_API_KEY"):
+            async def generate(i, entity):
+                if results[i]:
+                    return results[i]
+                # Submissions are paced by deapi_limiter; jobs are then polled side by side
+                prompt = _entity_prompt(
+                    entity["name"], entity["role"], entity.get("description", ""),
+                    entity.get("outfit", ""), entity.get("signature_prop", "")
+                )
+                job = await _submit_deapi_job(session, prompt, descriptions[i], width=1024, height=1024, seed=ENTITY_DEFAULT_SEED)
+                if job is None:
+                    return None
+                return await _await_deapi_job(session, job, paths[i], descriptions[i])
+            
+            results = list(await asyncio.gather(*(generate(i, e) for i, e in enumerate(entities))))
+        
+        failed = [i for i, result in enumerate(results) if result is None]
+        if failed:
+            print(f" Falling back to Pollinations for {len(failed)} entities...")
+            fallbacks = await asyncio.gather(*(
+                _download_image_async(
+                    session,
+                    _entity_pollinations_url(
+                        entities[i]["name"], entities[i]["role"], ENTITY_DEFAULT_SEED,
+                        entities[i].get("description", ""), entities[i].get("outfit", "")
+                    ),
+                    paths[i], descriptions[i]
+                )
+                for i in failed
+            ))
+            for i, result in zip(failed, fallbacks):
+                results[i] = result
     
-    async with aiohttp.ClientSession() as session:
-        return await _download_image_async(session, image_url, img_path, f"Entity: {entity_name}")
+    await asyncio.to_thread(_evict_entity_cache, output_dir)
+    return results
 
 async def _download_image_async(session, url, output_path, description):
     """
@@ -157,21 +278,22 @@ async def _download_image_async(session, url, output_path, description):
 
 from src.prompts import IMAGE_PROMPT_TEMPLATE, ENTITY_PROMPT_TEMPLATE, TITLE_PROMPT_TEMPLATE, SCENE_PROMPT_TEMPLATE, NEGATIVE_PROMPT, COVER_PROMPT_TEMPLATE
 
-async def _generate_image_with_deapi(session, prompt, output_path, description, width=1920, height=1080):
-    """Helper to generate a single image using deAPI with shared session."""
+def _deapi_headers(api_key):
+    # Use clean headers for deAPI - do NOT merge DEFAULT_HEADERS (browser Accept header conflicts)
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "application/json"
+    }
+
+async def _submit_deapi_job(session, prompt, description, width=1920, height=1080, seed=None):
+    """Queues a deAPI generation job. Returns its request_id, or None on failure."""
     api_key = os.getenv("DEAPI_API_KEY")
     if not api_key:
         print(f" DEAPI_API_KEY missing for {description}")
         return None
 
     try:
-        # Use clean headers for deAPI - do NOT merge DEFAULT_HEADERS (browser Accept header conflicts)
-        api_headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-            "Accept": "application/json"
-        }
-        
         payload = {
             "prompt": prompt,
             "model": "Flux1schnell",
@@ -179,14 +301,15 @@ async def _generate_image_with_deapi(session, prompt, output_path, description,
             "height": height,
             "steps": 6,
             "guidance": 0,
-            "seed": random.randint(1, 999999999),
+            "seed": seed if seed is not None else random.randint(1, 999999999),
             "negative_prompt": NEGATIVE_PROMPT
         }
         
         print(f" deAPI Request (v2): {description}")
-        async with session.post(
+        # Submissions count against deAPI's per-minute budget; polling does not
+        async with deapi_limiter.acquire(), session.post(
             "https://api.deapi.ai/api/v2/images/generations",
-            headers=api_headers,
+            headers=_deapi_headers(api_key),
             json=payload,
             timeout=aiohttp.ClientTimeout(total=30)
         ) as response:
@@ -204,7 +327,15 @@ async def _generate_image_with_deapi(session, prompt, output_path, description,
                 return None
             
             print(f" deAPI Job ID: {request_id}")
-        
+            return request_id
+    except Exception as e:
+        print(f" deAPI Error for {description}: {e}")
+        return None
+
+async def _await_deapi_job(session, request_id, output_path, description):
+    """Polls a deAPI job until it finishes and saves the image. Returns output_path or None."""
+    api_headers = _deapi_headers(os.getenv("DEAPI_API_KEY"))
+    try:
         # Poll using v2 jobs endpoint
         for _ in range(30):
             await asyncio.sleep(2)
@@ -237,6 +368,13 @@ async def _generate_image_with_deapi(session, prompt, output_path, description,
         return None
     return None
 
+async def _generate_image_with_deapi(session, prompt, output_path, description, width=1920, height=1080, seed=None):
+    """Helper to generate a single image using deAPI with shared session."""
+    request_id = await _submit_deapi_job(session, prompt, description, width, height, seed=seed)
+    if request_id is None:
+        return None
+    return await _await_deapi_job(session, request_id, output_path, description)
+
 # ----------------------------------------------------------------------------
 # CHARACTER PORTRAIT SYSTEM
 # ----------------------------------------------------------------------------
@@ -677,7 +815,7 @@ async def generate_poster_with_deapi(title, author, output_dir, style="cinematic
             }
             
             print(f" Sending request to deAPI (v2)...")
-            async with session.post(
+            async with deapi_limiter.acquire(), session.post(
                 "https://api.deapi.ai/api/v2/images/generations",
                 headers=api_headers,
                 json=payload,
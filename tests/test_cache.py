@@ -0,0 +1,56 @@
+import os
+
+from src import cache
+
+
+def test_put_and_get_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    key = cache.cache_key("deepgram", "aura-2-cordelia-en", "Hello there")
+
+    assert cache.get(key) is None
+    cache.put(key, b"audio-bytes")
+    assert cache.get(key) == b"audio-bytes"
+
+
+def test_file_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    src = tmp_path / "clip.mp3"
+    src.write_bytes(b"ID3 fake mp3")
+    dest = tmp_path / "copy.mp3"
+    key = cache.cache_key("elevenlabs", "voice", 0.5, "text")
+
+    assert not cache.get_file(key, str(dest))
+    cache.put_file(key, str(src))
+    assert cache.get_file(key, str(dest))
+    assert dest.read_bytes() == b"ID3 fake mp3"
+
+
+def test_cache_key_separates_parts():
+    assert cache.cache_key("ab", "c") != cache.cache_key("a", "bc")
+    assert cache.cache_key("a", 1) == cache.cache_key("a", "1")
+
+
+def test_file_digest_depends_only_on_contents(tmp_path):
+    a = tmp_path / "a.pdf"
+    b = tmp_path / "b.pdf"
+    a.write_bytes(b"%PDF-1.4 same")
+    b.write_bytes(b"%PDF-1.4 same")
+    assert cache.file_digest(str(a)) == cache.file_digest(str(b))
+
+    b.write_bytes(b"%PDF-1.4 different")
+    assert cache.file_digest(str(a)) != cache.file_digest(str(b))
+
+
+def test_evict_drops_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "CACHE_MAX_MB", 1)
+    old, recent = cache.cache_key("old"), cache.cache_key("recent")
+    cache.put(old, b"x" * 600_000)
+    cache.put(recent, b"y" * 300_000)
+    os.utime(tmp_path / old, (1, 1))
+    assert cache.get(recent) is not None  # A hit refreshes the entry
+
+    cache.put(cache.cache_key("new"), b"z" * 300_000)
+
+    assert cache.get(old) is None
+    assert cache.get(recent) is not None
@@ -0,0 +1,30 @@
+from types import SimpleNamespace
+
+from src import gemini_utils
+
+
+class _FakeModels:
+    def __init__(self, names):
+        self.names = names
+        self.list_calls = 0
+
+    def list(self, **kwargs):
+        self.list_calls += 1
+        return [SimpleNamespace(name=f"models/{name}") for name in self.names]
+
+
+def test_model_selection_is_reused_per_capability(tmp_path, monkeypatch):
+    models = _FakeModels(["gemini-1.5-pro", "gemini-1.5-flash"])
+    monkeypatch.setattr(gemini_utils, "get_gemini_client", lambda api_key=None: SimpleNamespace(models=models))
+    monkeypatch.setattr(gemini_utils, "MODEL_CACHE_PATH", str(tmp_path / "gemini_models.json"))
+    monkeypatch.setattr(gemini_utils, "_model_cache", {"models": None, "timestamp": 0})
+    monkeypatch.setattr(gemini_utils, "_model_selections", {})
+
+    for _ in range(3):
+        _, text_model = gemini_utils.get_gemini_model("text", api_key="key")
+    _, vision_model = gemini_utils.get_gemini_model("vision", api_key="key")
+
+    assert text_model == "gemini-1.5-flash"
+    assert vision_model == "gemini-1.5-flash"
+    assert models.list_calls == 1
+    assert set(gemini_utils._model_selections) == {("text", "key"), ("vision", "key")}
@@ -0,0 +1,54 @@
+import asyncio
+
+from src.ingestion import _first_usable_extraction
+
+
+def test_first_usable_extraction_falls_through_failures():
+    async def failing():
+        return None
+
+    async def empty():
+        return {"title": "x", "body": "   "}
+
+    async def good():
+        return {"title": "Book", "body": "Once upon a time"}
+
+    result = asyncio.run(_first_usable_extraction([failing, empty, good], hedge_delay=1))
+    assert result["body"] == "Once upon a time"
+
+
+def test_first_usable_extraction_hedges_slow_attempts():
+    async def slow():
+        await asyncio.sleep(5)
+        return {"body": "slow"}
+
+    async def fast():
+        return {"body": "fast"}
+
+    result = asyncio.run(_first_usable_extraction([slow, fast], hedge_delay=0.05, priority_wait=0.05))
+    assert result["body"] == "fast"
+
+
+def test_first_usable_extraction_prefers_higher_priority_within_budget():
+    cancelled = []
+
+    async def primary():
+        await asyncio.sleep(0.2)
+        return {"body": "primary"}
+
+    async def fallback():
+        return {"body": "fallback"}
+
+    async def never():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    result = asyncio.run(_first_usable_extraction([primary, fallback], hedge_delay=0.05, priority_wait=2))
+    assert result["body"] == "primary"
+
+    result = asyncio.run(_first_usable_extraction([never, fallback], hedge_delay=0.05, priority_wait=0.05))
+    assert result["body"] == "fallback"
+    assert cancelled == [True]  # The losing attempt was cancelled and awaited, not orphaned
@@ -0,0 +1,8 @@
+from src.knowledge import parse_json_list, DEFAULT_SUGGESTED_QUESTIONS
+
+
+def test_parse_json_list_skips_fences_and_prose():
+    content = 'Here you go:\n```json\n["Who is Ahab?", "Why the whale?"]\n```\nEnjoy!'
+    assert parse_json_list(content) == ["Who is Ahab?", "Why the whale?"]
+    assert parse_json_list("no json here") == DEFAULT_SUGGESTED_QUESTIONS
+
@@ -0,0 +1,112 @@
+import asyncio
+import os
+
+from src import cache, podcast
+from src.podcast import PodcastGenerator, MAX_SCRIPT_INPUT_TOKENS, PODCAST_SCRIPT_MODEL
+from src.tokens import truncate_tokens
+
+
+def test_streamed_script_is_cached_and_repeats_are_linked(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(podcast, "_script_memory_cache", type(podcast._script_memory_cache)())
+    script = [
+        {"speaker": "Jax", "text": "Welcome back."},
+        {"speaker": "Emma", "text": "Yo"},
+        {"speaker": "Jax", "text": "Let's dive in."},
+        {"speaker": "Emma", "text": "Yo"},
+    ]
+    generator = PodcastGenerator("test-key")
+
+    async def fake_stream(text):
+        for segment in script:
+            yield dict(segment)
+
+    calls = []
+
+    async def fake_audio(index, segment, output_dir, provider):
+        calls.append(index)
+        _, path = generator._segment_target(index, segment, output_dir)
+        with open(path, "wb") as f:
+            f.write(b"ID3 fake mp3")
+        return path
+
+    monkeypatch.setattr(generator, "stream_script", fake_stream)
+    monkeypatch.setattr(generator, "_segment_audio", fake_audio)
+
+    text = "Call me Ishmael."
+    output_dir = tmp_path / "podcast"
+    result, files = asyncio.run(generator.generate_podcast(text, str(output_dir)))
+
+    assert result == script
+    assert len(files) == 4
+    assert calls == [0, 1, 2]  # The repeated "Yo" is not synthesized again
+
+    key = generator._script_cache_key(truncate_tokens(text, MAX_SCRIPT_INPUT_TOKENS), PODCAST_SCRIPT_MODEL)
+    assert cache.get(key) is not None
+    assert list(podcast._script_memory_cache) == [key]
+
+    first = os.stat(output_dir / files[1])
+    repeat = os.stat(output_dir / files[3])
+    assert (first.st_dev, first.st_ino) == (repeat.st_dev, repeat.st_ino)
+
+
+def test_scanner_reports_unclosed_script():
+    scanner = podcast._ScriptSegmentScanner()
+    assert scanner.feed('{"script": [{"speaker": "Jax", "text": "Hi {there}"}') == [{"speaker": "Jax", "text": "Hi {there}"}]
+    assert not scanner.complete
+    scanner.feed("]}")
+    assert scanner.complete
+
+
+def test_partial_stream_is_not_cached_or_returned(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(podcast, "_script_memory_cache", type(podcast._script_memory_cache)())
+    generator = PodcastGenerator("test-key")
+    full_script = [{"speaker": "Jax", "text": "Welcome back."}, {"speaker": "Emma", "text": "Hi!"}]
+
+    async def truncated_stream(text):
+        yield {"speaker": "Jax", "text": "Welcome"}
+        raise ValueError("Streamed script ended before its JSON closed")
+
+    async def fake_generate_script(text):
+        return [dict(segment) for segment in full_script]
+
+    async def fake_generate_audio(script, output_dir, provider="deepgram", progress_callback=None):
+        return [f"seg_{i}.mp3" for i in range(len(script))]
+
+    async def fake_audio(index, segment, output_dir, provider):
+        return None
+
+    monkeypatch.setattr(generator, "stream_script", truncated_stream)
+    monkeypatch.setattr(generator, "generate_script", fake_generate_script)
+    monkeypatch.setattr(generator, "generate_audio", fake_generate_audio)
+    monkeypatch.setattr(generator, "_segment_audio", fake_audio)
+
+    script, files = asyncio.run(generator.generate_podcast("Call me Ishmael.", str(tmp_path / "podcast")))
+
+    assert script == full_script
+    assert files == ["seg_0.mp3", "seg_1.mp3"]
+    assert not podcast._script_memory_cache
+
+
+def test_mixed_segment_formats_are_not_stream_copied(tmp_path, monkeypatch):
+    paths = []
+    for name in ("a.mp3", "b.mp3", "c.mp3"):
+        (tmp_path / name).write_bytes(b"ID3 fake mp3")
+        paths.append(str(tmp_path / name))
+    os.link(paths[0], tmp_path / "a_repeat.mp3")
+    paths.append(str(tmp_path / "a_repeat.mp3"))
+
+    formats = {paths[0]: ("mp3", "44100", "1"), paths[1]: ("mp3", "44100", "1"), paths[2]: ("mp3", "24000", "1")}
+    probed = []
+
+    async def fake_probe(path):
+        probed.append(path)
+        return formats[path]
+
+    monkeypatch.setattr(podcast.shutil, "which", lambda name: "/usr/bin/" + name)
+    monkeypatch.setattr(podcast, "_probe_audio_format", fake_probe)
+
+    assert not asyncio.run(podcast._segments_share_format(paths))
+    assert sorted(probed) == sorted(paths[:3])  # The hard-linked repeat is probed once
+    assert asyncio.run(podcast._segments_share_format(paths[:2] + paths[3:]))
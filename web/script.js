@@ -17,6 +17,13 @@ async function getAuthHeaders(extra = {}) {
     return { ...extra };
 }
 
+// API URL scoped to the current book
+function bookUrl(path) {
+    if (currentBookId === null) return `${API_BASE}${path}`;
+    const sep = path.includes('?') ? '&' : '?';
+    return `${API_BASE}${path}${sep}book_id=${currentBookId}`;
+}
+
 // DOM Elements
 const dropZone = document.getElementById('drop-zone');
 const fileInput = document.getElementById('file-input');
@@ -56,6 +63,8 @@ const qaSuggestions = document.getElementById('qa-suggestions');
 
 // State
 let currentStoryText = "";
+// Book the dashboard is showing; sent as book_id so the backend uses that book's state
+let currentBookId = null;
 let isPlaying = false;
 let audioDuration = 0;
 let isTogglingAudio = false;
@@ -292,6 +301,7 @@ async function handleUpload(file) {
 }
 
 function loadDashboard(data, filename) {
+    if (data.book_id != null) currentBookId = data.book_id;
     heroSection.classList.add('hidden');
     dashboardSection.classList.remove('hidden');
 
@@ -331,7 +341,7 @@ async function fetchStoryContent() {
     // Only fetch if we don't already have the full text
     if (!currentStoryText || currentStoryText.length < 500) {
         try {
-            const res = await fetch(`${API_BASE}/story`);
+            const res = await fetch(bookUrl(`/story`));
             const data = await res.json();
             currentStoryText = data.body; // Update with full text for better audio/QA
         } catch (e) {
@@ -471,7 +481,7 @@ function renderEntities(entities) {
 
 async function fetchEntityImage(name, imgId) {
     try {
-        const res = await fetch(`${API_BASE}/entity_image/${encodeURIComponent(name)}`);
+        const res = await fetch(bookUrl(`/entity_image/${encodeURIComponent(name)}`));
         const data = await res.json();
         if (data.image_url) {
             const img = document.getElementById(imgId);
@@ -520,20 +530,25 @@ async function generateAudio() {
             provider: provider,
         };
 
-        const res = await fetch(`${API_BASE}/generate/audio`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
-        });
+        if (STREAMING_AUDIO_PROVIDERS.includes(provider) && canStreamAudio()) {
+            // Playback starts with the first synthesized chunk
+            await streamAudioInto(audioPlayer, payload);
+        } else {
+            const res = await fetch(bookUrl(`/generate/audio`), {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload)
+            });
 
-        if (!res.ok) {
-            const err = await res.json();
-            throw new Error(err.detail || "Audio generation failed");
-        }
+            if (!res.ok) {
+                const err = await res.json();
+                throw new Error(err.detail || "Audio generation failed");
+            }
 
-        const data = await res.json();
-        audioPlayer.src = data.audio_url;
-        audioPlayer.load(); // Ensure it loads
+            const data = await res.json();
+            audioPlayer.src = data.audio_url;
+            audioPlayer.load(); // Ensure it loads
+        }
 
         showToast("Audio generated successfully!", "success");
 
@@ -552,6 +567,43 @@ async function generateAudio() {
     }
 }
 
+// Providers whose TTS the backend forwards as it is synthesized (/generate/audio/stream)
+const STREAMING_AUDIO_PROVIDERS = ['elevenlabs', 'deepgram'];
+
+function canStreamAudio() {
+    return typeof MediaSource !== 'undefined' && MediaSource.isTypeSupported('audio/mpeg');
+}
+
+// Feeds the streamed MP3 into the player through MediaSource as the bytes arrive
+async function streamAudioInto(player, payload) {
+    const res = await fetch(bookUrl(`/generate/audio/stream`), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    });
+
+    if (!res.ok) {
+        const err = await res.json();
+        throw new Error(err.detail || "Audio generation failed");
+    }
+
+    const mediaSource = new MediaSource();
+    player.src = URL.createObjectURL(mediaSource);
+    await new Promise(resolve => mediaSource.addEventListener('sourceopen', resolve, { once: true }));
+    const sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg');
+    const reader = res.body.getReader();
+
+    (async () => {
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            sourceBuffer.appendBuffer(value);
+            await new Promise(resolve => sourceBuffer.addEventListener('updateend', resolve, { once: true }));
+        }
+        if (mediaSource.readyState === 'open') mediaSource.endOfStream();
+    })().catch(e => console.error("Audio stream error:", e));
+}
+
 function toggleAudio() {
     const ui = document.querySelector('.audio-player-ui');
 
@@ -794,7 +846,7 @@ async function generateVisuals(styleOverride = null) {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 10000); // 10s timeout
 
-        const res = await fetch(`${API_BASE}/generate/visuals`, {
+        const res = await fetch(bookUrl(`/generate/visuals`), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -1024,7 +1076,7 @@ async function generatePodcast() {
     podcastTranscript.textContent = "Producers are writing the script...";
 
     try {
-        const res = await fetch(`${API_BASE}/generate/podcast`, {
+        const res = await fetch(bookUrl(`/generate/podcast`), {
             method: 'POST'
         });
 
@@ -1123,24 +1175,31 @@ async function handleQASubmit() {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 40000); // 40s timeout for frontend
 
-        const res = await fetch(`${API_BASE}/qa`, {
+        const res = await fetch(bookUrl(`/qa/stream`), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ question: question }),
             signal: controller.signal
         });
 
-        clearTimeout(timeoutId);
-
         if (!res.ok) throw new Error("Failed to get answer");
 
-        const data = await res.json();
+        // Replace the loading text with tokens as they arrive
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        const answerMsg = document.getElementById(loadingId);
+        let answer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            answer += decoder.decode(value, { stream: true });
+            if (answerMsg) answerMsg.textContent = answer;
+        }
+        answer += decoder.decode();
 
-        // Remove loading message and add real answer
-        const loadingMsg = document.getElementById(loadingId);
-        if (loadingMsg) loadingMsg.remove();
+        clearTimeout(timeoutId);
 
-        addChatMessage(data.answer, 'ai');
+        if (answerMsg) answerMsg.textContent = answer.trim() || "Sorry, I couldn't answer that.";
 
     } catch (e) {
         const loadingMsg = document.getElementById(loadingId);
@@ -1174,7 +1233,7 @@ function addChatMessage(text, type) {
 
 async function fetchSuggestedQuestions() {
     try {
-        const res = await fetch(`${API_BASE}/suggested_questions`);
+        const res = await fetch(bookUrl(`/suggested_questions`));
         const data = await res.json();
 
         if (data.questions && data.questions.length > 0) {
@@ -1197,7 +1256,7 @@ async function fetchSuggestedQuestions() {
 
 function downloadAllContent() {
     showToast("Preparing download...", "info");
-    window.location.href = `${API_BASE}/download_all`;
+    window.location.href = bookUrl(`/download_all`);
 }
 
 // --- Library ---
@@ -1297,7 +1356,7 @@ async function startImmersiveMode() {
         const providerSelect = document.getElementById('audio-provider');
         const providerVal = providerSelect ? providerSelect.value : (settings.voiceId === "21m00Tcm4TlvDq8ikWAM" ? "elevenlabs" : "deepgram");
         
-        const res = await fetch(`${API_BASE}/generate/immersive_audio`, {
+        const res = await fetch(bookUrl(`/generate/immersive_audio`), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -1336,12 +1395,12 @@ async function startImmersiveMode() {
         //  I will use a placeholder for text if missing, or fetch from a new endpoint.
         //  Let's add `getScenes` to `script.js` which calls `/api/story` (I will update server to include scenes).
 
-        const storyRes = await fetch(`${API_BASE}/story`);
+        const storyRes = await fetch(bookUrl(`/story`));
         const storyData = await storyRes.json();
         const scenes = storyData.scenes || []; // I need to ensure server returns this
 
         immersiveScenes = scenes.map((scene, i) => ({
-            image: `/api/assets/visuals/image_01_scene_${String(i + 1).padStart(2, '0')}.jpg`,
+            image: (data.image_urls || [])[i] || `/api/assets/visuals/image_01_scene_${String(i + 1).padStart(2, '0')}.jpg`,
             audio: data.audio_urls[i],
             text: scene.excerpt || scene.description || "Scene " + (i + 1),
             narrator: scene.narrator_intro || ""
@@ -1430,7 +1489,7 @@ async function generateMotionForCurrentScene() {
         // Extract filename from URL
         const filename = scene.image.split('/').pop().split('?')[0];
 
-        const res = await fetch(`${API_BASE}/generate/scene_video`, {
+        const res = await fetch(bookUrl(`/generate/scene_video`), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -1675,7 +1734,7 @@ async function generatePoster(bookId, btn, event) {
 
         await fetch(`${API_BASE}/library/load/${bookId}`, { method: 'POST' });
 
-        const res = await fetch(`${API_BASE}/generate/poster`, {
+        const res = await fetch(`${API_BASE}/generate/poster?book_id=${bookId}`, {
             method: 'POST'
         });
 
@@ -1972,7 +2031,7 @@ async function generateCharacterPortraits() {
     btn.disabled = true;
 
     try {
-        const res = await fetch(`${API_BASE}/generate/character-portraits`, {
+        const res = await fetch(bookUrl(`/generate/character-portraits`), {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -2031,7 +2090,7 @@ async function viewCharacterSheet(name) {
     showToast(`Generating character sheet for ${name}...`, "info");
 
     try {
-        const res = await fetch(`${API_BASE}/character/${encodeURIComponent(name)}/sheet`);
+        const res = await fetch(bookUrl(`/character/${encodeURIComponent(name)}/sheet`));
         const data = await res.json();
 
         if (data.sheet_url) {